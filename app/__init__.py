@@ -9,4 +9,40 @@
 #  distributed under the License is distributed on an "AS IS" BASIS,
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 #  or implied. See the License for the specific language governing
-#  permissions and limitations under the License.
\ No newline at end of file
+#  permissions and limitations under the License.
+from flask import Flask
+from config import Config
+
+
+def create_app(config_class=Config) -> Flask:
+    """
+    Creates the Flask application and registers every blueprint.
+
+    Args:
+        config_class: The configuration object loaded into `app.config`.
+
+    Returns:
+        The configured Flask application.
+    """
+    from app.routers import components, metrics, profiles, server_deployer, stacks, zen_store
+    from app.utils.metrics import init_app as init_metrics
+    from app.utils.profiling import init_app as init_profiling
+    from app.utils.tenants import init_app as init_tenants
+    from app.utils.upstream import UpstreamUnavailableError, upstream_unavailable
+
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    # First, so that the hooks of the other extensions are part of the profiles.
+    init_profiling(app)
+    init_metrics(app)
+    init_tenants(app)
+
+    app.register_error_handler(UpstreamUnavailableError, upstream_unavailable)
+    app.register_blueprint(server_deployer.bp)
+    app.register_blueprint(stacks.bp)
+    app.register_blueprint(components.bp)
+    app.register_blueprint(zen_store.bp)
+    app.register_blueprint(metrics.bp)
+    app.register_blueprint(profiles.bp)
+
+    return app
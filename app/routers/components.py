@@ -0,0 +1,71 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+from flask import Blueprint, jsonify, request
+from app.routers.stacks import stacks_generation, sync_stacks
+from app.utils.catalog import catalog_stats, get_catalog
+from app.utils.global_config import fetch_active_user, fetch_store_info
+from app.utils.responses import json_response
+from app.utils.upstream import UpstreamUnavailableError, upstream_unavailable
+from config import Config
+
+bp = Blueprint("components", __name__, url_prefix="/components")
+
+
+@bp.route("", methods=["GET"])
+@bp.route("/", methods=["GET"])
+def fetch_components():
+    """
+    Finds the stack components used by the active user's stacks, with the stacks using each of them.
+
+    Answered from an in-memory index that is kept up to date as stacks are listed, copied and
+    renamed; once the index is older than COMPONENT_CATALOG_MAX_AGE seconds, or another worker
+    changed a stack, the stack changes since the last sync are fetched and applied to it.
+
+    Accepts the optional query parameters 'type', 'flavor', 'id' and 'name', which must all match.
+
+    Returns:
+        JSON response with a list of components, each with a 'stacks' list, or 'error' on failure.
+    """
+    user_id = fetch_active_user().id
+    store_url = fetch_store_info()["store_url"]
+    catalog = get_catalog(store_url, user_id)
+
+    outdated = catalog.generation != stacks_generation(store_url)
+    if not catalog.populated or outdated or catalog.age() > Config.COMPONENT_CATALOG_MAX_AGE:
+        try:
+            sync_stacks(store_url, user_id)
+        except UpstreamUnavailableError as err:
+            # An outdated index still answers while the ZenML server is unavailable.
+            if not catalog.populated:
+                return upstream_unavailable(err)
+
+    return json_response(catalog.query(
+        component_type=request.args.get("type"),
+        flavor=request.args.get("flavor"),
+        component_id=request.args.get("id"),
+        name=request.args.get("name"),
+    ))
+
+
+@bp.route("/catalog_stats", methods=["GET"])
+def stats():
+    """
+    Reports the number of stacks and components indexed per store and user.
+
+    Returns:
+        JSON response with the catalog statistics.
+    """
+    return jsonify([
+        {"store_url": store_url, "user_id": user_id, **stats}
+        for (store_url, user_id), stats in catalog_stats().items()
+    ])
@@ -0,0 +1,87 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+from flask import Blueprint, Response
+from app.routers.server_deployer import connect_jobs
+from app.routers.stacks import stacks_cache, upstream_calls
+from app.utils.catalog import catalog_stats
+from app.utils.global_config import active_user_cache
+from app.utils.metrics import LIVE_MAX, collect, family, register_collector, render_family
+from app.utils.persistent_cache import warm_cache
+from app.utils.upstream import breaker, tenant_breakers
+from app.utils.warmup import import_seconds
+
+bp = Blueprint("metrics", __name__)
+
+BREAKER_STATES = ("closed", "open", "half_open")
+
+
+def _collect_stats() -> list:
+    """Collects the counters kept by the caches, the coalescing layer and the circuit breakers."""
+    caches = {"stacks": stacks_cache.stats(), "active_user": active_user_cache.stats()}
+    single_flight = upstream_calls.stats()
+    # The default server's breaker is labelled with the empty tenant name.
+    breakers = [("", breaker.stats())] + [(name, tenant_breaker.stats())
+                                           for name, tenant_breaker in list(tenant_breakers.items())]
+
+    families = []
+    for stat in ("hits", "misses", "evictions"):
+        families.append(family(f"cache_{stat}_total", "counter", f"Cache {stat} per cache.", ("cache",),
+                               [((name,), stats[stat]) for name, stats in caches.items()]))
+    families.append(family("cache_entries", "gauge", "Entries currently held per cache.", ("cache",),
+                           [((name,), stats["size"]) for name, stats in caches.items()]))
+    persistent = warm_cache.stats()
+    families.append(family("persistent_cache_lookups_total", "counter",
+                           "Persistent cache lookups by result: fresh hit, stale hit or miss.",
+                           ("result",), [((result,), persistent[stat]) for result, stat in
+                                         (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))]))
+    catalogs = catalog_stats().values()
+    families.append(family("component_catalog_entries", "gauge", "Stacks and components indexed by the catalogs.",
+                           ("kind",), [((kind,), sum(stats[kind] for stats in catalogs))
+                                       for kind in ("stacks", "components")]))
+    families.append(family("single_flight_calls_total", "counter",
+                           "Upstream reads executed, or saved by joining an identical in-flight call.",
+                           ("result",), [(("executed",), single_flight["executed"]),
+                                         (("coalesced",), single_flight["coalesced"])]))
+    families.append(family("circuit_breaker_state", "gauge",
+                           "Worker processes whose circuit breaker is in each state, per tenant.",
+                           ("tenant", "state"), [((name, state), int(state == stats["state"]))
+                                                 for name, stats in breakers for state in BREAKER_STATES]))
+    families.append(family("circuit_breaker_opened_total", "counter", "Times the circuit breaker opened, per tenant.",
+                           ("tenant",), [((name,), stats["opened_count"]) for name, stats in breakers]))
+    families.append(family("circuit_breaker_rejected_total", "counter",
+                           "Calls refused by the circuit breaker, per tenant.",
+                           ("tenant",), [((name,), stats["rejected_count"]) for name, stats in breakers]))
+    families.append(family("connect_jobs_pending", "gauge", "Connection jobs queued or running.",
+                           (), [((), connect_jobs.pending)]))
+    families.append(family("startup_import_seconds", "gauge",
+                           "Time the import warm-up spent per ZenML module, in the slowest worker process.",
+                           ("module",), [((module,), seconds) for module, seconds in import_seconds.items()],
+                           aggregate=LIVE_MAX))
+    return families
+
+
+register_collector(_collect_stats)
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Exposes request, upstream and cache metrics, aggregated over every worker process under gunicorn.
+
+    Returns:
+        Plain-text response in the Prometheus exposition format.
+    """
+    lines = []
+    for metric_family in collect():
+        lines += render_family(metric_family)
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
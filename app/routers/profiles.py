@@ -0,0 +1,57 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+from flask import Blueprint, jsonify, request, send_from_directory
+from app.utils.profiling import get_profile, list_profiles
+from config import Config
+
+bp = Blueprint("profiles", __name__, url_prefix="/profiles")
+
+
+@bp.before_request
+def require_profiling():
+    if not Config.PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled."}), 404
+    return None
+
+
+@bp.route("", methods=["GET"])
+@bp.route("/", methods=["GET"])
+def fetch_profiles():
+    """
+    Lists the most recent request profiles, of every worker process sharing PROFILING_DIR.
+
+    Accepts an optional 'limit' query parameter (default 50).
+
+    Returns:
+        JSON response with the metadata of each profile, most recent first, or 'error' on invalid input.
+    """
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify(list_profiles()[:max(limit, 0)])
+
+
+@bp.route("/<profile_id>", methods=["GET"])
+def download_profile(profile_id: str):
+    """
+    Downloads a request profile: a pstats file for 'cprofile' profiles, or a collapsed-stack
+    file for flame graphs for 'sampling' profiles.
+
+    Returns:
+        The profile file as an attachment, or 'error' if there is no profile with that id.
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Profile `{profile_id}` not found."}), 404
+    return send_from_directory(Config.PROFILING_DIR, profile["file"], as_attachment=True)
@@ -12,28 +12,70 @@
 #  permissions and limitations under the License.
 import json
 import logging
-from flask import Blueprint, request, jsonify
-from urllib.parse import urlparse
-from zenml.zen_server.deploy.deployer import ServerDeployer
-from zenml.zen_server.utils import get_active_server_details
-from app.utils.global_config import fetch_store_info, fetch_active_user
-from app.models.server_status import ServerStatusModel
-from zenml.cli import web_login
+import threading
+import time
+from flask import Blueprint, Response, request, jsonify, url_for
+from app.utils.global_config import fetch_active_user, invalidate_active_user
+from app.utils.client_pool import reset_clients
+from app.utils.device_login import web_login
+from app.utils.jobs import Job, JobManager, JobQueueFullError
+from app.utils.metrics import time_upstream
+from app.utils.shared_state import shared_state
+from app.utils.status_prober import status_prober, tenant_server_status
+from app.utils.tenants import current_tenant, current_tenant_name, tenants
+from app.utils.upstream import current_breaker
 from app.utils.global_config import set_store_configuration
+from config import Config
 
 bp = Blueprint("server_deployer", __name__, url_prefix="/server_deployer")
 
+# Interactive web logins run here so they never hold a request worker. Their status can be
+# polled through any worker process.
+connect_jobs = JobManager(
+    max_workers=Config.CONNECT_MAX_CONCURRENCY,
+    max_pending=Config.CONNECT_MAX_PENDING,
+    timeout=Config.CONNECT_TIMEOUT,
+    retention=Config.CONNECT_JOB_RETENTION,
+    shared=shared_state,
+    table="connect_jobs",
+)
+
+# Every open status stream holds a request thread of this worker.
+status_stream_slots = threading.BoundedSemaphore(Config.STATUS_STREAM_MAX_SUBSCRIBERS)
+
+
+def _connect(job: Job, url: str, verify_ssl: bool) -> dict:
+    """
+    Logs in to the ZenML server and points the global configuration, or the selected tenant, at it.
+
+    The login gives up at the job's deadline, and a login that completes after the job timed
+    out leaves the configuration untouched.
+    """
+    logging.info("Attempting web login...")
+    with time_upstream("web_login"):
+        access_token = web_login(job, url=url, verify_ssl=verify_ssl)
+    logging.info(f"Web login successful, access_token: {access_token}")
+
+    job.commit()
+    set_store_configuration(remote_url=url, access_token=access_token)
+    user_id = fetch_active_user().id
+    logging.info(f"Store configuration set for user_id: {user_id}")
+    if current_tenant_name() is None:
+        status_prober.refresh()
+
+    return {"message": "Connected successfully.", "access_token": access_token}
+
 
 @bp.route("/connect", methods=["POST"])
 def connect():
     """
-    Initiates a connection to the ZenML server using web-based authentication.
+    Starts a background connection to the ZenML server using web-based authentication.
     Expects a JSON payload with:
         'url' (the server URL)
         'verify_ssl' (optional SSL verification flag).
 
     Returns:
-        JSON response with 'message' indicating success and an 'access_token', or 'error' on failure.
+        202 JSON response with the 'job_id' and 'status_url' to poll, or 'error' on failure.
     """
     data = request.json
     url = data.get("url")
@@ -43,20 +85,26 @@ def connect():
         return jsonify({"error": "Server URL is required."}), 400
 
     try:
-        logging.info("Attempting web login...")
-        access_token = web_login(url=url, verify_ssl=verify_ssl)
-        logging.info(f"Web login successful, access_token: {access_token}")
+        job = connect_jobs.submit(_connect, url, verify_ssl)
+    except JobQueueFullError as e:
+        return jsonify({"error": str(e)}), 429
 
-        active_user_json = fetch_active_user()
-        active_user = json.loads(active_user_json)
-        user_id = active_user["id"]
+    status_url = url_for("server_deployer.connect_status", job_id=job.id)
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": status_url}), 202, {"Location": status_url}
 
-        logging.info(f"Setting store configuration with user_id: {user_id}")
-        set_store_configuration(remote_url=url, access_token=access_token, user_id=user_id)
 
-        return jsonify({"message": "Connected successfully.", "access_token": access_token}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+@bp.route("/connect/<job_id>", methods=["GET"])
+def connect_status(job_id: str):
+    """
+    Reports the status of a connection job started by `connect`.
+
+    Returns:
+        JSON response with the job 'status' and, once finished, its 'result' or 'error'.
+    """
+    job = connect_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown connection job `{job_id}`."}), 404
+    return jsonify(job.to_dict()), 200
 
 
 @bp.route("/disconnect", methods=["POST"])
@@ -64,12 +112,24 @@ def disconnect():
     """
     Disconnects from the ZenML server and cleans up any associated configurations.
 
+    For a tenant, the tenant is unregistered instead and the global configuration is left untouched.
+
     Returns:
        JSON response with 'message' indicating successful disconnection, or 'error' on failure.
     """
+    tenant_name = current_tenant_name()
+    if tenant_name is not None:
+        tenants.remove(tenant_name)
+        return jsonify({"message": "Disconnected successfully."}), 200
+
+    from zenml.zen_server.deploy.deployer import ServerDeployer
+
     try:
         deployer = ServerDeployer()
         deployer.disconnect_from_server()
+        reset_clients()
+        invalidate_active_user()
+        status_prober.refresh()
         return jsonify({"message": "Disconnected successfully."}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -80,34 +140,83 @@ def status():
     """
     Retrieves the current status of the ZenML server, including connectivity and store information.
 
+    The status is served from a snapshot that a background prober refreshes periodically.
+    A tenant's status is derived from its in-memory configuration.
+
     Returns:
-       JSON response with the server status model or 'error' on failure.
+       JSON response with the server status model and the 'snapshotAge' in seconds, or 'error' on failure.
     """
-    store_info = fetch_store_info()
-    store_type = store_info["store_type"]
-    store_url = store_info["store_url"]
+    tenant = current_tenant()
+    if tenant is not None:
+        return jsonify({**tenant_server_status(tenant).dict(by_alias=True), "snapshotAge": 0.0})
 
-    try:
-        url, port = get_active_server_details()
-        parsed_url = urlparse(url)
-        is_connected = False if store_type == "sql" else True
-
-        server_status = ServerStatusModel(
-            is_connected=is_connected,
-            host=parsed_url.hostname,
-            port=parsed_url.port if parsed_url.port else port,
-            store_type=store_type if store_type == "sql" else None,
-            store_url=store_url if store_type == "sql" else None,
-        )
-    except RuntimeError:
-        server_status = ServerStatusModel(
-            is_connected=False,
-            host=None,
-            port=None,
-            store_type=store_type if store_type == "sql" else None,
-            store_url=store_url if store_type == "sql" else None,
-        )
+    status_prober.ensure_started()
+    server_status, age = status_prober.snapshot()
+    if server_status is None:
+        return jsonify({"error": "Server status is not available yet."}), 503
 
     # Convert the Pydantic model to a dict before serializing to JSON
-    return jsonify(server_status.dict(by_alias=True))
+    return jsonify({**server_status.dict(by_alias=True), "snapshotAge": round(age, 3)})
+
+
+@bp.route("/status/stream", methods=["GET"])
+def status_stream():
+    """
+    Streams server status changes as Server-Sent Events.
+
+    The current status is sent immediately, then again every time it changes.
+    Comment lines are sent as keep-alives while nothing changes. A tenant's status
+    only changes when it is reconnected, so its stream sends the status once.
+
+    At most STATUS_STREAM_MAX_SUBSCRIBERS streams are open per worker, and each one ends
+    after STATUS_STREAM_MAX_LIFETIME seconds; the 'retry' field tells clients to reconnect.
 
+    Returns:
+       A 'text/event-stream' response, or 503 JSON response with 'error' while too many streams are open.
+    """
+    if not status_stream_slots.acquire(blocking=False):
+        retry_after = str(max(1, round(Config.STATUS_STREAM_RETRY)))
+        return jsonify({"error": "Too many open status streams."}), 503, {"Retry-After": retry_after}
+
+    try:
+        events = _status_events(current_tenant(), time.monotonic() + Config.STATUS_STREAM_MAX_LIFETIME)
+        response = Response(events, mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+    except BaseException:
+        status_stream_slots.release()
+        raise
+    # Called once the stream has ended or the client went away.
+    response.call_on_close(status_stream_slots.release)
+    return response
+
+
+def _status_events(tenant, ends_at: float):
+    """Yields the status events of `status_stream` until `ends_at` (monotonic time)."""
+    yield f"retry: {round(Config.STATUS_STREAM_RETRY * 1000)}\n\n"
+    if tenant is not None:
+        yield f"id: 1\ndata: {json.dumps(tenant_server_status(tenant).dict(by_alias=True))}\n\n"
+        while time.monotonic() < ends_at:
+            time.sleep(max(0.0, min(Config.STATUS_STREAM_KEEPALIVE, ends_at - time.monotonic())))
+            yield ": keep-alive\n\n"
+        return
+
+    status_prober.ensure_started()
+    version = None
+    while time.monotonic() < ends_at:
+        timeout = max(0.0, min(Config.STATUS_STREAM_KEEPALIVE, ends_at - time.monotonic()))
+        server_status, new_version = status_prober.wait_for_change(version, timeout)
+        if new_version != version and server_status is not None:
+            yield f"id: {new_version}\ndata: {json.dumps(server_status.dict(by_alias=True))}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+        version = new_version
+
+
+@bp.route("/upstream_status", methods=["GET"])
+def upstream_status():
+    """
+    Reports the state of the circuit breaker guarding calls to the ZenML server (of the selected tenant).
+
+    Returns:
+       JSON response with the breaker 'state' and its counters.
+    """
+    return jsonify(current_breaker().stats())
@@ -10,46 +10,432 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 #  or implied. See the License for the specific language governing
 #  permissions and limitations under the License.
-import json
-from flask import Blueprint, jsonify, request
-from zenml.client import Client
-from app.utils.global_config import fetch_active_user
-from app.models.stack import StackModel
-from app.utils.serializers import serialize_stack_component
-from zenml.exceptions import IllegalOperationError, ZenKeyError
+import itertools
+import logging
+import time
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.utils.batch import BatchOperation, run_batch
+from app.utils.cache import TTLCache
+from app.utils.catalog import get_catalog
+from app.utils.client_pool import get_client
+from app.utils.global_config import fetch_active_user, fetch_store_info, invalidate_active_stack, refresh_active_stack
+from app.utils.persistent_cache import warm_cache
+from app.utils.responses import json_response
+from app.utils.single_flight import SingleFlight
+from app.utils.stack_mirror import InvalidCursorError, MirrorState, StackMirror, get_mirror
+from app.utils.upstream import UpstreamUnavailableError, call_upstream, upstream_unavailable
+from app.utils.serializers import encode_json, parse_fields, select_fields, stack_to_dict, summarize_stack
+from app.utils.shared_state import shared_state
+from app.utils.tenants import current_tenant_name
+from config import Config
 
 bp = Blueprint("stacks", __name__, url_prefix="/stacks")
 
+# Serialized stack listings keyed by (store URL, user id, hydrated, stacks generation).
+stacks_cache = TTLCache(ttl=Config.STACKS_CACHE_TTL, maxsize=Config.STACKS_CACHE_MAXSIZE)
+
+# Shares identical concurrent upstream reads between requests.
+upstream_calls = SingleFlight()
+
+# Seconds between checks whether another worker finished syncing a stack mirror.
+SYNC_LEASE_POLL_INTERVAL = 0.05
+
+
+def stacks_generation(store_url: str) -> int:
+    """
+    Returns the generation of a store's stacks, which every worker process sees.
+
+    It changes whenever the service changes a stack, so listings, mirrors and catalogs
+    built under an older generation are outdated, whichever worker made the change.
+    """
+    return shared_state.generation(f"stacks:{store_url}")
+
+
+def invalidate_stacks_cache():
+    """
+    Drops every cached stack listing belonging to the currently configured store and
+    makes its stack mirrors and component catalogs sync on their next use, in every worker.
+    """
+    store_url = fetch_store_info()["store_url"]
+    shared_state.bump(f"stacks:{store_url}")
+    stacks_cache.invalidate(lambda key: key[0] == store_url)
+    warm_cache.invalidate(store_url, "stacks:")
+    # Matches the active stack of every tenant on the store.
+    warm_cache.invalidate(store_url, "active_stack")
+
+
+def iter_stacks(client, store_url: str, user_id, page_size: int, cursor: int = 1, hydrate: bool = True,
+                **filters):
+    """
+    Lazily yields every stack of a user, fetching one page at a time.
+
+    Concurrent requests for the same page share a single upstream call.
+
+    Args:
+        client: The ZenML client to query.
+        store_url: The URL of the store the client is connected to.
+        user_id: The id of the user whose stacks are listed.
+        page_size: The number of stacks requested per page.
+        cursor: The 1-based index of the first page to fetch.
+        hydrate: Whether the stacks should include their components.
+        filters: Additional `list_stacks` filters, such as `updated="gte:2024-01-01 00:00:00"`.
+    """
+    page_index = cursor
+    while True:
+        page = upstream_calls.do(
+            (store_url, user_id, "list_stacks", page_index, page_size, hydrate, tuple(sorted(filters.items()))),
+            call_upstream,
+            "list_stacks",
+            client.list_stacks,
+            page=page_index,
+            size=page_size,
+            hydrate=hydrate,
+            user_id=user_id,
+            **filters,
+        )
+        yield from page.items
+        if page_index >= page.total_pages:
+            return
+        page_index += 1
+
+
+def _sync_watermark(stacks, watermark: str) -> str:
+    """Advances a sync watermark past the `updated` timestamps of fetched stacks."""
+    # ZenML filters timestamps with a precision of seconds, so the watermark is truncated
+    # and the next `gte` sync fetches the stacks of its last second again.
+    timestamps = [stack.updated.strftime("%Y-%m-%d %H:%M:%S") for stack in stacks]
+    return max(timestamps + [watermark or ""]) or None
+
+
+def _sync_due(state: MirrorState, generation: int) -> bool:
+    """Whether a mirror has to sync: it never did, its last sync is too old, or a stack changed since."""
+    if state.generation != generation or state.synced_at is None:
+        return True
+    return time.time() - state.synced_at >= Config.STACKS_SYNC_INTERVAL
+
+
+def _sync_mirror(mirror: StackMirror, store_url: str, user_id, state: MirrorState, generation: int):
+    """Fetches the stacks changed since the mirror's last sync and records them."""
+    client = get_client()
+    page_size = Config.STACKS_PAGE_SIZE
+    full = state.watermark is None or time.time() - state.full_synced_at >= Config.STACKS_FULL_SYNC_INTERVAL
+    if full:
+        stacks = list(iter_stacks(client, store_url, user_id, page_size))
+        present_ids = {str(stack.id) for stack in stacks}
+    else:
+        stacks = list(iter_stacks(client, store_url, user_id, page_size, updated=f"gte:{state.watermark}"))
+        expected = len(mirror) + sum(str(stack.id) not in mirror for stack in stacks)
+        total = call_upstream("list_stacks", client.list_stacks, size=1, hydrate=False, user_id=user_id).total
+        present_ids = None
+        if total != expected:
+            present_ids = {str(s.id) for s in iter_stacks(client, store_url, user_id, page_size, hydrate=False)}
+
+    mirror.apply([stack_to_dict(stack) for stack in stacks], present_ids)
+    mirror.mark_synced(_sync_watermark(stacks, state.watermark), generation, full)
+
+
+def sync_stacks(store_url: str, user_id) -> StackMirror:
+    """
+    Brings the mirror of a user's stacks up to date and applies the changes to this worker's component catalog.
+
+    Syncs at most every STACKS_SYNC_INTERVAL seconds. Only stacks updated since the previous
+    sync are fetched. A cheap count detects removed stacks, and all ids are only listed when
+    the count shows that something was removed. Every STACKS_FULL_SYNC_INTERVAL seconds a
+    full listing is fetched instead, which also catches changes to components that do not
+    touch a stack's own update time. A change of the stacks generation forces a sync.
+
+    The mirror is shared by the worker processes. A lease lets one of them sync it at a time,
+    and the others wait for its result instead of fetching the same changes.
+
+    Returns:
+        The synced mirror.
+    """
+    mirror = get_mirror(store_url, user_id, Config.STACKS_CHANGES_RETENTION)
+    generation = stacks_generation(store_url)
+    with mirror.sync_lock:
+        while _sync_due(mirror.state(), generation):
+            token = mirror.acquire_sync_lease(Config.STACKS_SYNC_LEASE)
+            if token is None:
+                time.sleep(SYNC_LEASE_POLL_INTERVAL)
+                continue
+            try:
+                # Another worker may have finished a sync since the state was read.
+                state = mirror.state()
+                if _sync_due(state, generation):
+                    _sync_mirror(mirror, store_url, user_id, state, generation)
+            finally:
+                mirror.release_sync_lease(token)
+            break
+
+        # The catalog catches up from the changes recorded since it was last brought up to date.
+        catalog = get_catalog(store_url, user_id)
+        changes = mirror.changes(catalog.cursor)
+        if changes["reset"]:
+            catalog.replace_stacks(changes["added"])
+        else:
+            catalog.apply_changes(changes["added"] + changes["updated"], changes["removed"])
+        catalog.cursor = changes["cursor"]
+        catalog.generation = generation
+    return mirror
+
+
+def _index_stack(stack, only_known: bool = False):
+    """Updates the active user's component catalog with a stack that was just created or changed."""
+    get_catalog(fetch_store_info()["store_url"], fetch_active_user().id).update_stack(stack_to_dict(stack), only_known)
+
+
+def _store_listing(store_url: str, user_id, hydrated: bool, stacks_data: list, generation: int):
+    """
+    Caches a complete listing in memory and on disk, and indexes hydrated ones in the component catalog.
+
+    `generation` is the stacks generation read before the listing was fetched, so that a listing
+    that raced with a change is never taken for a current one.
+    """
+    stacks_cache.set((store_url, user_id, hydrated, generation), stacks_data)
+    warm_cache.set(store_url, f"stacks:{user_id}:{hydrated}", stacks_data)
+    if hydrated:
+        catalog = get_catalog(store_url, user_id)
+        catalog.replace_stacks(stacks_data)
+        # The mirror may be older than the listing, so the catalog catches up from scratch next time.
+        catalog.cursor = None
+        catalog.generation = generation
+
+
+def _refresh_listing(store_url: str, user_id, hydrated: bool):
+    """Fetches and stores a complete listing, to revalidate a stale persisted one."""
+    generation = stacks_generation(store_url)
+    serialize = stack_to_dict if hydrated else summarize_stack
+    stacks = iter_stacks(get_client(), store_url, user_id, Config.STACKS_PAGE_SIZE, hydrate=hydrated)
+    _store_listing(store_url, user_id, hydrated, [serialize(stack) for stack in stacks], generation)
+
+
+def _persisted_listing(store_url: str, user_id, hydrate: bool, generation: int):
+    """
+    Looks up a complete listing persisted by this or an earlier process, e.g. before a restart.
+
+    A fresh listing is loaded into the memory cache. A stale one is returned as it is
+    while a background refresh fetches the current listing.
+    """
+    for hydrated in (True,) if hydrate else (True, False):
+        key = f"stacks:{user_id}:{hydrated}"
+        persisted = warm_cache.get(store_url, key)
+        if persisted is None:
+            continue
+        stacks_data, stale = persisted
+        if stale:
+            warm_cache.revalidate(store_url, key, _refresh_listing, store_url, user_id, hydrated)
+        else:
+            stacks_cache.set((store_url, user_id, hydrated, generation), stacks_data)
+        return stacks_data
+    return None
+
+
+def _cached_listing(store_url: str, user_id, hydrate: bool, generation: int, stale: bool = False):
+    """
+    Looks up a cached complete listing that can answer a request.
+
+    A hydrated listing can also answer a summary request. With `stale=True`,
+    expired entries are returned too, which keeps reads working while the
+    ZenML server is unavailable.
+    """
+    lookup = stacks_cache.peek_stale if stale else stacks_cache.get
+    for hydrated in (True,) if hydrate else (True, False):
+        stacks_data = lookup((store_url, user_id, hydrated, generation))
+        if stacks_data is not None:
+            return stacks_data
+    return None
+
+
+def _parse_hydrate_and_fields():
+    """
+    Reads the 'hydrate' and 'fields' query parameters of a stack request.
+
+    Returns:
+        A tuple of the hydration flag and the parsed fieldset.
+
+    Raises:
+        ValueError: If the fieldset is invalid or needs components without hydration.
+    """
+    fields = parse_fields(request.args.get("fields"))
+    needs_components = fields is None or "components" in fields
+    if request.args.get("hydrate", "true").lower() in ("false", "0", "no"):
+        if fields is None:
+            fields = parse_fields("id,name")
+        elif needs_components:
+            raise ValueError("The `components` field requires hydrate=true")
+        return False, fields
+    return needs_components, fields
+
+
+def _stream_stacks(stacks_data, stream_format: str) -> Response:
+    """Streams serialized stacks as NDJSON or as a chunked JSON array."""
+    def generate():
+        try:
+            if stream_format == "ndjson":
+                for stack_data in stacks_data:
+                    yield encode_json(stack_data) + b"\n"
+                return
+
+            yield b"["
+            for index, stack_data in enumerate(stacks_data):
+                yield (b"," if index else b"") + encode_json(stack_data)
+            yield b"]"
+        except Exception:
+            # Headers are already sent, so the only option left is to cut the stream short.
+            logging.exception("Streaming stacks failed")
+
+    mimetype = "application/x-ndjson" if stream_format == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 
 @bp.route("", methods=["GET"])
 @bp.route("/", methods=["GET"])
 def fetch_stacks():
     """
-    Fetches all ZenML stacks associated with the active user.
+    Fetches all ZenML stacks associated with the active user, walking every page.
+
+    Accepts the optional query parameters:
+        'stream' ('ndjson' or 'json') to stream stacks while later pages are still being fetched.
+        'page_size' (the number of stacks fetched per upstream call).
+        'cursor' (the 1-based page to start from).
+        'fields' (a sparse fieldset such as 'id,name,components.flavor').
+        'hydrate' ('false' to skip hydration; only 'id' and 'name' are then available).
+
+    Non-streamed listings carry an ETag and honour If-None-Match. With the persistent cache
+    enabled, a listing persisted before a restart is served right away and refreshed in the
+    background if it is stale.
+
+    Returns:
+        JSON response with a list of stack models, a streamed NDJSON/JSON body, or 'error' on failure.
+    """
+    stream_format = request.args.get("stream")
+    if stream_format not in (None, "ndjson", "json"):
+        return jsonify({"error": "stream must be either 'ndjson' or 'json'"}), 400
+
+    try:
+        page_size = int(request.args.get("page_size", Config.STACKS_PAGE_SIZE))
+        cursor = int(request.args.get("cursor", 1))
+    except ValueError:
+        return jsonify({"error": "page_size and cursor must be integers"}), 400
+    if page_size < 1 or cursor < 1:
+        return jsonify({"error": "page_size and cursor must be positive"}), 400
+
+    try:
+        hydrate, fields = _parse_hydrate_and_fields()
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    user_id = fetch_active_user().id
+    store_url = fetch_store_info()["store_url"]
+    generation = stacks_generation(store_url)
+    serialize = stack_to_dict if hydrate else summarize_stack
+
+    # Only complete listings are cached, so a cursor past the first page always goes upstream.
+    stacks_data = _cached_listing(store_url, user_id, hydrate, generation) if cursor == 1 else None
+    if stacks_data is None and cursor == 1:
+        stacks_data = _persisted_listing(store_url, user_id, hydrate, generation)
+    if stacks_data is None:
+        stacks = iter_stacks(get_client(), store_url, user_id, page_size, cursor, hydrate)
+        try:
+            # Fetch the first page eagerly so that upstream failures surface before a stream starts.
+            try:
+                stacks = itertools.chain(list(itertools.islice(stacks, 1)), stacks)
+            except ValueError:
+                # ZenML rejects pages past the last one.
+                return jsonify({"error": f"cursor {cursor} is past the last page"}), 400
+            if stream_format:
+                stacks_data = (serialize(stack) for stack in stacks)
+            else:
+                stacks_data = [serialize(stack) for stack in stacks]
+                if cursor == 1:
+                    _store_listing(store_url, user_id, hydrate, stacks_data, generation)
+        except UpstreamUnavailableError as err:
+            stacks_data = _cached_listing(store_url, user_id, hydrate, generation, stale=True) if cursor == 1 else None
+            if stacks_data is None:
+                return upstream_unavailable(err)
+
+    if stream_format:
+        return _stream_stacks((select_fields(s, fields) for s in stacks_data), stream_format)
+    return json_response([select_fields(s, fields) for s in stacks_data])
+
+
+@bp.route("/changes", methods=["GET"])
+def stack_changes():
+    """
+    Lists the stacks added, updated or removed since a cursor returned by an earlier call.
+
+    Answered from a local mirror of the active user's stacks that is synced incrementally, so
+    keeping a client in sync costs in proportion to how much changed rather than to the number
+    of stacks.
+
+    Accepts the optional query parameter 'since' (the 'cursor' of the previous response), which
+    any worker process accepts. Without it, or when the cursor has expired or was issued before
+    the service restarted, the response has 'reset' set and 'added' holds every stack.
+
+    Returns:
+        JSON response with 'cursor', 'reset', 'added', 'updated' and 'removed' (stack ids),
+        or 'error' on failure.
+    """
+    user_id = fetch_active_user().id
+    store_url = fetch_store_info()["store_url"]
+    try:
+        mirror = sync_stacks(store_url, user_id)
+    except UpstreamUnavailableError as err:
+        # A mirror that synced before keeps serving the changes it knows about.
+        mirror = get_mirror(store_url, user_id, Config.STACKS_CHANGES_RETENTION)
+        if mirror.state().full_synced_at is None:
+            return upstream_unavailable(err)
+
+    try:
+        return json_response(mirror.changes(request.args.get("since")))
+    except InvalidCursorError as err:
+        return jsonify({"error": str(err)}), 400
+
+
+@bp.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    """
+    Reports the hit/miss counters of the stack listing cache.
 
     Returns:
-        JSON response with a list of stack models or 'error' on failure.
-    """
-    active_user_json = fetch_active_user()
-    active_user = json.loads(active_user_json)
-    user_id = active_user["id"]
-    client = Client()
-    stacks = client.list_stacks(hydrate=True, user_id=user_id)
-
-    stacks_data = [
-        StackModel(
-            id=stack.id,
-            name=stack.name,
-            components={
-                component_type: [serialize_stack_component(c) for c in components]
-                for component_type, components in stack.components.items()
-            },
-        ).dict()
-        for stack in stacks.items
-    ]
-
-    print(stacks_data)
-    return jsonify(stacks_data)
+        JSON response with the cache statistics.
+    """
+    return jsonify(stacks_cache.stats())
+
+
+@bp.route("/single_flight_stats", methods=["GET"])
+def single_flight_stats():
+    """
+    Reports how many upstream calls were executed and how many were saved by coalescing.
+
+    Returns:
+        JSON response with the coalescing statistics.
+    """
+    return jsonify(upstream_calls.stats())
+
+
+def _active_stack_key() -> str:
+    """
+    Returns the persistent cache key of the active stack of the current request's tenant.
+
+    Tenants keep their active stack in their own configuration, so tenants on the same
+    server can each have a different one.
+    """
+    return f"active_stack:{current_tenant_name() or ''}"
+
+
+def _fetch_active_stack(client, store_url: str) -> dict:
+    """Fetches and serializes the active stack, persisting it for the next lookups."""
+    refresh_active_stack()
+    current_stack = upstream_calls.do(
+        (store_url, current_tenant_name(), "active_stack_model"),
+        call_upstream,
+        "active_stack_model",
+        lambda: client.active_stack_model,
+    )
+    stack_data = stack_to_dict(current_stack)
+    warm_cache.set(store_url, _active_stack_key(), stack_data)
+    return stack_data
 
 
 @bp.route("/active_stack", methods=["GET"])
@@ -57,29 +443,67 @@ def active_stack():
     """
     Retrieves the currently active ZenML stack for the user.
 
+    Accepts the same optional 'fields' and 'hydrate' query parameters as `fetch_stacks`.
+    With the persistent cache enabled, the last known active stack is served right away and
+    refreshed in the background if it is stale.
+
     Returns:
         JSON response with the active stack model or 'error' on failure.
     """
-    client = Client()
     try:
-        current_stack = client.active_stack_model
-        stack_components = {}
+        # The active stack is always fetched hydrated; without hydration, fields defaults to 'id,name'.
+        _, fields = _parse_hydrate_and_fields()
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
 
-        for component_type, components in current_stack.components.items():
-            stack_components[component_type] = [
-                serialize_stack_component(c) for c in components
-            ]
+    store_url = fetch_store_info()["store_url"]
+    key = _active_stack_key()
+    persisted = warm_cache.get(store_url, key)
+    if persisted is not None:
+        stack_data, stale = persisted
+        if stale:
+            warm_cache.revalidate(store_url, key, _fetch_active_stack, get_client(), store_url)
+        return json_response(select_fields(stack_data, fields))
 
-        stack_model = StackModel(
-            id=current_stack.id, name=current_stack.name, components=stack_components
-        )
-
-        return jsonify(stack_model.dict())
+    try:
+        stack_data = _fetch_active_stack(get_client(), store_url)
+        return json_response(select_fields(stack_data, fields))
+    except UpstreamUnavailableError as err:
+        return upstream_unavailable(err)
     except Exception as e:
         error_model = {"error": str(e)}
         return jsonify(error_model), 500
 
 
+def _rename_stack(client, stack_name_or_id: str, new_stack_name: str) -> str:
+    """Renames a stack and returns the success message."""
+    stack = call_upstream("update_stack", client.update_stack, name_id_or_prefix=stack_name_or_id, name=new_stack_name)
+    # Stacks of other users can be renamed too, but only the active user's stacks are catalogued.
+    _index_stack(stack, only_known=True)
+    # The renamed stack may be the active one, which other workers hold under its old name.
+    invalidate_active_stack()
+    return f'Stack `{stack_name_or_id}` successfully renamed to `{new_stack_name}`!'
+
+
+def _activate_stack(client, stack_name_or_id: str) -> str:
+    """Activates a stack and returns the success message."""
+    call_upstream("activate_stack", client.activate_stack, stack_name_id_or_prefix=stack_name_or_id)
+    invalidate_active_stack(activated=True)
+    active_stack_name = call_upstream("active_stack_model", lambda: client.active_stack_model).name
+    return f'Active stack set to: `{active_stack_name}`'
+
+
+def _copy_stack(client, source_stack_name_or_id: str, target_stack_name: str) -> str:
+    """Copies a stack under a new name and returns the success message."""
+    stack_to_copy = call_upstream("get_stack", client.get_stack, name_id_or_prefix=source_stack_name_or_id)
+    component_mapping = {c_type: [c.id for c in components][0] for c_type, components in
+                         stack_to_copy.components.items() if components}
+
+    stack = call_upstream("create_stack", client.create_stack, name=target_stack_name, components=component_mapping)
+    _index_stack(stack)
+    return f'Stack `{source_stack_name_or_id}` successfully copied to `{target_stack_name}`!'
+
+
 @bp.route('/rename', methods=['POST'])
 def rename_stack():
     """
@@ -98,13 +522,13 @@ def rename_stack():
     if not stack_name_or_id or not new_stack_name:
         return jsonify({'error': 'Missing stack_name_or_id or new_stack_name'}), 400
 
-    client = Client()
+    from zenml.exceptions import IllegalOperationError
+
+    client = get_client()
     try:
-        stack_ = client.update_stack(
-            name_id_or_prefix=stack_name_or_id,
-            name=new_stack_name,
-        )
-        return jsonify({'message': f'Stack `{stack_name_or_id}` successfully renamed to `{new_stack_name}`!'}), 200
+        message = _rename_stack(client, stack_name_or_id, new_stack_name)
+        invalidate_stacks_cache()
+        return jsonify({'message': message}), 200
     except (KeyError, IllegalOperationError) as err:
         return jsonify({'error': str(err)}), 400
 
@@ -125,10 +549,11 @@ def set_active_stack():
     if not stack_name_or_id:
         return jsonify({'error': 'Missing stack_name_or_id'}), 400
 
-    client = Client()
+    client = get_client()
     try:
-        client.activate_stack(stack_name_id_or_prefix=stack_name_or_id)
-        return jsonify({'message': f'Active stack set to: `{client.active_stack_model.name}`'}), 200
+        message = _activate_stack(client, stack_name_or_id)
+        invalidate_stacks_cache()
+        return jsonify({'message': message}), 200
     except KeyError as err:
         return jsonify({'error': str(err)}), 400
 
@@ -151,16 +576,91 @@ def copy_stack():
     if not source_stack_name_or_id or not target_stack_name:
         return jsonify({'error': 'Both source stack name/id and target stack name are required'}), 400
 
-    client = Client()
-    try:
-        stack_to_copy = client.get_stack(name_id_or_prefix=source_stack_name_or_id)
-        component_mapping = {c_type: [c.id for c in components][0] for c_type, components in
-                             stack_to_copy.components.items() if components}
+    from zenml.exceptions import ZenKeyError
 
-        copied_stack = client.create_stack(name=target_stack_name, components=component_mapping)
-        return jsonify(
-            {'message': f'Stack `{source_stack_name_or_id}` successfully copied to `{target_stack_name}`!'}), 200
+    client = get_client()
+    try:
+        message = _copy_stack(client, source_stack_name_or_id, target_stack_name)
+        invalidate_stacks_cache()
+        return jsonify({'message': message}), 200
     except ZenKeyError as err:
         return jsonify({'error': str(err)}), 404
+    except UpstreamUnavailableError as err:
+        return upstream_unavailable(err)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+# Payload fields of each batch operation, which also name the stacks it touches, and its implementation.
+BATCH_OPERATIONS = {
+    'rename': (('stack_name_or_id', 'new_stack_name'), _rename_stack),
+    'activate': (('stack_name_or_id',), _activate_stack),
+    'copy': (('source_stack_name_or_id', 'target_stack'), _copy_stack),
+}
+
+
+def _batch_error_status(op: str, err: Exception) -> int:
+    """Maps a failed batch operation to the status code its single-stack route would return."""
+    from zenml.exceptions import IllegalOperationError, ZenKeyError
+
+    if isinstance(err, UpstreamUnavailableError):
+        return 503
+    if op == 'copy':
+        return 404 if isinstance(err, ZenKeyError) else 500
+    if isinstance(err, KeyError) or (op == 'rename' and isinstance(err, IllegalOperationError)):
+        return 400
+    return 500
+
+
+@bp.route('/batch', methods=['POST'])
+def batch_stacks():
+    """
+    Runs several rename, copy and activate operations in one request.
+
+    Expects a JSON payload with 'operations', a list of objects with an 'op' ('rename', 'copy'
+    or 'activate') and the same fields as the corresponding single-stack route.
+    Operations touching the same stack names or ids, and all 'activate' operations, run in
+    the given order; the rest run concurrently. An operation whose prerequisite did not
+    succeed is skipped.
+
+    Returns:
+        JSON response with one result per operation ('status', 'status_code' and 'message'
+        or 'error'), or 'error' if the payload is invalid.
+    """
+    body = request.json
+    operations = body.get('operations') if isinstance(body, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Missing operations'}), 400
+    if len(operations) > Config.BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {Config.BATCH_MAX_OPERATIONS} operations are allowed per batch'}), 400
+
+    client = get_client()
+    batch = []
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in BATCH_OPERATIONS:
+            return jsonify({'error': f'Operation {index}: op must be one of {", ".join(BATCH_OPERATIONS)}'}), 400
+        field_names, fn = BATCH_OPERATIONS[op]
+        args = [operation.get(name) for name in field_names]
+        if not all(isinstance(arg, str) and arg for arg in args):
+            return jsonify({'error': f'Operation {index}: {", ".join(field_names)} are required for {op}'}), 400
+
+        # Activations all move the same active stack pointer, so they keep their order
+        # without depending on each other's outcome.
+        order_keys = frozenset({'active_stack'} if op == 'activate' else ())
+        batch.append(BatchOperation(frozenset(args), lambda fn=fn, args=args: fn(client, *args), order_keys))
+
+    results = []
+    for index, (operation, (status, value)) in enumerate(zip(operations, run_batch(batch, Config.BATCH_MAX_WORKERS))):
+        result = {'index': index, 'op': operation['op'], 'status': status}
+        if status == 'succeeded':
+            result.update(status_code=200, message=value)
+        elif status == 'failed':
+            result.update(status_code=_batch_error_status(operation['op'], value), error=str(value))
+        else:
+            result.update(status_code=424, error='Skipped because an earlier operation on the same stack failed')
+        results.append(result)
+
+    if any(result['status'] == 'succeeded' for result in results):
+        invalidate_stacks_cache()
+    return jsonify({'results': results}), 200
@@ -11,7 +11,8 @@
 #  or implied. See the License for the specific language governing
 #  permissions and limitations under the License.
 from flask import Blueprint, jsonify
-from app.utils.global_config import fetch_global_configuration
+from app.utils.global_config import fetch_api_token
+from app.utils.tenants import current_tenant
 
 bp = Blueprint("zen_store", __name__, url_prefix="/zen_store")
 
@@ -19,13 +20,16 @@ bp = Blueprint("zen_store", __name__, url_prefix="/zen_store")
 @bp.route('/api_token', methods=['GET'])
 def get_api_token():
     """
-    Retrieves the API token from ZenML's global configuration.
+    Retrieves the API token from ZenML's global configuration, or the selected tenant's token.
 
     Returns:
         JSON response containing the 'api_token' if present, or 'error' message if the token is missing.
     """
-    global_config = fetch_global_configuration()
-    api_token = global_config.get("store", {}).get("api_token")
+    tenant = current_tenant()
+    if tenant is not None:
+        api_token = tenant.api_token
+    else:
+        api_token = fetch_api_token()
     if not api_token:
         return jsonify({"error": "API token is missing in ZenML's global configuration."}), 404
     return jsonify({"api_token": api_token})
\ No newline at end of file
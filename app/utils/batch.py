@@ -0,0 +1,67 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, FrozenSet, List, Tuple
+
+
+class BatchOperation:
+    """
+    One operation of a batch.
+
+    `keys` names the resources the operation reads or writes. An operation
+    depends on every earlier operation of the batch it shares a key with.
+    `order_keys` name resources the operation only has to be ordered on: it
+    waits for earlier operations sharing one, but still runs if they failed.
+    """
+
+    def __init__(self, keys: FrozenSet[str], fn: Callable[[], Any], order_keys: FrozenSet[str] = frozenset()):
+        self.keys = keys
+        self.fn = fn
+        self.order_keys = order_keys
+
+
+def _run(fn: Callable[[], Any], dependencies: List[Future], predecessors: List[Future]) -> Tuple[str, Any]:
+    for dependency in dependencies:
+        status, _ = dependency.result()
+        if status != "succeeded":
+            return "skipped", None
+    for predecessor in predecessors:
+        predecessor.result()
+    try:
+        return "succeeded", fn()
+    except Exception as e:
+        return "failed", e
+
+
+def run_batch(operations: List[BatchOperation], max_workers: int) -> List[Tuple[str, Any]]:
+    """
+    Runs a batch of operations on a bounded thread pool.
+
+    Independent operations run concurrently; an operation sharing a key with
+    earlier ones waits for them and is skipped if any of them did not succeed.
+    Operations are submitted in order to a FIFO pool, so an operation only
+    ever waits on operations that have already started.
+
+    Returns:
+        One `(status, value)` pair per operation, in order: ('succeeded', result),
+        ('failed', exception) or ('skipped', None).
+    """
+    futures = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(operations)))) as executor:
+        for index, operation in enumerate(operations):
+            dependencies = [futures[i] for i in range(index) if operations[i].keys & operation.keys]
+            predecessors = [futures[i] for i in range(index) if operations[i].order_keys & operation.order_keys]
+            context = contextvars.copy_context()
+            futures.append(executor.submit(context.run, _run, operation.fn, dependencies, predecessors))
+    return [future.result() for future in futures]
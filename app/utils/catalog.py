@@ -0,0 +1,176 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class ComponentCatalog:
+    """
+    Inverted index from stack components to the stacks using them.
+
+    Built from serialized stacks (as produced by `stack_to_dict`), it maps
+    component types, flavors and ids to components, and components to the
+    stacks referencing them, so component queries never need a stack listing.
+    It is kept up to date incrementally as stacks are listed, created or changed.
+    """
+
+    def __init__(self):
+        self.refreshed_at = None
+        # Generation of the stacks and stack mirror cursor the catalog was last brought up
+        # to date with, both set by its owner.
+        self.generation = None
+        self.cursor = None
+        self._stacks: Dict[str, dict] = {}
+        self._components: Dict[str, dict] = {}
+        self._stacks_by_component: Dict[str, Set[str]] = {}
+        self._by_type: Dict[str, Set[str]] = {}
+        self._by_flavor: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def populated(self) -> bool:
+        """Whether the catalog has been loaded from a complete stack listing."""
+        return self.refreshed_at is not None
+
+    def age(self) -> Optional[float]:
+        """Returns the seconds since the last complete listing was loaded, or None if it never was."""
+        return None if self.refreshed_at is None else time.monotonic() - self.refreshed_at
+
+    def replace_stacks(self, stacks_data: Iterable[dict]) -> None:
+        """Rebuilds the index from a complete listing of serialized stacks."""
+        with self._lock:
+            self._stacks.clear()
+            self._components.clear()
+            self._stacks_by_component.clear()
+            self._by_type.clear()
+            self._by_flavor.clear()
+            for stack_data in stacks_data:
+                self._add(stack_data)
+            self.refreshed_at = time.monotonic()
+
+    def update_stack(self, stack_data: dict, only_known: bool = False) -> None:
+        """
+        Indexes a created or changed stack, replacing its previous version.
+
+        Args:
+            stack_data: The serialized stack.
+            only_known: Only update the stack if it is already indexed, for changes
+                to stacks that may not belong to the catalog's listing.
+        """
+        with self._lock:
+            stack_id = str(stack_data["id"])
+            if only_known and stack_id not in self._stacks:
+                return
+            self._remove(stack_id)
+            self._add(stack_data)
+
+    def apply_changes(self, stacks_data: Iterable[dict], removed_ids: Iterable[str]) -> None:
+        """Applies every stack change since the last refresh, which brings the catalog up to date."""
+        with self._lock:
+            for stack_data in stacks_data:
+                self._remove(str(stack_data["id"]))
+                self._add(stack_data)
+            for stack_id in removed_ids:
+                self._remove(str(stack_id))
+            self.refreshed_at = time.monotonic()
+
+    def query(self, component_type: Optional[str] = None, flavor: Optional[str] = None,
+              component_id: Optional[str] = None, name: Optional[str] = None) -> List[dict]:
+        """
+        Finds the components matching every given filter.
+
+        Returns:
+            The matching serialized components, sorted by type and name, each with
+            a 'stacks' list holding the id and name of the stacks using it.
+        """
+        with self._lock:
+            candidates = [
+                index.get(value, set())
+                for index, value in ((self._by_type, component_type), (self._by_flavor, flavor))
+                if value is not None
+            ]
+            if component_id is not None:
+                candidates.append({component_id} & self._components.keys())
+            if candidates:
+                candidates.sort(key=len)
+                component_ids = candidates[0].intersection(*candidates[1:])
+            else:
+                component_ids = self._components.keys()
+
+            results = []
+            for c_id in component_ids:
+                component = self._components[c_id]
+                if name is not None and component["name"] != name:
+                    continue
+                stacks = [self._stacks[s_id] for s_id in self._stacks_by_component[c_id]]
+                results.append({
+                    **component,
+                    "stacks": sorted(({"id": s["id"], "name": s["name"]} for s in stacks), key=lambda s: s["name"]),
+                })
+        return sorted(results, key=lambda c: (c["type"], c["name"], str(c["id"])))
+
+    def stats(self) -> dict:
+        """Returns the number of indexed stacks and components."""
+        with self._lock:
+            return {"stacks": len(self._stacks), "components": len(self._components)}
+
+    def _add(self, stack_data: dict) -> None:
+        stack_id = str(stack_data["id"])
+        self._stacks[stack_id] = stack_data
+        for components in stack_data["components"].values():
+            for component in components:
+                component_id = str(component["id"])
+                self._components[component_id] = component
+                self._stacks_by_component.setdefault(component_id, set()).add(stack_id)
+                self._by_type.setdefault(component["type"], set()).add(component_id)
+                self._by_flavor.setdefault(component["flavor"], set()).add(component_id)
+
+    def _remove(self, stack_id: str) -> None:
+        stack_data = self._stacks.pop(stack_id, None)
+        if stack_data is None:
+            return
+        components = {str(c["id"]): c for cs in stack_data["components"].values() for c in cs}
+        for component_id, component in components.items():
+            stack_ids = self._stacks_by_component[component_id]
+            stack_ids.discard(stack_id)
+            if stack_ids:
+                continue
+            # The last stack using the component is gone, so the component leaves the catalog.
+            del self._stacks_by_component[component_id]
+            del self._components[component_id]
+            for index, value in ((self._by_type, component["type"]), (self._by_flavor, component["flavor"])):
+                index[value].discard(component_id)
+                if not index[value]:
+                    del index[value]
+
+
+_catalogs: Dict[tuple, ComponentCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(store_url: str, user_id) -> ComponentCatalog:
+    """Returns the component catalog of a user's stacks on a store, creating an empty one if needed."""
+    key = (store_url, str(user_id))
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = ComponentCatalog()
+        return catalog
+
+
+def catalog_stats() -> Dict[tuple, dict]:
+    """Returns the stats of every catalog, keyed by (store URL, user id)."""
+    with _catalogs_lock:
+        catalogs = dict(_catalogs)
+    return {key: catalog.stats() for key, catalog in catalogs.items()}
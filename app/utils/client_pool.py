@@ -0,0 +1,106 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+from typing import TYPE_CHECKING
+
+from requests.adapters import HTTPAdapter
+from app.utils.tenants import current_tenant
+from config import Config
+
+if TYPE_CHECKING:
+    import requests
+    from zenml.client import Client
+
+
+def mount_connection_pool(session: "requests.Session", size: int):
+    """Mounts keep-alive adapters holding up to `size` connections on a ZenML store session, keeping its retries."""
+    for prefix in ("https://", "http://"):
+        retries = session.get_adapter(prefix).max_retries
+        session.mount(
+            prefix,
+            HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=retries),
+        )
+
+
+class ClientPool:
+    """
+    Per-worker, thread-safe holder of the ZenML client and its HTTP connections.
+
+    ZenML's `Client` and `GlobalConfiguration` are process-wide singletons, so
+    every thread of a worker shares one client handle. What is pooled is the
+    REST store's `requests` session: its keep-alive connection pool is sized
+    so that `size` concurrent requests can reuse open TLS connections to the
+    ZenML server instead of handshaking again.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._client = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def get(self) -> "Client":
+        """Returns the shared client, building it and tuning its store session on first use."""
+        client = self._client
+        if client is None or getattr(client.zen_store, "_session", None) is not self._session:
+            with self._lock:
+                if self._client is None:
+                    from zenml.client import Client
+
+                    self._client = Client()
+                client = self._client
+                self._configure_session(client)
+        return client
+
+    def reset(self):
+        """
+        Tears down the pooled client and its connections.
+
+        Called whenever the service switches ZenML servers so that the next
+        request builds a client bound to the new store.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            if self._client is not None:
+                type(self._client)._reset_instance()
+            self._client = None
+            self._session = None
+
+    def _configure_session(self, client: "Client"):
+        """Mounts a keep-alive adapter of `size` connections on the REST store session."""
+        session = getattr(client.zen_store, "_session", None)
+        if session is None or session is self._session:
+            # Not a REST store, or its session has not been opened yet.
+            return
+
+        mount_connection_pool(session, self.size)
+        self._session = session
+
+
+client_pool = ClientPool(size=Config.CLIENT_POOL_SIZE)
+
+
+def get_client() -> "Client":
+    """Returns the client of the current request's tenant, or else the pooled ZenML client of this worker."""
+    tenant = current_tenant()
+    return tenant.client if tenant is not None else client_pool.get()
+
+
+def reset_clients():
+    """Drops the client of the current request's tenant, or else the pooled ZenML client, and closes its connections."""
+    tenant = current_tenant()
+    if tenant is not None:
+        tenant.reset()
+    else:
+        client_pool.reset()
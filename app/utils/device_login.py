@@ -0,0 +1,131 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import logging
+import platform
+import time
+import webbrowser
+from typing import Union
+
+import requests
+
+from app.utils.jobs import Job, JobCancelledError
+
+
+def _post(job: Job, url: str, verify_ssl: Union[bool, str], **kwargs) -> requests.Response:
+    """Sends a form POST that gives up by the job's deadline."""
+    from zenml.constants import DEFAULT_HTTP_TIMEOUT
+
+    remaining = job.remaining()
+    if remaining <= 0:
+        raise JobCancelledError(f"Web login did not finish within {job.timeout:g} seconds.")
+    return requests.post(url, verify=verify_ssl, timeout=min(DEFAULT_HTTP_TIMEOUT, remaining), **kwargs)
+
+
+def web_login(job: Job, url: str, verify_ssl: Union[bool, str]) -> str:
+    """
+    Runs the OAuth2 device authorization flow of `zenml.cli.web_login` within the deadline of `job`.
+
+    ZenML's own implementation polls until the device code expires, which usually takes far
+    longer than a connection job may run. This one bounds every request and every wait by the
+    job's remaining time instead, so that a login the user never completes frees its worker.
+
+    Args:
+        job: The connection job the login runs in.
+        url: The URL of the ZenML server.
+        verify_ssl: Whether to verify the server's SSL certificate, or the path to a CA bundle.
+
+    Returns:
+        The access token issued by the server.
+
+    Raises:
+        AuthorizationException: If the server rejected the login or could not be reached.
+        JobCancelledError: If the job's deadline passed before the user authorized the device.
+    """
+    from zenml import __version__
+    from zenml.config.global_config import GlobalConfiguration
+    from zenml.constants import API, DEVICE_AUTHORIZATION, LOGIN, VERSION_1
+    from zenml.exceptions import AuthorizationException, OAuthError
+    from zenml.models import (
+        OAuthDeviceAuthorizationRequest,
+        OAuthDeviceAuthorizationResponse,
+        OAuthDeviceTokenRequest,
+        OAuthDeviceUserAgentHeader,
+        OAuthTokenResponse,
+    )
+
+    url = url.rstrip("/")
+    auth_request = OAuthDeviceAuthorizationRequest(client_id=GlobalConfiguration().user_id)
+    user_agent_header = OAuthDeviceUserAgentHeader(
+        hostname=platform.node(),
+        zenml_version=__version__,
+        python_version=platform.python_version(),
+        os=platform.system(),
+    )
+    try:
+        response = _post(
+            job,
+            url + API + VERSION_1 + DEVICE_AUTHORIZATION,
+            verify_ssl,
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "User-Agent": user_agent_header.encode(),
+            },
+            data=auth_request.dict(),
+        )
+        if response.status_code != 200:
+            logging.info(f"Error: {response.status_code} {response.text}")
+            raise AuthorizationException("Could not connect to API server. Please check the URL.")
+        auth_response = OAuthDeviceAuthorizationResponse(**response.json())
+    except (requests.exceptions.JSONDecodeError, ValueError, TypeError) as e:
+        raise AuthorizationException("Bad response received from API server. Please check the URL.") from e
+    except requests.exceptions.RequestException as e:
+        raise AuthorizationException("Could not connect to API server. Please check the URL.") from e
+
+    verification_uri = auth_response.verification_uri_complete or auth_response.verification_uri
+    if verification_uri.startswith("/"):
+        verification_uri = url + verification_uri
+    webbrowser.open(verification_uri)
+    logging.info(f"If your browser did not open automatically, open {verification_uri} to proceed with the login.")
+
+    token_request = OAuthDeviceTokenRequest(device_code=auth_response.device_code, client_id=auth_request.client_id)
+    expires_at = time.monotonic() + auth_response.expires_in
+    interval = auth_response.interval
+    while True:
+        try:
+            response = _post(
+                job,
+                url + API + VERSION_1 + LOGIN,
+                verify_ssl,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                data=token_request.dict(),
+            )
+        except requests.exceptions.RequestException as e:
+            raise AuthorizationException("Could not connect to API server. Please check the URL.") from e
+        if response.status_code == 200:
+            return OAuthTokenResponse(**response.json()).access_token
+        if response.status_code != 400:
+            raise AuthorizationException(f"Error: {response.status_code} {response.text}")
+        try:
+            error_response = OAuthError(**response.json())
+        except (requests.exceptions.JSONDecodeError, ValueError, TypeError) as e:
+            raise AuthorizationException(f"Error received from API server: {response.text}") from e
+        if error_response.error == "slow_down":
+            interval += 5
+        elif error_response.error != "authorization_pending":
+            raise AuthorizationException(f"Error: {error_response.error} {error_response.error_description}")
+
+        if time.monotonic() + interval >= expires_at:
+            raise AuthorizationException("User did not authorize the device in time.")
+        if job.remaining() <= interval:
+            raise JobCancelledError(f"Web login did not finish within {job.timeout:g} seconds.")
+        time.sleep(interval)
@@ -10,46 +10,304 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 #  or implied. See the License for the specific language governing
 #  permissions and limitations under the License.
-import json
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, NamedTuple, Optional, Tuple
 
-from zenml.config.global_config import GlobalConfiguration
 from app.models.user import UserModel
-from zenml.config.store_config import StoreConfiguration
-from zenml.zen_stores.rest_zen_store import RestZenStoreConfiguration
+from app.utils.cache import TTLCache
+from app.utils.client_pool import reset_clients
+from app.utils.persistent_cache import warm_cache
+from app.utils.shared_state import shared_state
+from app.utils.tenants import current_tenant, current_tenant_name, tenants
+from app.utils.upstream import UpstreamUnavailableError, call_upstream
+from config import Config
 
+# Active user identities keyed by (store URL, API token).
+active_user_cache = TTLCache(ttl=Config.ACTIVE_USER_CACHE_TTL, maxsize=Config.ACTIVE_USER_CACHE_MAXSIZE)
 
-def fetch_active_user():
-    """Fetches the active user."""
-    gc = GlobalConfiguration()
-    active_user = gc.zen_store.get_user()
-    user_model = UserModel(id=active_user.id, name=active_user.name)
-    return user_model.json(indent=2)
+
+def _global_configuration():
+    """Returns ZenML's global configuration, importing ZenML on first use to keep startup fast."""
+    from zenml.config.global_config import GlobalConfiguration
+
+    return GlobalConfiguration()
+
+
+def _store_configuration(gc):
+    """
+    Returns the configuration of the store ZenML is connected to.
+
+    A store configured through the ZENML_STORE_* environment variables, like the default local
+    store, is only set up when ZenML first uses it, and `gc.store` is None until then. It is
+    set up here, or, if its server cannot be reached yet, read from the configuration ZenML
+    will set it up from.
+    """
+    if gc.store is None:
+        try:
+            _ = gc.zen_store
+        except Exception:
+            logging.warning("Setting up the ZenML store failed", exc_info=True)
+            return gc.get_default_store()
+    return gc.store
+
+
+class GlobalConfigSnapshot(NamedTuple):
+    """The fields of ZenML's global configuration the service reads, as of the last (re)load."""
+
+    store_type: str
+    store_url: str
+    api_token: Optional[str]
+    # (mtime, size, inode) of the configuration file when the snapshot was taken, or None if it did not exist.
+    file_signature: Optional[Tuple[int, int, int]]
+    # The 'store' section of the configuration file at that time.
+    file_store: Optional[dict]
+
+
+_snapshot: Optional[GlobalConfigSnapshot] = None
+_config_file: Optional[str] = None
+# Serializes (re)loading the snapshot with the service's own writes to the configuration file.
+_snapshot_lock = threading.RLock()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _read_file_store(path: str) -> Optional[dict]:
+    """Returns the 'store' section of a configuration file, or None if it cannot be read."""
+    from zenml.utils import yaml_utils
+
+    try:
+        return (yaml_utils.read_yaml(path) or {}).get("store")
+    except Exception:
+        return None
+
+
+def _same_store(file_store: Optional[dict], snapshot: GlobalConfigSnapshot) -> bool:
+    """
+    Returns whether the 'store' section of the configuration file still describes the snapshot's store.
+
+    ZenML writes the store it set up to the file, so the section appears when the service first
+    uses a store configured through the environment, without the store having changed.
+    """
+    if file_store is None:
+        return snapshot.file_store is None
+    return (file_store.get("type"), file_store.get("url"), file_store.get("api_token")) == (
+        snapshot.store_type,
+        snapshot.store_url,
+        snapshot.api_token,
+    )
+
+
+def _take_snapshot(gc) -> GlobalConfigSnapshot:
+    global _config_file
+    store = _store_configuration(gc)
+    _config_file = gc._config_file()
+    return GlobalConfigSnapshot(
+        store_type=store.type,
+        store_url=store.url,
+        api_token=getattr(store, "api_token", None),
+        file_signature=_file_signature(_config_file),
+        file_store=_read_file_store(_config_file),
+    )
+
+
+def global_config_snapshot() -> GlobalConfigSnapshot:
+    """
+    Returns the snapshot of ZenML's global configuration, reloading it if its file changed.
+
+    Checking for a change costs one `stat` of the configuration file. ZenML rewrites the file
+    for other settings too, e.g. the active stack, so it is only reloaded when its store section
+    changed. That happens when another process, e.g. the ZenML CLI, connected to another server;
+    the clients and identities of the previous store are then dropped.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and _file_signature(_config_file) == snapshot.file_signature:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is None:
+            _snapshot = _take_snapshot(_global_configuration())
+            return _snapshot
+        signature = _file_signature(_config_file)
+        if signature == snapshot.file_signature:
+            return snapshot
+        file_store = _read_file_store(_config_file)
+        if _same_store(file_store, snapshot):
+            _snapshot = snapshot._replace(file_signature=signature, file_store=file_store)
+            return _snapshot
+
+        from zenml.config.global_config import GlobalConfiguration
+
+        GlobalConfiguration._reset_instance()
+        reset_clients()
+        invalidate_active_user()
+        _snapshot = _take_snapshot(_global_configuration())
+        return _snapshot
+
+
+def _persisted_user_key(api_token) -> str:
+    """Returns the persistent cache key of the identity behind a token, which does not reveal the token."""
+    return "user:" + hashlib.sha256(str(api_token).encode()).hexdigest()
+
+
+def fetch_active_user() -> UserModel:
+    """
+    Fetches the active user, reusing the cached identity for the current store and token.
+
+    After a restart, the identity is taken from the persistent cache if it is enabled.
+    Requests for a tenant use the tenant's store and token.
+    """
+    tenant = current_tenant()
+    if tenant is not None:
+        store_url, api_token = tenant.url, tenant.api_token
+    else:
+        snapshot = global_config_snapshot()
+        store_url, api_token = snapshot.store_url, snapshot.api_token
+    cache_key = (store_url, api_token)
+    user_model = active_user_cache.get(cache_key)
+    if user_model is None:
+        # The identity behind a token does not change, so even a stale persisted entry is still correct.
+        persisted = warm_cache.get(store_url, _persisted_user_key(api_token))
+        if persisted is not None:
+            user_model = UserModel(**persisted[0])
+            active_user_cache.set(cache_key, user_model)
+            return user_model
+        zen_store = tenant.zen_store if tenant is not None else _global_configuration().zen_store
+        try:
+            active_user = call_upstream("get_user", zen_store.get_user)
+        except UpstreamUnavailableError:
+            # The identity behind a token does not change, so a stale entry is still correct.
+            user_model = active_user_cache.peek_stale(cache_key)
+            if user_model is None:
+                raise
+            return user_model
+        user_model = UserModel(id=active_user.id, name=active_user.name)
+        active_user_cache.set(cache_key, user_model)
+        warm_cache.set(store_url, _persisted_user_key(api_token), user_model.dict())
+    return user_model
+
+
+def invalidate_active_user():
+    """Forgets every cached active user identity."""
+    active_user_cache.invalidate()
 
 
 def fetch_store_info():
-    """Fetches store information as a dictionary."""
-    gc = GlobalConfiguration()
+    """Fetches store information, of the current request's tenant if one is selected, as a dictionary."""
+    tenant = current_tenant()
+    if tenant is not None:
+        return tenant.store_info
+    snapshot = global_config_snapshot()
     return {
-        "store_type": gc.store.type,
-        "store_url": gc.store.url
+        "store_type": snapshot.store_type,
+        "store_url": snapshot.store_url
     }
 
 
-def fetch_global_configuration():
-    """Fetches the global configuration as a Python dictionary."""
-    gc = GlobalConfiguration()
-    json_string = gc.json(indent=2)
-    return json.loads(json_string)
+# Generations of the global configuration's active stack as of when this process last loaded it, by store URL.
+_active_stack_generations: Dict[str, int] = {}
+
+
+def _active_stack_generation_name(store_url: str) -> str:
+    """Names the generation of the active stack of the current request's tenant, or of the global configuration."""
+    return f"active_stack:{store_url}:{current_tenant_name() or ''}"
+
+
+def invalidate_active_stack(activated: bool = False):
+    """
+    Tells every worker process that the active stack was changed.
+
+    Args:
+        activated: Whether another stack was just activated, rather than the active one changed, e.g. renamed.
+    """
+    tenant = current_tenant()
+    if activated and tenant is not None:
+        # Tenants have no configuration file the other workers could read the new active stack from.
+        tenants.share_active_stack(tenant.name, tenant.configuration.active_stack_id)
+    shared_state.bump(_active_stack_generation_name(fetch_store_info()["store_url"]))
+
+
+def refresh_active_stack():
+    """
+    Makes ZenML load the active stack again if another worker process changed it since this one loaded it.
+
+    ZenML keeps the active stack of the global configuration, and of every tenant, in memory,
+    so a stack activated or renamed by another worker would otherwise never be seen. Costs one
+    read of the shared state while nothing changed.
+    """
+    tenant = current_tenant()
+    if tenant is not None:
+        _refresh_tenant_active_stack(tenant)
+        return
+    store_url = fetch_store_info()["store_url"]
+    generation = shared_state.generation(_active_stack_generation_name(store_url))
+    if _active_stack_generations.get(store_url, 0) == generation:
+        return
+
+    from pydantic import BaseModel
+    from zenml.utils import yaml_utils
+
+    with _snapshot_lock:
+        gc = _global_configuration()
+        try:
+            active_stack_id = (yaml_utils.read_yaml(gc._config_file()) or {}).get("active_stack_id")
+        except Exception:
+            logging.warning("Reading the active stack from the global configuration failed", exc_info=True)
+            return
+        # Assigning through the configuration itself would write the file back.
+        BaseModel.__setattr__(gc, "active_stack_id", uuid.UUID(active_stack_id) if active_stack_id else None)
+        gc._active_stack = None
+    _active_stack_generations[store_url] = generation
+
+
+def _refresh_tenant_active_stack(tenant):
+    """Points a tenant's in-memory configuration at the active stack another worker process recorded for it."""
+    configuration = tenant.configuration
+    generation = shared_state.generation(_active_stack_generation_name(tenant.url))
+    if configuration.active_stack_generation == generation:
+        return
+    stack_id = tenants.shared_active_stack(tenant.name)
+    if stack_id is not None:
+        configuration.active_stack_id = uuid.UUID(stack_id)
+    # The client fetches the stack by its id again, e.g. under its new name.
+    configuration._active_stack = None
+    configuration.active_stack_generation = generation
+
+
+def fetch_api_token() -> Optional[str]:
+    """Fetches the API token of the store in the global configuration, if it has one."""
+    return global_config_snapshot().api_token
 
 
 def set_store_configuration(remote_url: str, access_token: str):
     """Sets the ZenML global configuration to use a remote REST store.
 
+    When the current request selects a tenant, only that tenant is (re-)registered in
+    memory and the global configuration is left untouched.
+
     Args:
         remote_url (str): The URL of the remote ZenML server.
         access_token (str): The access token retrieved via OAuth2 for authentication.
     """
-    gc = GlobalConfiguration()
+    tenant_name = current_tenant_name()
+    if tenant_name is not None:
+        tenant = tenants.register(tenant_name, remote_url, access_token)
+        warm_cache.invalidate(tenant.url)
+        return
+
+    from zenml.zen_stores.rest_zen_store import RestZenStoreConfiguration
+
+    global _snapshot
     new_store_config = RestZenStoreConfiguration(
         type="rest",
         url=remote_url,
@@ -57,7 +315,12 @@ def set_store_configuration(remote_url: str, access_token: str):
         verify_ssl=True
     )
 
-    gc.set_store(new_store_config)
-
-
-
+    with _snapshot_lock:
+        gc = _global_configuration()
+        gc.set_store(new_store_config)
+        # Taken right after the write, so the service's own change is not mistaken for an external one.
+        _snapshot = _take_snapshot(gc)
+    reset_clients()
+    invalidate_active_user()
+    # A server reached under the same URL may have been redeployed since its snapshots were taken.
+    warm_cache.invalidate(remote_url)
@@ -0,0 +1,286 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.utils.serializers import encode_json
+from app.utils.shared_state import SharedState, process_alive
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the maximum number of jobs is already pending."""
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job that ran past its timeout, so that it stops before applying side effects."""
+
+
+class Job:
+    """
+    A unit of work executed in the background by a `JobManager`.
+
+    The job's function receives the job itself, so that it can bound its waits by `remaining()`
+    and call `commit()` before applying side effects that must not happen after a timeout.
+    `on_change` is called with the job after each of its state changes.
+    """
+
+    def __init__(self, timeout: float, on_change: Optional[Callable[["Job"], None]] = None):
+        self.id = str(uuid.uuid4())
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.timeout = timeout
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = None
+        self.committed = False
+        self._on_change = on_change
+        self._lock = threading.Lock()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "timed_out")
+
+    def remaining(self) -> float:
+        """Returns the seconds left before the job times out, or its full timeout if it has not started yet."""
+        if self.deadline is None:
+            return self.timeout
+        return max(0.0, self.deadline - time.monotonic())
+
+    def commit(self):
+        """
+        Marks the job as past the point of no return, after which it can no longer time out.
+
+        Raises:
+            JobCancelledError: If the job has already timed out.
+        """
+        with self._lock:
+            self._check_timeout()
+            cancelled = self.status == "timed_out"
+            self.committed = not cancelled
+        self._changed()
+        if cancelled:
+            raise JobCancelledError(self.error)
+
+    def check_timeout(self):
+        """Marks the job as timed out once it has been running past its deadline without committing."""
+        with self._lock:
+            timed_out = self._check_timeout()
+        if timed_out:
+            self._changed()
+
+    def _start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+            self.deadline = time.monotonic() + self.timeout
+        self._changed()
+
+    def _finish(self, result, error: Optional[str], status: str):
+        with self._lock:
+            self._check_timeout()
+            if not self.is_finished:
+                self.result, self.error, self.status = result, error, status
+                self.finished_at = time.time()
+        self._changed()
+
+    def _check_timeout(self) -> bool:
+        """Returns whether the job just timed out. Must be called with the lock held."""
+        if self.status == "running" and not self.committed and time.monotonic() > self.deadline:
+            self.status = "timed_out"
+            self.error = f"Job did not finish within {self.timeout:g} seconds."
+            self.finished_at = time.time()
+            return True
+        return False
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_record(self) -> dict:
+        """Returns the job's state as stored for other processes, see `from_record`."""
+        return {**self.to_dict(), "timeout": self.timeout, "committed": self.committed}
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Job":
+        """Rebuilds a job run by another process from its `to_record` state, for reporting only."""
+        job = cls(timeout=record["timeout"])
+        job.id = record["job_id"]
+        job.status, job.result, job.error = record["status"], record["result"], record["error"]
+        job.created_at, job.started_at = record["created_at"], record["started_at"]
+        job.finished_at = record["finished_at"]
+        job.committed = record["committed"]
+        if job.started_at is not None:
+            job.deadline = time.monotonic() + job.started_at + job.timeout - time.time()
+        return job
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps their status for polling.
+
+    At most `max_workers` jobs run at once and at most `max_pending` may be
+    queued or running; further submissions are rejected instead of tying up
+    request threads. A job that runs past its timeout without committing is
+    reported as `timed_out`, and `Job.commit()` raises in it from then on so
+    it stops before applying side effects. Jobs are expected to bound their
+    own waits by `Job.remaining()`, as a pool slot is only freed once the
+    function returns. Finished jobs are forgotten after `retention` seconds.
+
+    The limits apply per process. With `shared` state, every job is also
+    recorded in the `table` it holds, so that a job can be polled through any
+    worker process; a job whose process exited before finishing is reported
+    as failed.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float, retention: float,
+                 shared: Optional[SharedState] = None, table: str = "jobs"):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retention = retention
+        self.shared = shared
+        self.table = table
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        if shared is not None:
+            shared.register_schema(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "id TEXT PRIMARY KEY, owner_pid INTEGER NOT NULL, record BLOB NOT NULL, "
+                "created_at REAL NOT NULL, finished_at REAL)"
+            )
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Schedules `fn(job, *args, **kwargs)` to run in the background.
+
+        Returns:
+            The job tracking the call.
+
+        Raises:
+            JobQueueFullError: If `max_pending` jobs are already queued or running.
+        """
+        with self._lock:
+            self._prune()
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"Too many pending jobs (limit: {self.max_pending}).")
+            job = Job(timeout=self.timeout, on_change=self._publish if self.shared is not None else None)
+            self._jobs[job.id] = job
+            self._pending += 1
+        job._changed()
+
+        # The job runs with the submitting request's context, e.g. its selected tenant.
+        self._executor.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job
+
+    @property
+    def pending(self) -> int:
+        """The number of jobs currently queued or running in this process."""
+        return self._pending
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns the job with the given id, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return self._get_shared(job_id)
+        job.check_timeout()
+        return job
+
+    def _get_shared(self, job_id: str) -> Optional[Job]:
+        """Looks up a job submitted to another process."""
+        if self.shared is None:
+            return None
+        try:
+            row = self.shared.connection().execute(
+                f"SELECT owner_pid, record FROM {self.table} WHERE id = ?", (job_id,)
+            ).fetchone()
+        except sqlite3.Error:
+            logging.exception("Reading shared job `%s` failed", job_id)
+            return None
+        if row is None:
+            return None
+        job = Job.from_record(json.loads(row[1]))
+        if not job.is_finished and not process_alive(row[0]):
+            job.status, job.error, job.finished_at = "failed", "The worker running the job exited.", time.time()
+        job.check_timeout()
+        return job
+
+    def _publish(self, job: Job):
+        """Records the state of a job of this process for the other processes."""
+        try:
+            with self.shared.transaction() as connection:
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (id, owner_pid, record, created_at, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job.id, os.getpid(), encode_json(job.to_record()), job.created_at, job.finished_at),
+                )
+        except sqlite3.Error:
+            logging.exception("Recording job `%s` failed", job.id)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        job._start()
+        try:
+            result, error, status = fn(job, *args, **kwargs), None, "succeeded"
+        except JobCancelledError:
+            logging.info(f"Job {job.id} stopped after timing out")
+            result, error, status = None, f"Job did not finish within {job.timeout:g} seconds.", "timed_out"
+        except Exception as e:
+            logging.exception(f"Job {job.id} failed")
+            result, error, status = None, str(e), "failed"
+        finally:
+            with self._lock:
+                self._pending -= 1
+        job._finish(result, error, status)
+
+    def _prune(self):
+        """Forgets finished jobs older than the retention period. Must be called with the lock held."""
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.shared is None:
+            return
+        try:
+            # Jobs of exited processes never finish, so they are dropped once they would have timed out.
+            with self.shared.transaction() as connection:
+                connection.execute(
+                    f"DELETE FROM {self.table} WHERE finished_at < ? OR created_at < ?",
+                    (cutoff, cutoff - self.timeout),
+                )
+        except sqlite3.Error:
+            logging.exception("Pruning shared jobs failed")
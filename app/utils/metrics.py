@@ -0,0 +1,426 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import bisect
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+from app.utils.shared_state import process_alive
+from config import Config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# How the values of a gauge family are combined across worker processes. Counters and
+# histograms are always summed, including the last values of processes that exited.
+LIVE_SUM = "live_sum"
+LIVE_MAX = "live_max"
+
+# Holds the summed counters and histograms of every process that exited.
+EXITED_SNAPSHOT = "exited.json"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def family(name: str, metric_type: str, help_text: str, label_names: Tuple[str, ...],
+           samples: Iterable[Tuple[Tuple, float]], aggregate: str = LIVE_SUM) -> dict:
+    """
+    Describes one metric family and its samples, in the form processes exchange them.
+
+    Args:
+        name: The metric name.
+        metric_type: 'counter', 'gauge' or 'histogram'.
+        help_text: The HELP text.
+        label_names: The names of the labels, in the order of the label values of the samples.
+        samples: Label values and value pairs; a histogram's value holds the count of each
+            bucket followed by the sum of the observations.
+        aggregate: For gauges, LIVE_SUM or LIVE_MAX.
+    """
+    return {
+        "name": name,
+        "type": metric_type,
+        "help": help_text,
+        "labels": list(label_names),
+        "samples": [[list(labels), value] for labels, value in samples],
+        "aggregate": aggregate,
+    }
+
+
+def render_family(metric_family: dict) -> List[str]:
+    """Renders one metric family in the Prometheus text exposition format."""
+    name, label_names = metric_family["name"], metric_family["labels"]
+    lines = [f"# HELP {name} {metric_family['help']}", f"# TYPE {name} {metric_family['type']}"]
+    if metric_family["type"] != "histogram":
+        for labels, value in metric_family["samples"]:
+            lines.append(f"{name}{_format_labels(label_names, labels)} {value}")
+        return lines
+
+    buckets = tuple(metric_family["buckets"]) + (float("inf"),)
+    for labels, series in metric_family["samples"]:
+        cumulative = 0
+        for bound, count in zip(buckets, series):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+            lines.append(f"{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(label_names, labels)} {series[-1]}")
+        lines.append(f"{name}_count{_format_labels(label_names, labels)} {cumulative}")
+    return lines
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> dict:
+        with self._lock:
+            samples = list(self._values.items())
+        return family(self.name, self.metric_type, self.help_text, self.label_names, samples)
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+
+    metric_type = "gauge"
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    """Cumulative bucketed observations per label set, as Prometheus histograms expect them."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then the sum of observations.
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self) -> dict:
+        with self._lock:
+            samples = [(labels, list(series)) for labels, series in self._series.items()]
+        return {**family(self.name, "histogram", self.help_text, self.label_names, samples),
+                "buckets": list(self.buckets)}
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response object is ready, per route.",
+    ("blueprint", "route", "method"), LATENCY_BUCKETS,
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total", "Handled requests per route and status code.",
+    ("blueprint", "route", "method", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled, per blueprint.", ("blueprint",),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Size of non-streamed response bodies, per route.",
+    ("blueprint", "route", "method"), SIZE_BUCKETS,
+)
+UPSTREAM_LATENCY = Histogram(
+    "zenml_upstream_duration_seconds", "Time spent in calls to the ZenML server, per operation and outcome.",
+    ("operation", "outcome"), LATENCY_BUCKETS,
+)
+
+METRICS = [REQUEST_LATENCY, REQUESTS_TOTAL, REQUESTS_IN_FLIGHT, RESPONSE_SIZE, UPSTREAM_LATENCY]
+
+# Functions returning further metric families of this process, such as cache statistics.
+_collectors: List[Callable[[], List[dict]]] = []
+
+
+def register_collector(collector: Callable[[], List[dict]]):
+    """Adds a function returning metric families (see `family`) to every collection."""
+    _collectors.append(collector)
+
+
+def collect_process() -> List[dict]:
+    """Returns the metric families of this process."""
+    families = [metric.collect() for metric in METRICS]
+    for collector in _collectors:
+        families.extend(collector())
+    return families
+
+
+class MultiprocessExporter:
+    """
+    Aggregates the metrics of every worker process through files in a shared directory.
+
+    Each process writes a snapshot of its metric families to the directory every
+    `flush_interval` seconds, from a thread started with its first request, and right
+    before it answers a scrape. A scrape then merges the snapshots of all processes:
+    counters and histograms are summed over every snapshot, including those of
+    exited processes so that totals never go backwards, while gauges only combine the
+    processes that are still running. The snapshots of exited processes are folded
+    into a single file, so recycled workers do not make the directory grow.
+    """
+
+    def __init__(self, directory: str, flush_interval: float):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._pid = None
+        self._path = None
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Starts the flush thread of the calling process, once per process."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            # Pids are reused, so a process tells its snapshot apart from those of exited processes by a token.
+            self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+            self._started_at = time.time()
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="metrics-flush", daemon=True).start()
+
+    def flush(self):
+        """Writes the snapshot of this process."""
+        self.ensure_started()
+        snapshot = {"pid": os.getpid(), "started_at": self._started_at, "families": collect_process()}
+        temporary = f"{self._path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temporary, self._path)
+
+    def collect(self) -> List[dict]:
+        """Returns the metric families of all processes, merged."""
+        self.flush()
+        with self._locked():
+            snapshots = self._fold_exited()
+        return merge_families(snapshots)
+
+    def prune(self):
+        """Folds the snapshots of processes that exited into one file, e.g. once the master has reaped a worker."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._locked():
+            self._fold_exited()
+
+    @contextmanager
+    def _locked(self):
+        # Keeps two processes from folding the same snapshots twice, and scrapes from seeing half a fold.
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _fold_exited(self) -> List[Tuple[dict, bool]]:
+        """
+        Replaces the snapshots of exited processes by their sum in EXITED_SNAPSHOT. Must hold the lock.
+
+        Returns:
+            Every remaining snapshot, paired with whether its process is running.
+        """
+        snapshots = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots[name] = json.load(f)
+            except (OSError, ValueError):
+                # Removed or replaced while being read.
+                continue
+        exited = snapshots.pop(EXITED_SNAPSHOT, None)
+
+        # Of several snapshots written under the same pid, only the newest can be a running process.
+        newest = {}
+        for snapshot in snapshots.values():
+            if snapshot["started_at"] >= newest.get(snapshot["pid"], 0):
+                newest[snapshot["pid"]] = snapshot["started_at"]
+        live = {
+            name: snapshot["started_at"] == newest[snapshot["pid"]] and process_alive(snapshot["pid"])
+            for name, snapshot in snapshots.items()
+        }
+
+        dead = [name for name, alive in live.items() if not alive]
+        if dead:
+            folded = [(snapshots[name], False) for name in dead]
+            if exited is not None:
+                folded.append((exited, False))
+            # Merging as exited drops the gauges and keeps the counters and histograms.
+            exited = {"families": merge_families(folded)}
+            temporary = os.path.join(self.directory, f"{EXITED_SNAPSHOT}.tmp")
+            with open(temporary, "w") as f:
+                json.dump(exited, f)
+            os.replace(temporary, os.path.join(self.directory, EXITED_SNAPSHOT))
+            for name in dead:
+                os.remove(os.path.join(self.directory, name))
+
+        remaining = [(snapshots[name], True) for name, alive in live.items() if alive]
+        if exited is not None:
+            remaining.append((exited, False))
+        return remaining
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Writing the metrics snapshot failed")
+
+
+def merge_families(snapshots: Iterable[Tuple[dict, bool]]) -> List[dict]:
+    """Merges the metric families of several process snapshots, each paired with whether its process is running."""
+    merged: Dict[str, dict] = {}
+    values: Dict[str, Dict[tuple, object]] = {}
+    for snapshot, live in snapshots:
+        for metric_family in snapshot["families"]:
+            is_gauge = metric_family["type"] == "gauge"
+            if is_gauge and not live:
+                continue
+            name = metric_family["name"]
+            merged.setdefault(name, metric_family)
+            family_values = values.setdefault(name, {})
+            for labels, value in metric_family["samples"]:
+                key = tuple(labels)
+                current = family_values.get(key)
+                if current is None:
+                    family_values[key] = value
+                elif metric_family["type"] == "histogram":
+                    family_values[key] = [a + b for a, b in zip(current, value)]
+                elif is_gauge and metric_family["aggregate"] == LIVE_MAX:
+                    family_values[key] = max(current, value)
+                else:
+                    family_values[key] = current + value
+    return [
+        {**metric_family, "samples": [[list(key), value] for key, value in values[name].items()]}
+        for name, metric_family in merged.items()
+    ]
+
+
+# Set by `enable_multiprocess`; without it, `collect` only reports the calling process.
+_exporter: Optional[MultiprocessExporter] = None
+
+
+def enable_multiprocess(directory: str):
+    """
+    Makes `collect` report the metrics of every process using `directory`, e.g. all gunicorn workers.
+
+    Must be called in the parent process before the workers are forked. Snapshots of an
+    earlier run found in the directory are deleted.
+    """
+    global _exporter
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+    _exporter = MultiprocessExporter(directory, Config.METRICS_FLUSH_INTERVAL)
+
+
+def flush():
+    """Writes the metrics snapshot of this process if enabled, e.g. right before the process exits."""
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def prune_exited():
+    """Folds the snapshots of exited processes into one file if enabled; called by the gunicorn master."""
+    if _exporter is not None:
+        _exporter.prune()
+
+
+def collect() -> List[dict]:
+    """Returns the metric families to expose: those of every worker process if enabled, else this process's."""
+    if _exporter is None:
+        return collect_process()
+    return _exporter.collect()
+
+
+@contextmanager
+def time_upstream(operation: str):
+    """Records the duration of an upstream ZenML call made inside the `with` block."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        UPSTREAM_LATENCY.observe((operation, outcome), time.perf_counter() - started)
+
+
+def _before_request():
+    if _exporter is not None:
+        _exporter.ensure_started()
+    g.metrics_started = time.perf_counter()
+    g.metrics_blueprint = request.blueprint or ""
+    REQUESTS_IN_FLIGHT.inc((g.metrics_blueprint,))
+
+
+def _after_request(response):
+    started = g.get("metrics_started")
+    if started is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    labels = (g.metrics_blueprint, route, request.method)
+    REQUEST_LATENCY.observe(labels, time.perf_counter() - started)
+    REQUESTS_TOTAL.inc(labels + (response.status_code,))
+    if not response.is_streamed:
+        RESPONSE_SIZE.observe(labels, response.content_length or 0)
+    return response
+
+
+def _teardown_request(exc):
+    blueprint = g.pop("metrics_blueprint", None)
+    if blueprint is not None:
+        REQUESTS_IN_FLIGHT.dec((blueprint,))
+
+
+def init_app(app: Flask):
+    """Instruments every request handled by `app`."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
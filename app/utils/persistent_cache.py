@@ -0,0 +1,174 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import contextvars
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from app.utils.serializers import encode_json
+from config import Config
+
+
+class PersistentCache:
+    """
+    SQLite-backed cache of serialized snapshots that survives restarts.
+
+    Entries are keyed by store URL and a key within that store, and are shared
+    by every worker process using the same file. An entry younger than
+    `fresh_for` seconds is fresh; an older one is stale and should be served
+    while `revalidate` fetches the current data in the background. Entries
+    older than `max_staleness` seconds are never returned. With an empty
+    `path` the cache is disabled and every lookup misses.
+    """
+
+    def __init__(self, path: str, fresh_for: float, max_staleness: float):
+        self.path = path
+        self.fresh_for = fresh_for
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, store_url: str, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Looks up the snapshot stored under `key` for a store.
+
+        Returns:
+            A tuple of the snapshot and whether it is stale, or None if there is no usable entry.
+        """
+        entry = self.get_with_age(store_url, key)
+        return None if entry is None else (entry[0], entry[1] > self.fresh_for)
+
+    def get_with_age(self, store_url: str, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Looks up the snapshot stored under `key` for a store.
+
+        Returns:
+            A tuple of the snapshot and its age in seconds, or None if there is no usable entry.
+        """
+        if not self.enabled:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT value, stored_at FROM entries WHERE store_url = ? AND key = ?", (store_url, key)
+            ).fetchone()
+        except sqlite3.Error:
+            logging.exception("Reading the persistent cache failed")
+            row = None
+
+        age = time.time() - row[1] if row is not None else None
+        with self._lock:
+            if age is None or age > self.max_staleness:
+                self.misses += 1
+                return None
+            if age > self.fresh_for:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return json.loads(row[0]), max(0.0, age)
+
+    def set(self, store_url: str, key: str, value: Any) -> None:
+        """Stores a JSON-serializable snapshot under `key` for a store."""
+        if not self.enabled:
+            return
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries (store_url, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                    (store_url, key, encode_json(value), time.time()),
+                )
+        except sqlite3.Error:
+            logging.exception("Writing the persistent cache failed")
+
+    def invalidate(self, store_url: str, prefix: str = "") -> None:
+        """Drops the entries of a store whose key starts with `prefix`, or all of them."""
+        if not self.enabled:
+            return
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "DELETE FROM entries WHERE store_url = ? AND substr(key, 1, ?) = ?",
+                    (store_url, len(prefix), prefix),
+                )
+        except sqlite3.Error:
+            logging.exception("Invalidating the persistent cache failed")
+
+    def revalidate(self, store_url: str, key: str, fn: Callable, *args, **kwargs) -> None:
+        """
+        Runs `fn` in a background thread to refresh a stale entry.
+
+        `fn` is expected to store the refreshed snapshot itself. Only one
+        revalidation per entry runs at a time in this process.
+        """
+        with self._lock:
+            if (store_url, key) in self._revalidating:
+                return
+            self._revalidating.add((store_url, key))
+
+        def run():
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logging.exception("Revalidating `%s` failed", key)
+            finally:
+                with self._lock:
+                    self._revalidating.discard((store_url, key))
+
+        # The refresh runs with the requesting context, e.g. its selected tenant.
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"revalidate-{key}", daemon=True).start()
+
+    def stats(self) -> dict:
+        """Returns the lookup counters as a dictionary."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "revalidating": len(self._revalidating),
+            }
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, creating the database and pruning expired entries on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            # WAL lets the worker processes sharing the file read while one of them writes.
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "store_url TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, stored_at REAL NOT NULL, "
+                    "PRIMARY KEY (store_url, key))"
+                )
+                connection.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - self.max_staleness,))
+            self._local.connection = connection
+        return connection
+
+
+warm_cache = PersistentCache(
+    path=Config.PERSISTENT_CACHE_PATH,
+    fresh_for=Config.PERSISTENT_CACHE_FRESH_FOR,
+    max_staleness=Config.PERSISTENT_CACHE_MAX_STALENESS,
+)
@@ -0,0 +1,333 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from flask import Flask, g, request
+from config import Config
+
+PROFILE_HEADER = "X-ZenML-Profile"
+PROFILE_ID_HEADER = "X-ZenML-Profile-Id"
+PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+MODES = ("cprofile", "sampling")
+
+# Profile of the request being handled, which upstream calls made on its behalf add their threads to.
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("zenml_profile", default=None)
+
+
+class RequestProfile(ABC):
+    """Profiles one request, including the threads that call the ZenML server on its behalf."""
+
+    suffix = ""
+
+    def __init__(self):
+        self.profile_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.active = False
+        self.started = None
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.active = True
+
+    def stop(self):
+        self.active = False
+        self.duration = time.perf_counter() - self.started
+
+    @contextmanager
+    def track_thread(self):
+        """Adds the calling thread to the profile for the duration of the `with` block."""
+        yield
+
+    @abstractmethod
+    def write(self, path: str):
+        """Writes the profile to `path`, in the format its `suffix` stands for."""
+
+
+class CProfileProfile(RequestProfile):
+    """Deterministic profile of every function call, written as a pstats file."""
+
+    suffix = ".pstats"
+
+    def __init__(self):
+        super().__init__()
+        self._profiler = cProfile.Profile()
+        self._thread_profilers: List[cProfile.Profile] = []
+
+    def start(self):
+        self._profiler.enable()
+        super().start()
+
+    def stop(self):
+        self._profiler.disable()
+        super().stop()
+
+    @contextmanager
+    def track_thread(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter.
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._thread_profilers.append(profiler)
+
+    def write(self, path: str):
+        stats = pstats.Stats(self._profiler)
+        with self._lock:
+            thread_profilers = list(self._thread_profilers)
+        for profiler in thread_profilers:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                # The thread did not make any profiled call.
+                continue
+        stats.dump_stats(path)
+
+
+class SamplingProfile(RequestProfile):
+    """
+    Statistical profile that samples the stacks of the request's threads at a fixed interval.
+
+    Written in the collapsed-stack format ('frame;frame;frame count' per line) that flame
+    graph tools such as flamegraph.pl and speedscope read. Every stack starts with the role
+    of its thread, so time spent handling the request and waiting for the ZenML server are
+    told apart.
+    """
+
+    suffix = ".collapsed"
+
+    def __init__(self, interval: float):
+        super().__init__()
+        self.interval = interval
+        self._stacks = Counter()
+        self._threads = {threading.get_ident(): "request"}
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+
+    def start(self):
+        super().start()
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+        super().stop()
+
+    @contextmanager
+    def track_thread(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = "upstream"
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads.pop(ident, None)
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, role in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._stacks[self._collapse(role, frame)] += 1
+
+    @staticmethod
+    def _collapse(role: str, frame) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        labels.append(role)
+        return ";".join(reversed(labels))
+
+
+def run_profiled(fn: Callable, *args, **kwargs):
+    """
+    Calls `fn`, adding the calling thread to the profile of the request it works for, if any.
+
+    Meant for worker threads that run in a copy of the request's context; without an active
+    profile this costs a single context variable lookup.
+    """
+    profile = _current_profile.get()
+    if profile is None or not profile.active:
+        return fn(*args, **kwargs)
+    with profile.track_thread():
+        return fn(*args, **kwargs)
+
+
+def _requested_mode() -> Optional[str]:
+    """Returns the profiling mode for the current request, or None if it should not be profiled."""
+    header = request.headers.get(PROFILE_HEADER, "").lower()
+    if header in MODES:
+        return header
+    if header in ("1", "true", "yes"):
+        return Config.PROFILING_MODE
+    if Config.PROFILING_SAMPLE_RATE > 0 and random.random() < Config.PROFILING_SAMPLE_RATE:
+        if not Config.PROFILING_ENDPOINTS or request.endpoint in Config.PROFILING_ENDPOINTS:
+            return Config.PROFILING_MODE
+    return None
+
+
+def _new_profile(mode: str) -> RequestProfile:
+    if mode == "sampling":
+        return SamplingProfile(Config.PROFILING_SAMPLE_INTERVAL)
+    return CProfileProfile()
+
+
+def _save(profile: RequestProfile, status_code: Optional[int]):
+    """Writes a finished profile and its metadata to the profile directory, then prunes old profiles."""
+    os.makedirs(Config.PROFILING_DIR, exist_ok=True)
+    file_name = profile.profile_id + profile.suffix
+    profile.write(os.path.join(Config.PROFILING_DIR, file_name))
+    metadata = {
+        "id": profile.profile_id,
+        "file": file_name,
+        "mode": "sampling" if isinstance(profile, SamplingProfile) else "cprofile",
+        "created_at": time.time(),
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status_code": status_code,
+        "duration": round(profile.duration, 6),
+    }
+    with open(os.path.join(Config.PROFILING_DIR, profile.profile_id + ".json"), "w") as f:
+        json.dump(metadata, f)
+    _prune(Config.PROFILING_MAX_PROFILES)
+
+
+def _prune(keep: int):
+    """Deletes all but the `keep` most recent profiles. Worker processes sharing the directory may race on this."""
+    for metadata in list_profiles()[keep:]:
+        for file_name in (metadata["file"], metadata["id"] + ".json"):
+            try:
+                os.remove(os.path.join(Config.PROFILING_DIR, file_name))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[dict]:
+    """Returns the metadata of the saved profiles, most recent first."""
+    try:
+        names = os.listdir(Config.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    # Profile ids start with a timestamp, so sorting by name sorts by age.
+    for name in sorted((n for n in names if n.endswith(".json")), reverse=True):
+        try:
+            with open(os.path.join(Config.PROFILING_DIR, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            # Pruned or still being written by another worker.
+            continue
+    return profiles
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    """Returns the metadata of a saved profile, or None if there is none with that id."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(Config.PROFILING_DIR, profile_id + ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _before_request():
+    if request.blueprint == "profiles":
+        return
+    mode = _requested_mode()
+    if mode is None:
+        return
+    profile = _new_profile(mode)
+    try:
+        profile.start()
+    except ValueError:
+        # Since Python 3.12, only one cProfile profiler can be active at a time.
+        logging.warning("Not profiling %s, another profile is in progress", request.path)
+        return
+    g.profile = profile
+    g.profile_token = _current_profile.set(profile)
+
+
+def _finish(profile: RequestProfile, status_code: Optional[int]):
+    profile.stop()
+    try:
+        _save(profile, status_code)
+    except Exception:
+        logging.exception("Saving profile `%s` failed", profile.profile_id)
+
+
+def _after_request(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+    _finish(profile, response.status_code)
+    response.headers[PROFILE_ID_HEADER] = profile.profile_id
+    return response
+
+
+def _teardown_request(exc):
+    # Requests that raised skip `_after_request`, but their profile is still worth saving.
+    profile = g.pop("profile", None)
+    if profile is not None:
+        _finish(profile, None)
+    token = g.pop("profile_token", None)
+    if token is not None:
+        _current_profile.reset(token)
+
+
+def init_app(app: Flask):
+    """
+    Profiles the requests selected by the X-ZenML-Profile header or PROFILING_SAMPLE_RATE.
+
+    Does nothing unless PROFILING_ENABLED is set, so the hooks cost nothing by default.
+    Must run before the other extensions so that their hooks are part of the profile.
+    """
+    if not Config.PROFILING_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
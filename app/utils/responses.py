@@ -0,0 +1,75 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import gzip
+import hashlib
+
+from flask import Response, current_app, request
+from app.utils.serializers import encode_json
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available.
+    brotli = None
+
+
+def _negotiate_encoding(body_size: int):
+    """Picks the content coding for a body of `body_size` bytes from the request's Accept-Encoding."""
+    if body_size < Config.COMPRESSION_MIN_SIZE:
+        return None
+    if brotli is not None and request.accept_encodings.quality("br") > 0:
+        return "br"
+    if request.accept_encodings.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def json_response(data, status: int = 200) -> Response:
+    """
+    Builds a cacheable JSON response.
+
+    The strong ETag is a SHA-256 of the body, which `encode_json` writes with
+    sorted keys so equal data always hashes the same. A matching If-None-Match
+    is answered with 304 Not Modified, and large bodies are brotli or gzip
+    compressed when the client accepts it.
+
+    Args:
+        data: The JSON-serializable payload.
+        status: The status code of a full response.
+
+    Returns:
+        The 200/304 response.
+    """
+    body = encode_json(data)
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    encoding = _negotiate_encoding(len(body))
+    # Each content coding is a different representation, so it gets its own strong ETag.
+    etag = f"{digest}-{encoding}" if encoding else digest
+
+    if status == 200 and (request.if_none_match.contains_weak(etag) or request.if_none_match.contains_weak(digest)):
+        response = current_app.response_class(status=304)
+    else:
+        if encoding == "br":
+            body = brotli.compress(body, quality=Config.BROTLI_QUALITY)
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+        response = current_app.response_class(body, status=status, mimetype="application/json")
+        if encoding:
+            response.content_encoding = encoding
+
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    # Responses are per user; clients may keep them but must revalidate before reuse.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -10,7 +10,16 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 #  or implied. See the License for the specific language governing
 #  permissions and limitations under the License.
-from app.models.stack import StackComponentModel
+import json
+from enum import Enum
+from typing import Dict, Optional, Set
+
+from app.models.stack import StackComponentModel, StackModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is the fallback.
+    orjson = None
 
 
 def serialize_stack_component(component) -> StackComponentModel:
@@ -34,4 +43,150 @@ def serialize_stack_component(component) -> StackComponentModel:
         name=component.name,
         flavor=component.flavor,
         type=component.type,
-    )
\ No newline at end of file
+    )
+
+
+def serialize_stack(stack) -> StackModel:
+    """
+    Serializes a ZenML stack object to a StackModel instance.
+
+    Parameters:
+        stack: The hydrated stack to serialize. Expected to have 'id', 'name'
+               and 'components' attributes.
+
+    Returns:
+        A StackModel instance with every component of the stack serialized
+        via `serialize_stack_component`.
+    """
+    return StackModel(
+        id=stack.id,
+        name=stack.name,
+        components={
+            component_type: [serialize_stack_component(c) for c in components]
+            for component_type, components in stack.components.items()
+        },
+    )
+
+
+def _enum_value(value):
+    """Returns the value of an enum member, as pydantic does when validating it into a `str` field."""
+    return value.value if isinstance(value, Enum) else value
+
+
+def component_to_dict(component) -> dict:
+    """
+    Serializes a ZenML stack component straight to a dictionary.
+
+    Produces exactly `serialize_stack_component(component).dict()` but skips
+    the pydantic model and the re-validation of data the ZenML server has
+    already validated.
+    """
+    return {
+        "id": component.id,
+        "name": component.name,
+        "flavor": component.flavor,
+        "type": _enum_value(component.type),
+    }
+
+
+def stack_to_dict(stack) -> dict:
+    """
+    Serializes a hydrated ZenML stack straight to a dictionary.
+
+    Produces exactly `serialize_stack(stack).dict()`, the schema of
+    `app.models.stack.StackModel`, without building any pydantic model.
+    """
+    return {
+        "id": stack.id,
+        "name": stack.name,
+        "components": {
+            _enum_value(component_type): [component_to_dict(c) for c in components]
+            for component_type, components in stack.components.items()
+        },
+    }
+
+
+def encode_json(data) -> bytes:
+    """
+    Encodes serialized stacks (or any JSON-compatible data with UUIDs) to JSON bytes.
+
+    Keys are sorted so that equal data always yields equal bytes. orjson is used
+    when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=str, sort_keys=True, separators=(",", ":")).encode()
+
+
+def summarize_stack(stack) -> dict:
+    """
+    Serializes only the fields of a ZenML stack that are available without hydration.
+
+    Parameters:
+        stack: The (possibly unhydrated) stack to serialize.
+
+    Returns:
+        A dictionary with the 'id' and 'name' of the stack.
+    """
+    return {"id": stack.id, "name": stack.name}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, Optional[Set[str]]]]:
+    """
+    Parses a sparse fieldset such as `id,name,components.flavor`.
+
+    Top-level names refer to StackModel fields, and `components.<name>`
+    selects individual StackComponentModel fields.
+
+    Parameters:
+        fields: The comma separated fieldset, or None if none was requested.
+
+    Returns:
+        None if no fieldset was requested, otherwise a mapping of StackModel
+        field names to the selected component fields (None meaning all of them).
+
+    Raises:
+        ValueError: If the fieldset references an unknown field.
+    """
+    if not fields:
+        return None
+
+    selected = {}
+    for field in filter(None, (f.strip() for f in fields.split(","))):
+        name, _, sub_field = field.partition(".")
+        if name not in StackModel.__fields__:
+            raise ValueError(f"Unknown stack field `{field}`")
+        if sub_field and (name != "components" or sub_field not in StackComponentModel.__fields__):
+            raise ValueError(f"Unknown stack component field `{field}`")
+
+        if not sub_field:
+            selected[name] = None
+        elif selected.get(name, set()) is not None:
+            selected.setdefault(name, set()).add(sub_field)
+    return selected or None
+
+
+def select_fields(stack_data: dict, fields: Optional[Dict[str, Optional[Set[str]]]]) -> dict:
+    """
+    Restricts a serialized stack to the fieldset returned by `parse_fields`.
+
+    Parameters:
+        stack_data: The serialized stack, as produced by `stack_to_dict` or `summarize_stack`.
+        fields: The parsed fieldset, or None to keep every field.
+
+    Returns:
+        A dictionary containing only the requested fields.
+    """
+    if fields is None:
+        return stack_data
+
+    selected = {}
+    for name, sub_fields in fields.items():
+        value = stack_data[name]
+        if name == "components" and sub_fields is not None:
+            value = {
+                component_type: [{f: c[f] for f in sub_fields} for c in components]
+                for component_type, components in value.items()
+            }
+        selected[name] = value
+    return selected
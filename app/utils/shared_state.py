@@ -0,0 +1,123 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from config import Config
+
+
+class SharedState:
+    """
+    SQLite database shared by the worker processes of one service instance.
+
+    Holds the state that has to look the same whichever worker answers a request, such as
+    background jobs and the generation counters that tell workers their in-memory caches
+    are outdated. Modules register the tables they need with `register_schema`; they are
+    created on first use, so importing a module never touches the file. Every thread of
+    every process gets its own connection, as SQLite connections must not cross a fork.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._schemas: List[str] = [
+            "CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        ]
+        self._local = threading.local()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, "state.sqlite3")
+
+    def register_schema(self, *statements: str) -> None:
+        """Adds `CREATE ... IF NOT EXISTS` statements that are run on every connection before it is used."""
+        self._schemas.extend(statement for statement in statements if statement not in self._schemas)
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns the calling thread's connection, in autocommit mode, creating the database if needed."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            # A connection inherited from the parent process is abandoned, never closed or used.
+            # The directory is private as jobs keep their results here, which can hold access tokens.
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # WAL lets the workers read while one of them writes.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection, local.pid, local.schemas = connection, os.getpid(), 0
+        if local.schemas < len(self._schemas):
+            for statement in self._schemas[local.schemas:]:
+                local.connection.execute(statement)
+            local.schemas = len(self._schemas)
+        return local.connection
+
+    @contextmanager
+    def transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Runs the `with` block in a transaction.
+
+        A write transaction makes other writers wait for it; a read-only one sees a consistent
+        snapshot of the database without blocking anyone.
+        """
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE" if write else "BEGIN DEFERRED")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def generation(self, name: str) -> int:
+        """Returns the current value of a generation counter, 0 if it was never bumped."""
+        row = self.connection().execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def bump(self, name: str) -> int:
+        """
+        Increments a generation counter, telling every worker that the data it guards changed.
+
+        Returns:
+            The new generation.
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                "INSERT INTO generations (name, value) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+            return connection.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()[0]
+
+    def wipe(self) -> None:
+        """Deletes the shared state of an earlier run. Must be called before any worker starts."""
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def process_alive(pid: int) -> bool:
+    """Returns whether a process with the given id is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+shared_state = SharedState(Config.SHARED_STATE_DIR)
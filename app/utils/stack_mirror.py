@@ -0,0 +1,310 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.utils.serializers import encode_json
+from app.utils.shared_state import SharedState, shared_state
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS mirror_state ("
+    "store_url TEXT NOT NULL, user_id TEXT NOT NULL, epoch TEXT NOT NULL, sequence INTEGER NOT NULL, "
+    "horizon INTEGER NOT NULL, watermark TEXT, synced_at REAL, full_synced_at REAL, generation INTEGER, "
+    "lease_owner TEXT, lease_until REAL, PRIMARY KEY (store_url, user_id))",
+    "CREATE TABLE IF NOT EXISTS mirror_stacks ("
+    "store_url TEXT NOT NULL, user_id TEXT NOT NULL, stack_id TEXT NOT NULL, added_at INTEGER NOT NULL, "
+    "changed_at INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (store_url, user_id, stack_id))",
+    "CREATE INDEX IF NOT EXISTS mirror_stacks_changed ON mirror_stacks (store_url, user_id, changed_at)",
+    "CREATE TABLE IF NOT EXISTS mirror_tombstones ("
+    "store_url TEXT NOT NULL, user_id TEXT NOT NULL, stack_id TEXT NOT NULL, added_at INTEGER NOT NULL, "
+    "removed_at INTEGER NOT NULL, PRIMARY KEY (store_url, user_id, stack_id))",
+    "CREATE INDEX IF NOT EXISTS mirror_tombstones_removed ON mirror_tombstones (store_url, user_id, removed_at)",
+)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a change feed cursor cannot be parsed."""
+
+
+class MirrorState(NamedTuple):
+    """The sync bookkeeping of a mirror."""
+
+    epoch: str
+    sequence: int
+    # Removals at or before this sequence number have been forgotten.
+    horizon: int
+    # Highest `updated` timestamp seen on the server, where the next incremental sync starts.
+    watermark: Optional[str]
+    # Wall clock times of the last sync and the last full sync.
+    synced_at: Optional[float]
+    full_synced_at: Optional[float]
+    # Generation of the stacks at the last sync.
+    generation: Optional[int]
+
+
+class StackMirror:
+    """
+    Copy of a user's serialized stacks that records every change with a sequence number.
+
+    Every stack that is added or changes gets the next sequence number, and
+    removed stacks leave a tombstone, so `changes` can tell a client exactly
+    what happened after the sequence number it last saw. The mirror lives in
+    the shared state, so a cursor handed out by one worker process is valid in
+    all of them. Cursors embed an epoch that is unique to the mirror, so cursors
+    handed out before the shared state was cleared, e.g. by a restart, are
+    detected and answered with a full reset.
+    """
+
+    def __init__(self, shared: SharedState, store_url: str, user_id, max_tombstones: int):
+        self.shared = shared
+        self.store_url = store_url
+        self.user_id = str(user_id)
+        self.max_tombstones = max_tombstones
+        # Lets only one thread of this process sync the mirror at a time; the sync lease does so across processes.
+        self.sync_lock = threading.Lock()
+        shared.register_schema(*SCHEMA)
+
+    def __len__(self) -> int:
+        return self.shared.connection().execute(
+            "SELECT COUNT(*) FROM mirror_stacks WHERE store_url = ? AND user_id = ?", self._key
+        ).fetchone()[0]
+
+    def __contains__(self, stack_id: str) -> bool:
+        return self.shared.connection().execute(
+            "SELECT 1 FROM mirror_stacks WHERE store_url = ? AND user_id = ? AND stack_id = ?",
+            self._key + (stack_id,),
+        ).fetchone() is not None
+
+    @property
+    def _key(self) -> Tuple[str, str]:
+        return self.store_url, self.user_id
+
+    def state(self) -> MirrorState:
+        """Returns the sync bookkeeping of the mirror, creating the mirror if needed."""
+        with self.shared.transaction() as connection:
+            return self._state(connection)
+
+    def snapshot(self) -> List[dict]:
+        """Returns every mirrored stack."""
+        rows = self.shared.connection().execute(
+            "SELECT data FROM mirror_stacks WHERE store_url = ? AND user_id = ? ORDER BY changed_at", self._key
+        )
+        return [json.loads(data) for data, in rows]
+
+    def apply(self, stacks_data: Iterable[dict],
+              present_ids: Optional[Set[str]] = None) -> Tuple[List[dict], List[str]]:
+        """
+        Records fetched stacks and, if the ids of every existing stack are known, removed ones.
+
+        Args:
+            stacks_data: Serialized stacks fetched from the server. Stacks equal to their
+                mirrored version are not recorded as changed.
+            present_ids: The ids of all stacks that currently exist, or None if only
+                `stacks_data` was fetched.
+
+        Returns:
+            The stacks that were added or changed and the ids of the stacks that were removed.
+        """
+        changed, removed = [], []
+        with self.shared.transaction() as connection:
+            state = self._state(connection)
+            sequence, horizon = state.sequence, state.horizon
+            for stack_data in stacks_data:
+                stack_id = str(stack_data["id"])
+                data = encode_json(stack_data)
+                row = connection.execute(
+                    "SELECT added_at, data FROM mirror_stacks WHERE store_url = ? AND user_id = ? AND stack_id = ?",
+                    self._key + (stack_id,),
+                ).fetchone()
+                if row is not None and row[1] == data:
+                    continue
+                sequence += 1
+                connection.execute(
+                    "INSERT OR REPLACE INTO mirror_stacks (store_url, user_id, stack_id, added_at, changed_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    self._key + (stack_id, sequence if row is None else row[0], sequence, data),
+                )
+                connection.execute(
+                    "DELETE FROM mirror_tombstones WHERE store_url = ? AND user_id = ? AND stack_id = ?",
+                    self._key + (stack_id,),
+                )
+                changed.append(stack_data)
+
+            if present_ids is not None:
+                rows = connection.execute(
+                    "SELECT stack_id, added_at FROM mirror_stacks WHERE store_url = ? AND user_id = ? "
+                    "ORDER BY changed_at", self._key,
+                ).fetchall()
+                for stack_id, added_at in rows:
+                    if stack_id in present_ids:
+                        continue
+                    sequence += 1
+                    connection.execute(
+                        "DELETE FROM mirror_stacks WHERE store_url = ? AND user_id = ? AND stack_id = ?",
+                        self._key + (stack_id,),
+                    )
+                    connection.execute(
+                        "INSERT OR REPLACE INTO mirror_tombstones (store_url, user_id, stack_id, added_at, removed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        self._key + (stack_id, added_at, sequence),
+                    )
+                    removed.append(stack_id)
+                # The newest of the tombstones beyond the limit; it and all older ones are forgotten.
+                row = connection.execute(
+                    "SELECT removed_at FROM mirror_tombstones WHERE store_url = ? AND user_id = ? "
+                    "ORDER BY removed_at DESC LIMIT 1 OFFSET ?", self._key + (self.max_tombstones,),
+                ).fetchone()
+                if row is not None:
+                    horizon = row[0]
+                    connection.execute(
+                        "DELETE FROM mirror_tombstones WHERE store_url = ? AND user_id = ? AND removed_at <= ?",
+                        self._key + (horizon,),
+                    )
+            connection.execute(
+                "UPDATE mirror_state SET sequence = ?, horizon = ? WHERE store_url = ? AND user_id = ?",
+                (sequence, horizon) + self._key,
+            )
+        return changed, removed
+
+    def mark_synced(self, watermark: Optional[str], generation: int, full: bool) -> None:
+        """Records a completed sync, which `state` reports from then on."""
+        now = time.time()
+        with self.shared.transaction() as connection:
+            self._state(connection)
+            connection.execute(
+                "UPDATE mirror_state SET watermark = ?, synced_at = ?, generation = ?, "
+                "full_synced_at = CASE WHEN ? THEN ? ELSE full_synced_at END WHERE store_url = ? AND user_id = ?",
+                (watermark, now, generation, full, now) + self._key,
+            )
+
+    def acquire_sync_lease(self, duration: float) -> Optional[str]:
+        """
+        Claims the right to sync the mirror for `duration` seconds, unless another process or thread holds it.
+
+        Returns:
+            The lease token to pass to `release_sync_lease`, or None if the lease is taken.
+        """
+        token = f"{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex[:8]}"
+        now = time.time()
+        with self.shared.transaction() as connection:
+            self._state(connection)
+            claimed = connection.execute(
+                "UPDATE mirror_state SET lease_owner = ?, lease_until = ? "
+                "WHERE store_url = ? AND user_id = ? AND (lease_owner IS NULL OR lease_until < ?)",
+                (token, now + duration) + self._key + (now,),
+            ).rowcount
+        return token if claimed else None
+
+    def release_sync_lease(self, token: str) -> None:
+        with self.shared.transaction() as connection:
+            connection.execute(
+                "UPDATE mirror_state SET lease_owner = NULL, lease_until = NULL "
+                "WHERE store_url = ? AND user_id = ? AND lease_owner = ?",
+                self._key + (token,),
+            )
+
+    def changes(self, cursor: Optional[str]) -> dict:
+        """
+        Lists the changes made after `cursor`.
+
+        Returns:
+            A dictionary with the new 'cursor', the stacks 'added' and 'updated' and the ids
+            of the stacks 'removed' since `cursor`. 'reset' is true if the cursor was missing,
+            belongs to another mirror or is too old; 'added' then holds every stack and the
+            client has to drop everything it knew.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        epoch, since = self._parse_cursor(cursor)
+        with self.shared.transaction(write=False) as connection:
+            state = self._existing_state(connection)
+            if state is not None:
+                return self._changes(connection, state, epoch, since)
+        # Only the first use of a mirror creates it, which takes a write transaction.
+        self.state()
+        with self.shared.transaction(write=False) as connection:
+            return self._changes(connection, self._existing_state(connection), epoch, since)
+
+    def _changes(self, connection, state: MirrorState, epoch: Optional[str], since: int) -> dict:
+        new_cursor = f"{state.epoch}-{state.sequence}"
+        if epoch != state.epoch or since < state.horizon or since > state.sequence:
+            rows = connection.execute(
+                "SELECT data FROM mirror_stacks WHERE store_url = ? AND user_id = ? ORDER BY changed_at", self._key
+            )
+            return {
+                "cursor": new_cursor,
+                "reset": True,
+                "added": [json.loads(data) for data, in rows],
+                "updated": [],
+                "removed": [],
+            }
+
+        added, updated = [], []
+        rows = connection.execute(
+            "SELECT added_at, data FROM mirror_stacks WHERE store_url = ? AND user_id = ? AND changed_at > ? "
+            "ORDER BY changed_at", self._key + (since,),
+        )
+        for added_at, data in rows:
+            (added if added_at > since else updated).append(json.loads(data))
+        removed = [stack_id for stack_id, in connection.execute(
+            "SELECT stack_id FROM mirror_tombstones WHERE store_url = ? AND user_id = ? "
+            "AND removed_at > ? AND added_at <= ? ORDER BY removed_at", self._key + (since, since),
+        )]
+        return {"cursor": new_cursor, "reset": False, "added": added, "updated": updated, "removed": removed}
+
+    def _existing_state(self, connection) -> Optional[MirrorState]:
+        row = connection.execute(
+            "SELECT epoch, sequence, horizon, watermark, synced_at, full_synced_at, generation FROM mirror_state "
+            "WHERE store_url = ? AND user_id = ?", self._key,
+        ).fetchone()
+        return None if row is None else MirrorState(*row)
+
+    def _state(self, connection) -> MirrorState:
+        """Returns the state of the mirror, creating an empty mirror first if needed. Needs a write transaction."""
+        state = self._existing_state(connection)
+        if state is None:
+            state = MirrorState(uuid.uuid4().hex[:12], 0, 0, None, None, None, None)
+            connection.execute(
+                "INSERT INTO mirror_state (store_url, user_id, epoch, sequence, horizon) VALUES (?, ?, ?, 0, 0)",
+                self._key + (state.epoch,),
+            )
+        return state
+
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int]:
+        """Splits a cursor into its epoch and sequence number; a missing cursor has no epoch."""
+        if not cursor:
+            return None, 0
+        epoch, _, sequence = cursor.rpartition("-")
+        if not epoch or not sequence.isdigit():
+            raise InvalidCursorError(f"Invalid cursor `{cursor}`")
+        return epoch, int(sequence)
+
+
+_mirrors: Dict[tuple, StackMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(store_url: str, user_id, max_tombstones: int) -> StackMirror:
+    """Returns the stack mirror of a user on a store, which is created empty on first use."""
+    key = (store_url, str(user_id))
+    with _mirrors_lock:
+        mirror = _mirrors.get(key)
+        if mirror is None:
+            mirror = _mirrors[key] = StackMirror(shared_state, store_url, user_id, max_tombstones)
+        return mirror
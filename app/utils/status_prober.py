@@ -0,0 +1,173 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.models.server_status import ServerStatusModel
+from app.utils.global_config import fetch_store_info
+from app.utils.persistent_cache import warm_cache
+from config import Config
+
+
+def probe_server_status() -> ServerStatusModel:
+    """Builds the current status of the ZenML server, including connectivity and store information."""
+    from zenml.zen_server.utils import get_active_server_details
+
+    store_info = fetch_store_info()
+    store_type = store_info["store_type"]
+    store_url = store_info["store_url"]
+
+    try:
+        url, port = get_active_server_details()
+        parsed_url = urlparse(url)
+        is_connected = False if store_type == "sql" else True
+
+        return ServerStatusModel(
+            is_connected=is_connected,
+            host=parsed_url.hostname,
+            port=parsed_url.port if parsed_url.port else port,
+            store_type=store_type if store_type == "sql" else None,
+            store_url=store_url if store_type == "sql" else None,
+        )
+    except RuntimeError:
+        return ServerStatusModel(
+            is_connected=False,
+            host=None,
+            port=None,
+            store_type=store_type if store_type == "sql" else None,
+            store_url=store_url if store_type == "sql" else None,
+        )
+
+
+def load_persisted_status() -> Optional[Tuple[ServerStatusModel, float]]:
+    """Returns the status snapshot persisted for the current store, e.g. before a restart, and its age."""
+    persisted = warm_cache.get_with_age(fetch_store_info()["store_url"], "status")
+    return (ServerStatusModel(**persisted[0]), persisted[1]) if persisted is not None else None
+
+
+def persist_status(snapshot: ServerStatusModel):
+    """Persists a status snapshot for the current store."""
+    warm_cache.set(fetch_store_info()["store_url"], "status", snapshot.dict())
+
+
+def tenant_server_status(tenant) -> ServerStatusModel:
+    """Builds the status of a tenant's ZenML server from its in-memory configuration, without any I/O."""
+    parsed_url = urlparse(tenant.url)
+    return ServerStatusModel(
+        is_connected=True,
+        host=parsed_url.hostname,
+        port=parsed_url.port if parsed_url.port else (443 if parsed_url.scheme == "https" else 80),
+        store_type=None,
+        store_url=None,
+    )
+
+
+class StatusProber:
+    """
+    Refreshes a server status snapshot in a background thread.
+
+    The probe runs every `interval` seconds, shifted by up to `jitter` seconds
+    so that workers started together do not probe in lockstep. Readers get
+    the latest snapshot without any I/O and can block until it changes.
+
+    If `load` returns a snapshot persisted by an earlier process (and its age),
+    it is served from the start and the first probe runs in the background;
+    `save` is called after every successful probe.
+    """
+
+    def __init__(self, probe: Callable[[], ServerStatusModel], interval: float, jitter: float,
+                 load: Optional[Callable[[], Optional[Tuple[ServerStatusModel, float]]]] = None,
+                 save: Optional[Callable[[ServerStatusModel], None]] = None):
+        self.interval = interval
+        self.jitter = jitter
+        self._probe = probe
+        self._load = load
+        self._save = save
+        self._snapshot = None
+        self._updated_at = None
+        self._version = 0
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def ensure_started(self):
+        """Takes a first snapshot and starts the background thread, unless it is already running."""
+        if self._thread is not None:
+            return
+        with self._condition:
+            if self._thread is not None:
+                return
+            persisted = self._load() if self._load is not None else None
+            if persisted is not None:
+                self._snapshot, age = persisted
+                self._updated_at = time.monotonic() - age
+                self._version += 1
+            self._thread = threading.Thread(
+                target=self._run, args=(persisted is not None,), name="status-prober", daemon=True
+            )
+        if persisted is None:
+            self.refresh()
+        self._thread.start()
+
+    def refresh(self):
+        """Probes the server now and publishes the result if it differs from the current snapshot."""
+        try:
+            snapshot = self._probe()
+        except Exception:
+            logging.exception("Server status probe failed")
+            return
+
+        with self._condition:
+            self._updated_at = time.monotonic()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                self._version += 1
+                self._condition.notify_all()
+        if self._save is not None:
+            self._save(snapshot)
+
+    def snapshot(self) -> Tuple[Optional[ServerStatusModel], float]:
+        """Returns the latest snapshot together with its age in seconds."""
+        with self._condition:
+            age = time.monotonic() - self._updated_at if self._updated_at is not None else 0.0
+            return self._snapshot, age
+
+    def wait_for_change(self, version: int, timeout: float) -> Tuple[Optional[ServerStatusModel], int]:
+        """
+        Blocks until the snapshot version differs from `version` or `timeout` elapses.
+
+        Returns:
+            The latest snapshot and its version.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version, timeout=timeout)
+            return self._snapshot, self._version
+
+    def _run(self, probe_first: bool):
+        if probe_first:
+            self.refresh()
+        while True:
+            time.sleep(max(0.0, self.interval + random.uniform(-self.jitter, self.jitter)))
+            self.refresh()
+
+
+status_prober = StatusProber(
+    probe=probe_server_status,
+    interval=Config.STATUS_PROBE_INTERVAL,
+    jitter=Config.STATUS_PROBE_JITTER,
+    load=load_persisted_status,
+    save=persist_status,
+)
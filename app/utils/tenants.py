@@ -0,0 +1,376 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import hashlib
+import hmac
+import json
+import logging
+import re
+import secrets
+import threading
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from flask import Flask, g, jsonify, request
+from app.utils.shared_state import SharedState, shared_state
+from config import Config
+
+if TYPE_CHECKING:
+    from zenml.client import Client
+    from zenml.zen_stores.rest_zen_store import RestZenStore
+
+TENANT_HEADER = "X-ZenML-Tenant"
+TENANT_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+# Endpoints that may name a tenant that is not registered yet, since connecting registers it.
+REGISTERING_ENDPOINTS = ("server_deployer.connect", "server_deployer.connect_status")
+
+# Name of the tenant selected by the current request, if any.
+_current_tenant_name: ContextVar[Optional[str]] = ContextVar("zenml_tenant", default=None)
+
+# Generation bumped by every registration or removal of a tenant.
+TENANTS_GENERATION = "tenants"
+
+# Keys sealing the API tokens kept in the shared state. They only ever live in memory and are created
+# when the app is imported, which gunicorn does once in the master (`preload_app`), so every worker
+# inherits them. Registrations never outlive the processes anyway, as the shared state is wiped on startup.
+_ENCRYPTION_KEY = secrets.token_bytes(32)
+_MAC_KEY = secrets.token_bytes(32)
+
+
+def _seal(secret: str) -> bytes:
+    """Encrypts and authenticates a secret with the in-memory keys, so it can be shared without being readable."""
+    nonce = secrets.token_bytes(16)
+    data = secret.encode()
+    stream = hashlib.shake_256(_ENCRYPTION_KEY + nonce).digest(len(data))
+    ciphertext = (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(len(data), "big")
+    return nonce + hmac.new(_MAC_KEY, nonce + ciphertext, hashlib.sha256).digest() + ciphertext
+
+
+def _unseal(sealed: bytes) -> str:
+    """
+    Decrypts a secret sealed by `_seal`.
+
+    Raises:
+        ValueError: If the secret was sealed with other keys, i.e. by a process not forked from this one's parent.
+    """
+    nonce, tag, ciphertext = sealed[:16], sealed[16:48], sealed[48:]
+    if not hmac.compare_digest(tag, hmac.new(_MAC_KEY, nonce + ciphertext, hashlib.sha256).digest()):
+        raise ValueError("The secret was sealed with other keys")
+    stream = hashlib.shake_256(_ENCRYPTION_KEY + nonce).digest(len(ciphertext))
+    return (int.from_bytes(ciphertext, "big") ^ int.from_bytes(stream, "big")).to_bytes(len(ciphertext), "big").decode()
+
+
+class UnknownTenantError(KeyError):
+    """Raised when a request selects a tenant that is not registered."""
+
+
+class TenantConfiguration:
+    """
+    In-memory stand-in for ZenML's client configuration file, holding a tenant's active workspace and stack.
+
+    It implements the attributes and setters `Client` uses on its local configuration, so
+    activating a stack for a tenant never writes a configuration file.
+    """
+
+    def __init__(self, workspace, stack):
+        self._active_workspace = None
+        self.active_workspace_id = None
+        self._active_stack = None
+        self.active_stack_id = None
+        # Generation of the tenant's shared active stack this configuration reflects.
+        self.active_stack_generation = 0
+        self.set_active_workspace(workspace)
+        self.set_active_stack(stack)
+
+    @property
+    def active_workspace(self):
+        return self._active_workspace
+
+    def set_active_workspace(self, workspace):
+        self._active_workspace = workspace
+        self.active_workspace_id = workspace.id
+
+    def set_active_stack(self, stack):
+        self._active_stack = stack
+        self.active_stack_id = stack.id
+
+
+class Tenant:
+    """
+    A ZenML server served to one team, with its own store connection, client and active stack.
+
+    Everything is held in memory and built on first use, so serving a tenant never reads
+    or rewrites ZenML's global configuration. Re-registering a tenant replaces the object,
+    which lets requests still using the previous one finish undisturbed.
+    """
+
+    def __init__(self, name: str, url: str, api_token: str, verify_ssl=True):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.api_token = api_token
+        self.verify_ssl = verify_ssl
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def store_info(self) -> dict:
+        return {"store_type": "rest", "store_url": self.url}
+
+    @property
+    def zen_store(self) -> "RestZenStore":
+        return self.client.zen_store
+
+    @property
+    def configuration(self) -> TenantConfiguration:
+        """Returns the in-memory configuration holding the tenant's active workspace and stack."""
+        return self.client._config
+
+    @property
+    def client(self) -> "Client":
+        """Returns the tenant's client, connecting to its server on first use."""
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+                client = self._client
+        return client
+
+    def reset(self):
+        """Drops the tenant's client and closes its connections."""
+        with self._lock:
+            session = getattr(self._client.zen_store, "_session", None) if self._client is not None else None
+            if session is not None:
+                session.close()
+            self._client = None
+
+    def _build_client(self) -> "Client":
+        from zenml.client import Client
+        from zenml.zen_stores.rest_zen_store import RestZenStore, RestZenStoreConfiguration
+        from app.utils.client_pool import mount_connection_pool
+
+        class TenantClient(Client):
+            """A ZenML client bound to one store and an in-memory configuration rather than the global ones."""
+
+            def __init__(self, zen_store: RestZenStore, configuration: TenantConfiguration):
+                # Passing arguments makes the Client metaclass build a separate instance
+                # instead of returning the process-wide singleton.
+                self._root = None
+                self._config = configuration
+                self._zen_store = zen_store
+
+            @property
+            def zen_store(self) -> RestZenStore:
+                return self._zen_store
+
+        store = RestZenStore(
+            config=RestZenStoreConfiguration(
+                type="rest", url=self.url, api_token=self.api_token, verify_ssl=self.verify_ssl
+            ),
+            skip_default_registrations=True,
+        )
+        mount_connection_pool(store.session, Config.CLIENT_POOL_SIZE)
+        workspace, stack = store.validate_active_config(config_name=f"tenant `{self.name}`")
+        # Lazily hydrating a model goes through the global client, so the stack is hydrated here.
+        stack = store.get_stack(stack.id, hydrate=True)
+        return TenantClient(store, TenantConfiguration(workspace, stack))
+
+
+class TenantRegistry:
+    """
+    The tenants this service can route requests to, by name.
+
+    Tenants configured statically are merged with those registered or removed at runtime,
+    which are kept in the shared state so that every worker process routes a tenant the
+    same way. Lookups only read this process's dictionary of `Tenant` objects; `refresh`,
+    called once per request selecting a tenant, reloads it when the tenants generation
+    shows that a registration changed. Every registration bumps the tenant's version, and
+    a reload only rebuilds the `Tenant` objects of newer versions, keeping the clients and
+    connections of the others. API tokens are stored sealed with keys held in memory.
+    """
+
+    def __init__(self, shared: SharedState, static: Dict[str, dict]):
+        for name in static:
+            if not TENANT_NAME.match(name):
+                raise ValueError(f"Invalid tenant name `{name}`")
+        self.shared = shared
+        # Static tenants have version 0, so any registration under their name replaces them.
+        self._static = {name: (0, Tenant(name, **settings)) for name, settings in static.items()}
+        # Name -> (version, tenant) of every tenant, swapped as a whole on reload so lookups need no lock.
+        self._tenants: Dict[str, Tuple[int, Tenant]] = dict(self._static)
+        self._generation = 0
+        self._write_lock = threading.Lock()
+        shared.register_schema(
+            "CREATE TABLE IF NOT EXISTS tenants ("
+            "name TEXT PRIMARY KEY, url TEXT, api_token BLOB, verify_ssl TEXT, "
+            "removed INTEGER NOT NULL, version INTEGER NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS tenant_active_stacks (name TEXT PRIMARY KEY, stack_id TEXT NOT NULL)",
+        )
+
+    def refresh(self) -> None:
+        """Reloads the registrations if another worker process changed them; one read of the shared state otherwise."""
+        generation = self.shared.generation(TENANTS_GENERATION)
+        if generation == self._generation:
+            return
+        with self._write_lock:
+            rows = self.shared.connection().execute(
+                "SELECT name, url, api_token, verify_ssl, removed, version FROM tenants"
+            ).fetchall()
+            tenants = dict(self._static)
+            for name, url, api_token, verify_ssl, removed, version in rows:
+                if removed:
+                    tenants.pop(name, None)
+                    continue
+                cached = self._tenants.get(name)
+                if cached is not None and cached[0] == version:
+                    tenants[name] = cached
+                    continue
+                try:
+                    token = _unseal(api_token)
+                except ValueError:
+                    logging.error(f"Ignoring tenant `{name}`, registered by a process that does not share this "
+                                  f"one's keys; workers must be forked from one preloaded app")
+                    tenants.pop(name, None)
+                    continue
+                tenants[name] = (version, Tenant(name, url, token, json.loads(verify_ssl)))
+            self._tenants = tenants
+            self._generation = max(self._generation, generation)
+
+    def get(self, name: str) -> Tenant:
+        """
+        Returns the tenant as of the last `refresh`.
+
+        Raises:
+            UnknownTenantError: If no tenant with that name is registered.
+        """
+        cached = self._tenants.get(name)
+        if cached is None:
+            raise UnknownTenantError(f"Unknown tenant `{name}`")
+        return cached[1]
+
+    def register(self, name: str, url: str, api_token: str, verify_ssl=True) -> Tenant:
+        """Adds a tenant, or points an existing one at a new server or token, in every worker process."""
+        if not TENANT_NAME.match(name):
+            raise ValueError(f"Invalid tenant name `{name}`")
+        self._write(name, url, _seal(api_token), json.dumps(verify_ssl), removed=False)
+        return self.get(name)
+
+    def remove(self, name: str):
+        """Forgets a tenant in every worker process. Requests still using it finish on its existing client."""
+        self._write(name, None, None, None, removed=True)
+
+    def share_active_stack(self, name: str, stack_id) -> None:
+        """Records the active stack of a tenant for the other worker processes, which have no configuration file."""
+        with self.shared.transaction() as connection:
+            connection.execute(
+                "INSERT INTO tenant_active_stacks (name, stack_id) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET stack_id = excluded.stack_id",
+                (name, str(stack_id)),
+            )
+
+    def shared_active_stack(self, name: str) -> Optional[str]:
+        """Returns the id of the active stack last recorded for a tenant, or None if it was not changed."""
+        row = self.shared.connection().execute(
+            "SELECT stack_id FROM tenant_active_stacks WHERE name = ?", (name,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tenants
+
+    def names(self):
+        self.refresh()
+        return sorted(self._tenants)
+
+    def _write(self, name: str, url: Optional[str], api_token: Optional[bytes], verify_ssl: Optional[str],
+               removed: bool):
+        with self.shared.transaction() as connection:
+            connection.execute(
+                "INSERT INTO tenants (name, url, api_token, verify_ssl, removed, version) VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET url = excluded.url, api_token = excluded.api_token, "
+                "verify_ssl = excluded.verify_ssl, removed = excluded.removed, version = version + 1",
+                (name, url, api_token, verify_ssl, removed),
+            )
+            # The active stack of a new registration is the one its server reports.
+            connection.execute("DELETE FROM tenant_active_stacks WHERE name = ?", (name,))
+        self.shared.bump(TENANTS_GENERATION)
+        self.refresh()
+
+
+# Tenants from ZENML_TENANTS are not written to the shared state, so importing this module never touches it.
+tenants = TenantRegistry(shared_state, Config.ZENML_TENANTS)
+
+
+def current_tenant_name() -> Optional[str]:
+    """Returns the name of the tenant selected by the current request, or None for the default store."""
+    return _current_tenant_name.get()
+
+
+def current_tenant() -> Optional[Tenant]:
+    """
+    Returns the tenant selected by the current request, or None for the default store.
+
+    Raises:
+        UnknownTenantError: If the selected tenant is not registered.
+    """
+    name = _current_tenant_name.get()
+    return tenants.get(name) if name is not None else None
+
+
+class TenantPathMiddleware:
+    """
+    WSGI middleware routing `/t/<tenant>/...` to the regular routes with the tenant selected.
+
+    The prefix is moved to SCRIPT_NAME, so URLs built with `url_for` keep it.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith("/t/"):
+            name, _, rest = path[3:].partition("/")
+            if name:
+                environ["zenml.tenant"] = name
+                environ["SCRIPT_NAME"] = f"{environ.get('SCRIPT_NAME', '')}/t/{name}"
+                environ["PATH_INFO"] = "/" + rest
+        return self.wsgi_app(environ, start_response)
+
+
+def init_app(app: Flask):
+    """Selects the tenant named by the path prefix or the X-ZenML-Tenant header for each request."""
+    app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+
+    @app.before_request
+    def select_tenant():
+        path_name = request.environ.get("zenml.tenant")
+        header_name = request.headers.get(TENANT_HEADER)
+        if path_name and header_name and path_name != header_name:
+            return jsonify({"error": f"The path selects tenant `{path_name}` but {TENANT_HEADER} `{header_name}`"}), 400
+        name = path_name or header_name
+        if not name:
+            return None
+        if not TENANT_NAME.match(name):
+            return jsonify({"error": f"Invalid tenant name `{name}`"}), 400
+        # The only read of the shared state the tenant costs this request, unless a registration changed.
+        tenants.refresh()
+        if name not in tenants and request.endpoint not in REGISTERING_ENDPOINTS:
+            return jsonify({"error": f"Unknown tenant `{name}`"}), 404
+        g.tenant_token = _current_tenant_name.set(name)
+        return None
+
+    @app.teardown_request
+    def reset_tenant(_exc):
+        token = g.pop("tenant_token", None)
+        if token is not None:
+            _current_tenant_name.reset(token)
@@ -0,0 +1,189 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import contextvars
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict
+
+from flask import jsonify
+from requests.exceptions import RequestException
+from app.utils.metrics import UPSTREAM_LATENCY
+from app.utils.profiling import run_profiled
+from app.utils.tenants import current_tenant_name
+from config import Config
+
+# Exceptions that mean the ZenML server itself is unhealthy, as opposed to rejecting a request.
+UPSTREAM_FAILURES = (RequestException, OSError)
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when an upstream ZenML call is refused by an open circuit, times out or cannot reach the server."""
+
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Classic closed/open/half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are refused for `recovery_timeout` seconds. It then turns half-open
+    and lets up to `half_open_max_calls` trial calls through: one success
+    closes it again, one failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self.rejected_count = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Admits or refuses a call.
+
+        Raises:
+            UpstreamUnavailableError: If the circuit is open, or half-open with all trial slots taken.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected_count += 1
+                    raise UpstreamUnavailableError("ZenML server is unavailable (circuit open).", remaining)
+                self.state = self.HALF_OPEN
+                self._half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.rejected_count += 1
+                    raise UpstreamUnavailableError("ZenML server is unavailable (circuit half-open).", 1)
+                self._half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened_count += 1
+                    logging.warning("Opening the ZenML circuit breaker after %d failures", self.consecutive_failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Returns the breaker state and counters as a dictionary."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "opened_count": self.opened_count,
+                "rejected_count": self.rejected_count,
+            }
+
+
+def _new_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=Config.UPSTREAM_FAILURE_THRESHOLD,
+        recovery_timeout=Config.UPSTREAM_RECOVERY_TIMEOUT,
+        half_open_max_calls=Config.UPSTREAM_HALF_OPEN_MAX_CALLS,
+    )
+
+
+breaker = _new_breaker()
+
+# Every tenant gets its own breaker, so that one team's unavailable server does not cut off the others.
+tenant_breakers: Dict[str, CircuitBreaker] = {}
+_tenant_breakers_lock = threading.Lock()
+
+
+def current_breaker() -> CircuitBreaker:
+    """Returns the breaker guarding the server of the current request's tenant, or the default one."""
+    name = current_tenant_name()
+    if name is None:
+        return breaker
+    tenant_breaker = tenant_breakers.get(name)
+    if tenant_breaker is None:
+        with _tenant_breakers_lock:
+            tenant_breaker = tenant_breakers.setdefault(name, _new_breaker())
+    return tenant_breaker
+
+
+# Upstream calls run here so the caller can stop waiting once the timeout budget is spent.
+_executor = ThreadPoolExecutor(max_workers=Config.UPSTREAM_MAX_WORKERS, thread_name_prefix="upstream")
+
+
+def call_upstream(operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Calls the ZenML server through the circuit breaker of the current tenant with the timeout budget of `operation`.
+
+    Args:
+        operation: The name of the upstream operation, e.g. 'list_stacks'.
+        fn: The callable performing the upstream call.
+
+    Returns:
+        Whatever `fn` returns.
+
+    Raises:
+        UpstreamUnavailableError: If the circuit is open, the call exceeds its timeout or the server cannot be reached.
+    """
+    circuit = current_breaker()
+    circuit.before_call()
+    timeout = Config.UPSTREAM_TIMEOUTS.get(operation, Config.UPSTREAM_TIMEOUT)
+    started = time.perf_counter()
+    outcome = "success"
+    future = _executor.submit(contextvars.copy_context().run, run_profiled, fn, *args, **kwargs)
+    try:
+        result = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        outcome = "timeout"
+        circuit.record_failure()
+        raise UpstreamUnavailableError(f"ZenML server did not answer `{operation}` within {timeout:g} seconds.")
+    except UPSTREAM_FAILURES as e:
+        outcome = "failure"
+        circuit.record_failure()
+        raise UpstreamUnavailableError(f"ZenML server could not be reached for `{operation}`: {e}") from e
+    except Exception:
+        # The server answered, it just rejected the request.
+        outcome = "rejected"
+        circuit.record_success()
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe((operation, outcome), time.perf_counter() - started)
+    circuit.record_success()
+    return result
+
+
+def upstream_unavailable(err: UpstreamUnavailableError):
+    """Builds the fast 503 response returned while the ZenML server is unavailable."""
+    headers = {"Retry-After": str(max(1, math.ceil(err.retry_after)))} if err.retry_after else {}
+    return jsonify({"error": str(err)}), 503, headers
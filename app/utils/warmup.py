@@ -0,0 +1,59 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import importlib
+import logging
+import threading
+import time
+from typing import Dict
+
+# ZenML modules the routes import lazily, in the order a first request would need them.
+ZENML_MODULES = (
+    "zenml.constants",
+    "zenml.config.global_config",
+    "zenml.models",
+    "zenml.zen_stores.rest_zen_store",
+    "zenml.client",
+    "zenml.exceptions",
+    "zenml.utils.yaml_utils",
+    "zenml.zen_server.utils",
+    "zenml.zen_server.deploy.deployer",
+)
+
+# Seconds spent importing each module, excluding dependencies an earlier module already loaded.
+import_seconds: Dict[str, float] = {}
+
+
+def warm_imports():
+    """Imports the ZenML modules used by the routes and records how long each one took."""
+    for module in ZENML_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception:
+            logging.exception(f"Warming up `{module}` failed")
+            continue
+        import_seconds[module] = time.perf_counter() - started
+    logging.info(f"Warmed up ZenML imports in {sum(import_seconds.values()):.2f}s")
+
+
+def start_background_warmup() -> threading.Thread:
+    """
+    Warms up the ZenML imports in a daemon thread.
+
+    Meant to be called once the server socket is bound, so the process accepts
+    connections while the imports run; a request that needs a module sooner
+    simply waits on Python's import lock for it.
+    """
+    thread = threading.Thread(target=warm_imports, name="import-warmup", daemon=True)
+    thread.start()
+    return thread
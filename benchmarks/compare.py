@@ -0,0 +1,61 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import argparse
+import json
+
+METRICS = [
+    ("p50", lambda r: r["latency_ms"]["p50"]),
+    ("p95", lambda r: r["latency_ms"]["p95"]),
+    ("p99", lambda r: r["latency_ms"]["p99"]),
+    ("rps", lambda r: r["throughput_rps"]),
+    ("rss", lambda r: r["peak_rss_mb"]),
+]
+
+
+def _errors(result: dict) -> int:
+    return result.get("errors", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two reports written by benchmarks.endpoints.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    print(f"{'endpoint':<18}{'conc':>5}{'errors':>14}" + "".join(f"{name:>28}" for name, _ in METRICS))
+    flagged = False
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old_result, new_result = baseline[key], candidate[key]
+        errors = f"{_errors(old_result)} -> {_errors(new_result)}"
+        if _errors(old_result) or _errors(new_result):
+            # Measurements of a run with failed requests are not comparable.
+            flagged = True
+            print(f"{key[0]:<18}{key[1]:>5}{errors:>14}  ! requests failed, not compared")
+            continue
+        cells = []
+        for _, metric in METRICS:
+            old, new = metric(old_result), metric(new_result)
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            cells.append(f"{old:>8g} -> {new:<8g}{change:>6}")
+        print(f"{key[0]:<18}{key[1]:>5}{errors:>14}" + "".join(f"{cell:>28}" for cell in cells))
+    if flagged:
+        print("\n! marks scenarios with failed requests in either report; rerun them before comparing.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+import requests
+
+from benchmarks.fake_zenml_server import entity_id
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _stack_id(args) -> str:
+    return str(entity_id("stack", random.randrange(1, args.stacks)))
+
+
+# (name, method, path, payload factory). Reads run first so that `copy` growing the
+# data set does not skew them.
+SCENARIOS = [
+    ("stacks", "GET", "/stacks", None),
+    ("stacks_summary", "GET", "/stacks?hydrate=false", None),
+    ("stacks_ndjson", "GET", "/stacks?stream=ndjson", None),
+    ("components", "GET", "/components?type=orchestrator&flavor=local_docker", None),
+    ("active_stack", "GET", "/stacks/active_stack", None),
+    ("server_status", "GET", "/server_deployer/status", None),
+    ("api_token", "GET", "/zen_store/api_token", None),
+    ("rename", "POST", "/stacks/rename",
+     lambda args: {"stack_name_or_id": _stack_id(args), "new_stack_name": f"bench-{uuid.uuid4().hex[:12]}"}),
+    ("activate", "POST", "/stacks/activate", lambda args: {"stack_name_or_id": _stack_id(args)}),
+    ("copy", "POST", "/stacks/copy",
+     lambda args: {"source_stack_name_or_id": _stack_id(args), "target_stack": f"bench-{uuid.uuid4().hex[:12]}"}),
+    ("batch", "POST", "/stacks/batch", lambda args: {"operations": [
+        {"op": "rename", "stack_name_or_id": _stack_id(args), "new_stack_name": f"bench-{uuid.uuid4().hex[:12]}"},
+        {"op": "copy", "source_stack_name_or_id": _stack_id(args), "target_stack": f"bench-{uuid.uuid4().hex[:12]}"},
+        {"op": "activate", "stack_name_or_id": _stack_id(args)},
+    ]}),
+]
+
+SERVERS = {
+    "dev": lambda port: [sys.executable, "-m", "flask", "--app", "main", "run", "--port", str(port), "--with-threads"],
+    "gunicorn": lambda port: ["gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=5)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout} seconds.")
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class RssSampler:
+    """Tracks the peak resident set size of a process and its children while running."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processes = [self.process, *self.process.children(recursive=True)]
+                self.peak = max(self.peak, sum(p.memory_info().rss for p in processes))
+            except psutil.Error:
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_scenario(base_url: str, app_pid: int, scenario, concurrency: int, args) -> dict:
+    """
+    Drives one endpoint at one concurrency level and summarizes the measurements.
+
+    Only successful responses count towards latency and throughput, as a fast error says
+    nothing about the endpoint. Failed requests are counted by status code under 'errors',
+    with 'connection' for requests that got no response at all.
+    """
+    name, method, path, payload = scenario
+    local = threading.local()
+
+    def send(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        body = payload(args) if payload else None
+        started = time.perf_counter()
+        try:
+            response = local.session.request(method, base_url + path, json=body)
+        except requests.RequestException:
+            return time.perf_counter() - started, "connection", 0
+        response.content
+        return time.perf_counter() - started, response.status_code, len(response.content)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(min(concurrency, args.requests))))  # warm-up
+        with RssSampler(app_pid) as sampler:
+            started = time.perf_counter()
+            samples = list(executor.map(send, range(args.requests)))
+            elapsed = time.perf_counter() - started
+
+    def failed(sample) -> bool:
+        return sample[1] == "connection" or sample[1] >= 400
+
+    succeeded = [sample for sample in samples if not failed(sample)]
+    error_statuses = Counter(str(sample[1]) for sample in samples if failed(sample))
+    latencies = sorted(sample[0] * 1000 for sample in succeeded)
+    return {
+        "endpoint": name,
+        "method": method,
+        "path": path,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": len(samples) - len(succeeded),
+        "error_statuses": dict(sorted(error_statuses.items())),
+        "throughput_rps": round(len(succeeded) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(latencies[-1], 3),
+        } if latencies else None,
+        "response_bytes": succeeded[-1][2] if succeeded else None,
+        "peak_rss_mb": round(sampler.peak / 2 ** 20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint against a fake ZenML server.")
+    parser.add_argument("--stacks", type=int, default=100, help="Synthetic stacks (10 to 10000).")
+    parser.add_argument("--components-per-type", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.005, help="Upstream latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level.")
+    parser.add_argument("--endpoints", nargs="+", choices=[s[0] for s in SCENARIOS])
+    parser.add_argument("--server", choices=list(SERVERS), default="dev")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    zenml_port, app_port = free_port(), free_port()
+    fake_server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_zenml_server", "--port", str(zenml_port),
+         "--stacks", str(args.stacks), "--components-per-type", str(args.components_per_type),
+         "--latency", str(args.latency), "--jitter", str(args.jitter)],
+        cwd=ROOT, stdout=subprocess.DEVNULL,
+    )
+    config_dir = tempfile.TemporaryDirectory()
+    env = {
+        **os.environ,
+        "HOST": "127.0.0.1",
+        "PORT": str(app_port),
+        "ZENML_CONFIG_PATH": config_dir.name,
+        "SHARED_STATE_DIR": os.path.join(config_dir.name, "shared"),
+        "ZENML_ANALYTICS_OPT_IN": "false",
+        "ZENML_STORE_TYPE": "rest",
+        "ZENML_STORE_URL": f"http://127.0.0.1:{zenml_port}",
+        "ZENML_STORE_API_TOKEN": "fake-token",
+    }
+    app = subprocess.Popen(SERVERS[args.server](app_port), cwd=ROOT, env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    results = []
+    try:
+        wait_until_ready(f"http://127.0.0.1:{zenml_port}/api/v1/info")
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_until_ready(base_url + "/server_deployer/upstream_status")
+        for scenario in SCENARIOS:
+            if args.endpoints and scenario[0] not in args.endpoints:
+                continue
+            for concurrency in args.concurrency:
+                result = run_scenario(base_url, app.pid, scenario, concurrency, args)
+                results.append(result)
+                if result["errors"]:
+                    print(f"{scenario[0]} x{concurrency}: FAILED, {result['errors']} errors "
+                          f"{result['error_statuses']}", file=sys.stderr)
+                else:
+                    print(f"{scenario[0]} x{concurrency}: {result['latency_ms']['p50']} ms p50", file=sys.stderr)
+    finally:
+        app.terminate()
+        fake_server.terminate()
+        app.wait()
+        fake_server.wait()
+        config_dir.cleanup()
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    report = {
+        "meta": {
+            "commit": commit.stdout.strip() or None,
+            "server": args.server,
+            "stacks": args.stacks,
+            "upstream_latency_s": args.latency,
+            "requests_per_level": args.requests,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    failed = [f"{r['endpoint']} x{r['concurrency']}" for r in results if r["errors"]]
+    if failed:
+        sys.exit(f"Requests failed in {len(failed)} scenarios: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
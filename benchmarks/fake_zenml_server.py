@@ -0,0 +1,389 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = "/api/v1"
+TIMESTAMP = "2024-01-01T00:00:00"
+# Component type -> flavor -> (flavor source, component configuration). Only flavors
+# built into ZenML are used, since the client imports a flavor's source and validates
+# the component configuration against it whenever a stack is created.
+COMPONENT_FLAVORS = {
+    "orchestrator": {
+        "local": ("zenml.orchestrators.local.local_orchestrator.LocalOrchestratorFlavor", {}),
+        "local_docker": ("zenml.orchestrators.local_docker.local_docker_orchestrator.LocalDockerOrchestratorFlavor",
+                         {}),
+    },
+    "artifact_store": {
+        "local": ("zenml.artifact_stores.local_artifact_store.LocalArtifactStoreFlavor", {}),
+    },
+    "container_registry": {
+        "default": ("zenml.container_registries.default_container_registry.DefaultContainerRegistryFlavor",
+                    {"uri": "localhost:5000"}),
+        "dockerhub": ("zenml.container_registries.dockerhub_container_registry.DockerHubContainerRegistryFlavor",
+                      {"uri": "docker.io/zenml"}),
+        "github": ("zenml.container_registries.github_container_registry.GitHubContainerRegistryFlavor",
+                   {"uri": "ghcr.io/zenml"}),
+    },
+    "image_builder": {
+        "local": ("zenml.image_builders.local_image_builder.LocalImageBuilderFlavor", {}),
+    },
+}
+
+
+def entity_id(kind: str, index: int) -> uuid.UUID:
+    """
+    Deterministic id of the `index`-th synthetic entity of a kind, so clients can address it.
+
+    The id is a version 4 UUID, like the ones ZenML generates, since the app validates them as such.
+    """
+    return uuid.UUID(bytes=hashlib.md5(f"{kind}-{index}".encode()).digest(), version=4)
+
+
+class FakeZenStore:
+    """
+    In-memory data set served by the fake ZenML REST API.
+
+    Stack `i` is named `stack-i` and has the id `entity_id("stack", i)`; stack 0
+    is the `default` stack. Stacks are spread round-robin over `users` users,
+    user 0 being the one the API token authenticates as.
+    """
+
+    def __init__(self, stacks: int, users: int, components_per_type: int):
+        self.lock = threading.Lock()
+        self.workspace = {"id": str(entity_id("workspace", 0)), "name": "default"}
+        self.users = [{"id": str(entity_id("user", i)), "name": f"user-{i}"} for i in range(users)]
+
+        self.components = {}
+        for component_type, flavors in COMPONENT_FLAVORS.items():
+            flavors = list(flavors)
+            for i in range(components_per_type):
+                component_id = str(entity_id(component_type, i))
+                self.components[component_id] = {
+                    "id": component_id,
+                    "name": f"{component_type}-{i}",
+                    "type": component_type,
+                    "flavor": flavors[i % len(flavors)],
+                }
+
+        self.stacks = {}
+        rng = random.Random(0)
+        for i in range(stacks):
+            components = {
+                component_type: [str(entity_id(component_type, rng.randrange(components_per_type)))]
+                for component_type in COMPONENT_FLAVORS
+                if component_type in ("orchestrator", "artifact_store") or rng.random() < 0.5
+            }
+            self.add_stack("default" if i == 0 else f"stack-{i}", components, self.users[i % users]["id"],
+                           str(entity_id("stack", i)))
+
+    def add_stack(self, name: str, components: dict, user_id: str, stack_id: str = None) -> dict:
+        stack = {
+            "id": stack_id or str(uuid.uuid4()),
+            "name": name,
+            "user_id": user_id,
+            "components": components,
+            "updated": datetime.utcnow().isoformat(),
+        }
+        self.stacks[stack["id"]] = stack
+        return stack
+
+    def user_response(self, user: dict) -> dict:
+        return {
+            "id": user["id"],
+            "name": user["name"],
+            "permission_denied": False,
+            "body": {
+                "created": TIMESTAMP,
+                "updated": TIMESTAMP,
+                "active": True,
+                "activation_token": None,
+                "full_name": user["name"],
+                "email_opted_in": False,
+                "is_service_account": False,
+            },
+            "metadata": {"email": None, "hub_token": None, "external_user_id": None, "user_metadata": {}},
+            "resources": None,
+        }
+
+    def workspace_response(self) -> dict:
+        return {
+            **self.workspace,
+            "permission_denied": False,
+            "body": {"created": TIMESTAMP, "updated": TIMESTAMP},
+            "metadata": {"description": ""},
+            "resources": None,
+        }
+
+    def component_response(self, component: dict, hydrate: bool) -> dict:
+        return {
+            "id": component["id"],
+            "name": component["name"],
+            "permission_denied": False,
+            "body": {
+                "created": TIMESTAMP,
+                "updated": TIMESTAMP,
+                "user": None,
+                "type": component["type"],
+                "flavor": component["flavor"],
+                "integration": None,
+                "logo_url": None,
+            },
+            "metadata": {
+                "workspace": self.workspace_response(),
+                "configuration": COMPONENT_FLAVORS[component["type"]][component["flavor"]][1],
+                "labels": None,
+                "component_spec_path": None,
+                "connector_resource_id": None,
+                "connector": None,
+            } if hydrate else None,
+            "resources": None,
+        }
+
+    def flavor_response(self, component_type: str, name: str) -> dict:
+        return {
+            "id": str(entity_id(f"flavor-{component_type}", list(COMPONENT_FLAVORS[component_type]).index(name))),
+            "name": name,
+            "permission_denied": False,
+            "body": {
+                "created": TIMESTAMP,
+                "updated": TIMESTAMP,
+                "user": None,
+                "type": component_type,
+                "integration": "built-in",
+                "logo_url": None,
+            },
+            "metadata": {
+                "workspace": None,
+                "config_schema": {},
+                "connector_type": None,
+                "connector_resource_type": None,
+                "connector_resource_id_attr": None,
+                "source": COMPONENT_FLAVORS[component_type][name][0],
+                "docs_url": None,
+                "sdk_docs_url": None,
+                "is_custom": False,
+            },
+            "resources": None,
+        }
+
+    def stack_response(self, stack: dict, hydrate: bool) -> dict:
+        return {
+            "id": stack["id"],
+            "name": stack["name"],
+            "permission_denied": False,
+            "body": {"created": TIMESTAMP, "updated": stack["updated"], "user": None},
+            "metadata": {
+                "workspace": self.workspace_response(),
+                "components": {
+                    component_type: [self.component_response(self.components[c], hydrate=False) for c in ids]
+                    for component_type, ids in stack["components"].items()
+                },
+                "description": "",
+                "stack_spec_path": None,
+            } if hydrate else None,
+            "resources": None,
+        }
+
+
+def _matches(value: str, expression: str) -> bool:
+    """Evaluates a ZenML filter expression such as `startswith:abc` against `value`."""
+    operation, _, operand = expression.partition(":")
+    if not operand:
+        return value == expression
+    if operation == "startswith":
+        return value.startswith(operand)
+    if operation == "contains":
+        return operand in value
+    if operation == "equals":
+        return value == operand
+    if operation == "gte":
+        return value >= operand.replace(" ", "T")
+    return value == expression
+
+
+def _page(items: list, params: dict) -> dict:
+    size = int(params.get("size", 20))
+    index = int(params.get("page", 1))
+    total_pages = max(1, -(-len(items) // size))
+    return {
+        "index": index,
+        "max_size": size,
+        "total_pages": total_pages,
+        "total": len(items),
+        "items": items[(index - 1) * size:index * size],
+    }
+
+
+def make_handler(store: FakeZenStore, latency: float, jitter: float):
+    """Builds a request handler class serving `store` with the given injected latency."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _not_found(self, message: str):
+            self._reply(404, {"detail": ["KeyError", message]})
+
+        def _dispatch(self, method: str):
+            if latency or jitter:
+                time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+            parsed = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            hydrate = params.get("hydrate", "true").lower() == "true"
+            parts = parsed.path[len(API_PREFIX):].strip("/").split("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+
+            with store.lock:
+                if method == "POST" and parts == ["login"]:
+                    return self._reply(200, {"access_token": "fake-token", "token_type": "bearer"})
+                if method == "GET" and parts == ["info"]:
+                    return self._reply(200, {
+                        "id": str(entity_id("server", 0)),
+                        "version": "0.55.2",
+                        "debug": False,
+                        "deployment_type": "other",
+                        "database_type": "sqlite",
+                        "secrets_store_type": "sql",
+                        "auth_scheme": "OAUTH2_PASSWORD_BEARER",
+                        "server_url": "",
+                        "dashboard_url": "",
+                        "metadata": {},
+                    })
+                if method == "GET" and parts == ["current-user"]:
+                    return self._reply(200, store.user_response(store.users[0]))
+                if method == "GET" and parts[0] == "users" and len(parts) == 2:
+                    user = next((u for u in store.users if parts[1] in (u["id"], u["name"])), None)
+                    return self._reply(200, store.user_response(user)) if user else self._not_found(parts[1])
+                if method == "GET" and parts[0] == "workspaces" and len(parts) == 2:
+                    if parts[1] in (store.workspace["id"], store.workspace["name"]):
+                        return self._reply(200, store.workspace_response())
+                    return self._not_found(parts[1])
+
+                if parts[0] == "stacks" or parts[-1] == "stacks":
+                    return self._stacks(method, parts, params, hydrate, body)
+                if parts[0] == "components":
+                    return self._components(method, parts, params, hydrate)
+                if method == "GET" and parts == ["flavors"]:
+                    flavors = [(t, name) for t, names in COMPONENT_FLAVORS.items() for name in names]
+                    for index, field in enumerate(("type", "name")):
+                        if field in params:
+                            flavors = [f for f in flavors if _matches(f[index], params[field])]
+                    page = _page(flavors, params)
+                    page["items"] = [store.flavor_response(*f) for f in page["items"]]
+                    return self._reply(200, page)
+            self._not_found(parsed.path)
+
+        def _stacks(self, method, parts, params, hydrate, body):
+            if method == "GET" and len(parts) == 1:
+                stacks = list(store.stacks.values())
+                for field in ("id", "name", "updated"):
+                    if field in params:
+                        stacks = [s for s in stacks if _matches(s[field], params[field])]
+                if "user_id" in params:
+                    stacks = [s for s in stacks if _matches(s["user_id"], params["user_id"])]
+                page = _page(stacks, params)
+                page["items"] = [store.stack_response(s, hydrate) for s in page["items"]]
+                return self._reply(200, page)
+
+            if method == "POST" and parts[-1] == "stacks":
+                components = {t: [str(c) for c in ids] for t, ids in body.get("components", {}).items()}
+                stack = store.add_stack(body["name"], components, store.users[0]["id"])
+                return self._reply(200, store.stack_response(stack, hydrate=True))
+
+            stack = store.stacks.get(parts[1]) if len(parts) == 2 else None
+            if stack is None:
+                return self._not_found(f"Stack {parts[-1]} not found")
+            if method == "PUT":
+                stack.update({k: v for k, v in body.items() if k == "name" and v})
+                stack["updated"] = datetime.utcnow().isoformat()
+            elif method == "DELETE":
+                del store.stacks[stack["id"]]
+                return self._reply(200, None)
+            self._reply(200, store.stack_response(stack, hydrate))
+
+        def _components(self, method, parts, params, hydrate):
+            if method == "GET" and len(parts) == 1:
+                components = list(store.components.values())
+                for field in ("id", "name", "type"):
+                    if field in params:
+                        components = [c for c in components if _matches(c[field], params[field])]
+                page = _page(components, params)
+                page["items"] = [store.component_response(c, hydrate) for c in page["items"]]
+                return self._reply(200, page)
+            component = store.components.get(parts[1]) if len(parts) == 2 else None
+            if method != "GET" or component is None:
+                return self._not_found(f"Component {parts[-1]} not found")
+            self._reply(200, store.component_response(component, hydrate))
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PUT(self):
+            self._dispatch("PUT")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+    return Handler
+
+
+def make_server(port: int, stacks: int, users: int = 1, components_per_type: int = 10,
+                latency: float = 0.0, jitter: float = 0.0) -> ThreadingHTTPServer:
+    """Creates (but does not start) a fake ZenML server listening on 127.0.0.1:`port`."""
+    store = FakeZenStore(stacks=stacks, users=users, components_per_type=components_per_type)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store, latency, jitter))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic ZenML REST API for benchmarks.")
+    parser.add_argument("--port", type=int, default=8237)
+    parser.add_argument("--stacks", type=int, default=100)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--components-per-type", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds around --latency.")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.stacks, args.users, args.components_per_type, args.latency, args.jitter)
+    print(f"Fake ZenML server with {args.stacks} stacks on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import argparse
+import json
+import sys
+import time
+import uuid
+from enum import Enum
+from types import SimpleNamespace
+
+from app.utils import serializers
+from app.utils.serializers import encode_json, serialize_stack, stack_to_dict
+
+
+class ComponentType(str, Enum):
+    """Stand-in for zenml.enums.StackComponentType, which is also a `str` enum."""
+
+    ORCHESTRATOR = "orchestrator"
+    ARTIFACT_STORE = "artifact_store"
+    CONTAINER_REGISTRY = "container_registry"
+    EXPERIMENT_TRACKER = "experiment_tracker"
+
+
+def make_stacks(components: int, components_per_stack: int = 4) -> list:
+    """Builds objects shaped like hydrated ZenML stack responses, totalling `components` components."""
+    stacks = []
+    for i in range(components // components_per_stack):
+        stacks.append(SimpleNamespace(
+            id=uuid.uuid4(),
+            name=f"stack-{i}",
+            components={
+                component_type: [SimpleNamespace(id=uuid.uuid4(), name=f"{component_type.value}-{i}",
+                                                 flavor="local", type=component_type)]
+                for component_type in list(ComponentType)[:components_per_stack]
+            },
+        ))
+    return stacks
+
+
+def legacy_encode(stacks: list) -> bytes:
+    """The previous path: pydantic models, `.dict()`, then Flask's JSON encoding."""
+    return json.dumps([serialize_stack(stack).dict() for stack in stacks], default=str, sort_keys=True).encode()
+
+
+def fast_encode(stacks: list) -> bytes:
+    return encode_json([stack_to_dict(stack) for stack in stacks])
+
+
+def best_of(fn, stacks: list, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(stacks)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the pydantic and direct stack serialization paths.")
+    parser.add_argument("--components", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for components in args.components:
+        stacks = make_stacks(components)
+        if json.loads(legacy_encode(stacks)) != json.loads(fast_encode(stacks)):
+            sys.exit("The fast path does not produce the same JSON as the pydantic path.")
+        legacy, fast = best_of(legacy_encode, stacks, args.repeat), best_of(fast_encode, stacks, args.repeat)
+        results.append({
+            "components": components,
+            "legacy_ms": round(legacy * 1000, 2),
+            "fast_ms": round(fast * 1000, 2),
+            "speedup": round(legacy / fast, 1),
+        })
+
+    json.dump({"json_backend": "orjson" if serializers.orjson else "json", "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    # What the Dockerfile used to run: the single-process Werkzeug development server.
+    "dev": lambda port: [sys.executable, "-m", "flask", "--app", "main", "run", "--port", str(port)],
+    "gunicorn": lambda port: ["gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+}
+
+
+def wait_until_ready(url: str, timeout: float = 60):
+    """Polls `url` until the server answers or `timeout` seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout} seconds.")
+
+
+def drive(url: str, total: int, concurrency: int) -> dict:
+    """Sends `total` GET requests to `url` from `concurrency` threads and reports the throughput."""
+    local = threading.local()
+
+    def send(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session.get(url).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        status_codes = list(executor.map(send, range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "errors": sum(1 for code in status_codes if code >= 500),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Flask dev server with the production server.")
+    parser.add_argument("--path", default="/server_deployer/upstream_status", help="Endpoint to drive.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=3101)
+    parser.add_argument("--servers", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.servers:
+        env = {**os.environ, "PORT": str(args.port), "HOST": "127.0.0.1"}
+        process = subprocess.Popen(SERVERS[name](args.port), cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            url = f"http://127.0.0.1:{args.port}{args.path}"
+            wait_until_ready(url)
+            drive(url, min(200, args.requests), args.concurrency)  # warm-up
+            results[name] = drive(url, args.requests, args.concurrency)
+        finally:
+            process.terminate()
+            process.wait()
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(statement: str) -> list:
+    """
+    Runs `statement` in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        One entry per imported module with its self and cumulative import time in seconds.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_seconds": int(self_us) / 1e6,
+            "cumulative_seconds": int(cumulative_us) / 1e6,
+        })
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how long the app and ZenML take to import.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to list.")
+    parser.add_argument("--max-app-seconds", type=float,
+                        help="Exit with status 1 if importing the app takes longer than this.")
+    args = parser.parse_args()
+
+    # Modules the interpreter loads before running anything are not the app's doing.
+    interpreter_modules = {m["module"] for m in import_times("pass")}
+    app_modules = [m for m in import_times("import main") if m["module"] not in interpreter_modules]
+    warmup_modules = [m for m in import_times("from app.utils.warmup import warm_imports; warm_imports()")
+                      if m["module"] not in interpreter_modules]
+
+    top_level = sorted((m for m in app_modules if m["depth"] == 0),
+                       key=lambda m: m["cumulative_seconds"], reverse=True)
+    app_seconds = sum(m["cumulative_seconds"] for m in app_modules if m["depth"] == 0)
+    report = {
+        "app_import_seconds": round(app_seconds, 4),
+        "zenml_loaded_by_app": any(m["module"] == "zenml" for m in app_modules),
+        "slowest_app_imports": [
+            {"module": m["module"], "seconds": round(m["cumulative_seconds"], 4)} for m in top_level[:args.top]
+        ],
+        "zenml_warmup_seconds": round(sum(m["cumulative_seconds"] for m in warmup_modules if m["depth"] == 0), 4),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    if args.max_app_seconds is not None and app_seconds > args.max_app_seconds:
+        print(f"App import took {app_seconds:.3f}s, over the {args.max_app_seconds}s budget.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
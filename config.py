@@ -10,7 +10,116 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 #  or implied. See the License for the specific language governing
 #  permissions and limitations under the License.
+import json
+import os
+import tempfile
+
+
 class Config:
     # Other configuration settings
     # https://13c204fc-zenml.cloudinfra.zenml.io
     ZENML_API_URL = 'https://13c204fc-zenml.cloudinfra.zenml.io/api/v1'
+
+    # Serving
+    HOST = os.environ.get("HOST", "127.0.0.1")
+    PORT = int(os.environ.get("PORT", "3001"))
+    DEBUG = os.environ.get("DEBUG", "false").lower() in ("1", "true", "yes")
+    WEB_WORKERS = int(os.environ.get("WEB_WORKERS", str(2 * (os.cpu_count() or 1) + 1)))
+    WEB_THREADS = int(os.environ.get("WEB_THREADS", "8"))
+    WEB_KEEPALIVE = int(os.environ.get("WEB_KEEPALIVE", "5"))
+    WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", "60"))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+    WEB_MAX_REQUESTS = int(os.environ.get("WEB_MAX_REQUESTS", "0"))
+    # Directory of the SQLite state shared by the worker processes (connection jobs, cache
+    # generations, ...). Gunicorn clears it on startup, so every instance needs its own.
+    SHARED_STATE_DIR = os.environ.get(
+        "SHARED_STATE_DIR", os.path.join(tempfile.gettempdir(), f"zenml-service-{PORT}")
+    )
+    # Seconds between the metrics snapshots each gunicorn worker writes for `/metrics` to aggregate
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+    # Import ZenML in the background once a worker is up instead of on the first request
+    WARMUP_IMPORTS = os.environ.get("WARMUP_IMPORTS", "true").lower() in ("1", "true", "yes")
+
+    # Per-user cache of `/stacks` listings
+    STACKS_CACHE_TTL = float(os.environ.get("STACKS_CACHE_TTL", "30"))
+    STACKS_CACHE_MAXSIZE = int(os.environ.get("STACKS_CACHE_MAXSIZE", "256"))
+
+    # Active user identity cache, keyed by store URL and API token
+    ACTIVE_USER_CACHE_TTL = float(os.environ.get("ACTIVE_USER_CACHE_TTL", "300"))
+    ACTIVE_USER_CACHE_MAXSIZE = int(os.environ.get("ACTIVE_USER_CACHE_MAXSIZE", "32"))
+
+    # Optional SQLite file keeping stack, active stack and status snapshots across restarts
+    # (disabled when empty). Entries older than PERSISTENT_CACHE_FRESH_FOR seconds are served
+    # while being refreshed in the background; ones older than PERSISTENT_CACHE_MAX_STALENESS are ignored.
+    PERSISTENT_CACHE_PATH = os.environ.get("PERSISTENT_CACHE_PATH", "")
+    PERSISTENT_CACHE_FRESH_FOR = float(os.environ.get("PERSISTENT_CACHE_FRESH_FOR", "30"))
+    PERSISTENT_CACHE_MAX_STALENESS = float(os.environ.get("PERSISTENT_CACHE_MAX_STALENESS", "86400"))
+
+    # Compression of JSON responses at least COMPRESSION_MIN_SIZE bytes long
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+
+    # `/stacks/batch` limits
+    BATCH_MAX_OPERATIONS = int(os.environ.get("BATCH_MAX_OPERATIONS", "100"))
+    BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "8"))
+
+    # Seconds `/components` answers from its index before reloading the full stack listing
+    COMPONENT_CATALOG_MAX_AGE = float(os.environ.get("COMPONENT_CATALOG_MAX_AGE", "300"))
+
+    # Stack mirror behind `/stacks/changes`: seconds between incremental syncs, seconds between
+    # full syncs, removed stacks remembered before older cursors have to be reset, and seconds
+    # a worker may sync for before another one takes over
+    STACKS_SYNC_INTERVAL = float(os.environ.get("STACKS_SYNC_INTERVAL", "5"))
+    STACKS_FULL_SYNC_INTERVAL = float(os.environ.get("STACKS_FULL_SYNC_INTERVAL", "600"))
+    STACKS_CHANGES_RETENTION = int(os.environ.get("STACKS_CHANGES_RETENTION", "10000"))
+    STACKS_SYNC_LEASE = float(os.environ.get("STACKS_SYNC_LEASE", "60"))
+
+    # ZenML servers selectable per request with the X-ZenML-Tenant header or a /t/<tenant> path prefix,
+    # e.g. '{"team-a": {"url": "https://zenml.team-a.example", "api_token": "..."}}'
+    ZENML_TENANTS = json.loads(os.environ.get("ZENML_TENANTS", "{}"))
+
+    # Opt-in request profiling. A request is profiled when it sends the X-ZenML-Profile header
+    # ('cprofile', 'sampling' or '1' for PROFILING_MODE) or is picked at PROFILING_SAMPLE_RATE,
+    # optionally only among PROFILING_ENDPOINTS (comma-separated, e.g. 'stacks.fetch_stacks').
+    # The newest PROFILING_MAX_PROFILES profiles are kept in PROFILING_DIR.
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILING_MODE = os.environ.get("PROFILING_MODE", "cprofile")
+    PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_ENDPOINTS = [e for e in os.environ.get("PROFILING_ENDPOINTS", "").split(",") if e]
+    PROFILING_SAMPLE_INTERVAL = float(os.environ.get("PROFILING_SAMPLE_INTERVAL", "0.005"))
+    PROFILING_DIR = os.environ.get("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "zenml-service-profiles"))
+    PROFILING_MAX_PROFILES = int(os.environ.get("PROFILING_MAX_PROFILES", "50"))
+
+    # Number of stacks requested per upstream `list_stacks` page
+    STACKS_PAGE_SIZE = int(os.environ.get("STACKS_PAGE_SIZE", "100"))
+
+    # Keep-alive connections held open to the ZenML server per worker
+    CLIENT_POOL_SIZE = int(os.environ.get("CLIENT_POOL_SIZE", "10"))
+
+    # Background `/server_deployer/connect` jobs
+    CONNECT_MAX_CONCURRENCY = int(os.environ.get("CONNECT_MAX_CONCURRENCY", "2"))
+    CONNECT_MAX_PENDING = int(os.environ.get("CONNECT_MAX_PENDING", "8"))
+    CONNECT_TIMEOUT = float(os.environ.get("CONNECT_TIMEOUT", "300"))
+    CONNECT_JOB_RETENTION = float(os.environ.get("CONNECT_JOB_RETENTION", "600"))
+
+    # Background `/server_deployer/status` prober
+    STATUS_PROBE_INTERVAL = float(os.environ.get("STATUS_PROBE_INTERVAL", "5"))
+    STATUS_PROBE_JITTER = float(os.environ.get("STATUS_PROBE_JITTER", "1"))
+    STATUS_STREAM_KEEPALIVE = float(os.environ.get("STATUS_STREAM_KEEPALIVE", "15"))
+    # Each `/server_deployer/status/stream` subscriber holds a worker thread, so their number per
+    # worker is capped and each stream is closed after a while for the client to reconnect.
+    STATUS_STREAM_MAX_SUBSCRIBERS = int(
+        os.environ.get("STATUS_STREAM_MAX_SUBSCRIBERS", str(max(1, WEB_THREADS // 2)))
+    )
+    STATUS_STREAM_MAX_LIFETIME = float(os.environ.get("STATUS_STREAM_MAX_LIFETIME", "300"))
+    STATUS_STREAM_RETRY = float(os.environ.get("STATUS_STREAM_RETRY", "1"))
+
+    # Timeout budgets (seconds) and circuit breaker for upstream ZenML calls.
+    # UPSTREAM_TIMEOUTS overrides the default per operation, e.g. '{"list_stacks": 20}'.
+    UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", "10"))
+    UPSTREAM_TIMEOUTS = json.loads(os.environ.get("UPSTREAM_TIMEOUTS", "{}"))
+    UPSTREAM_MAX_WORKERS = int(os.environ.get("UPSTREAM_MAX_WORKERS", "32"))
+    UPSTREAM_FAILURE_THRESHOLD = int(os.environ.get("UPSTREAM_FAILURE_THRESHOLD", "5"))
+    UPSTREAM_RECOVERY_TIMEOUT = float(os.environ.get("UPSTREAM_RECOVERY_TIMEOUT", "30"))
+    UPSTREAM_HALF_OPEN_MAX_CALLS = int(os.environ.get("UPSTREAM_HALF_OPEN_MAX_CALLS", "1"))
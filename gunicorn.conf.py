@@ -0,0 +1,70 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# Gunicorn settings for the production server, all taken from `config.Config`.
+import os
+
+from config import Config
+
+bind = f"{Config.HOST}:{Config.PORT}"
+
+# Threaded workers: upstream ZenML calls are I/O bound and `/server_deployer/status/stream`
+# holds a thread per subscriber, so each process serves several requests at once.
+worker_class = "gthread"
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+
+# Import the app once in the master so workers fork with it already loaded. ZenML itself is
+# imported lazily, and background threads (status prober, job and upstream pools, import
+# warm-up) only start inside the workers.
+preload_app = True
+
+keepalive = Config.WEB_KEEPALIVE
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Jobs, generations and metrics of an earlier run are meaningless to the new workers.
+    from app.utils.metrics import enable_multiprocess
+    from app.utils.shared_state import shared_state
+
+    shared_state.wipe()
+    # Runs in the master before any worker is forked, so every worker inherits it.
+    enable_multiprocess(os.path.join(Config.SHARED_STATE_DIR, "metrics"))
+
+
+def post_worker_init(worker):
+    # The listening socket is already bound by the master; warm ZenML up without delaying readiness.
+    if Config.WARMUP_IMPORTS:
+        from app.utils.warmup import start_background_warmup
+
+        start_background_warmup()
+
+
+def worker_exit(server, worker):
+    # The counters of a worker outlive it in `/metrics`, including its last requests.
+    from app.utils.metrics import flush
+
+    flush()
+
+
+def child_exit(server, worker):
+    # Runs in the master once the worker is gone, so its final snapshot joins the exited totals.
+    from app.utils.metrics import prune_exited
+
+    prune_exited()
@@ -10,14 +10,14 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 #  or implied. See the License for the specific language governing
 #  permissions and limitations under the License.
-from flask import Flask
-from app.routers import server_deployer, stacks, zen_store
+from app import create_app
+from app.utils.warmup import start_background_warmup
+from config import Config
 
-app = Flask(__name__)
-
-app.register_blueprint(server_deployer.bp)
-app.register_blueprint(stacks.bp)
-app.register_blueprint(zen_store.bp)
+app = create_app()
 
 if __name__ == "__main__":
-    app.run(port=3001, debug=True)
+    # Development server only; production traffic is served by gunicorn (see gunicorn.conf.py).
+    if Config.WARMUP_IMPORTS:
+        start_background_warmup()
+    app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
@@ -0,0 +1,126 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import atexit
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+# Keep the service's state and ZenML's configuration out of the developer's own directories.
+# Set before any module of the service is imported, as `Config` reads the environment once.
+_state_dir = tempfile.mkdtemp(prefix="zenml-service-tests-")
+atexit.register(shutil.rmtree, _state_dir, True)
+os.environ.setdefault("SHARED_STATE_DIR", os.path.join(_state_dir, "shared"))
+os.environ.setdefault("ZENML_CONFIG_PATH", os.path.join(_state_dir, "zenml"))
+os.environ.setdefault("ZENML_ANALYTICS_OPT_IN", "false")
+
+
+def make_stack(name: str, **components) -> SimpleNamespace:
+    """Builds an object shaped like a hydrated ZenML stack, with one component per given type and flavor."""
+    from zenml.enums import StackComponentType
+
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        name=name,
+        updated=datetime.utcnow(),
+        components={
+            StackComponentType(component_type): [
+                SimpleNamespace(id=uuid.uuid4(), name=f"{name}-{component_type}", flavor=flavor,
+                                type=StackComponentType(component_type))
+            ]
+            for component_type, flavor in components.items()
+        },
+    )
+
+
+class FakeClient:
+    """The part of `zenml.client.Client` the stack routes use, backed by a list of stacks."""
+
+    def __init__(self, stacks):
+        self.stacks = list(stacks)
+        self.active_stack_model = self.stacks[0] if self.stacks else None
+        self.list_stacks_calls = []
+
+    def list_stacks(self, page: int = 1, size: int = 20, hydrate: bool = True, user_id=None, **filters):
+        self.list_stacks_calls.append(page)
+        total_pages = max(1, -(-len(self.stacks) // size))
+        if page > total_pages:
+            # What ZenML's stores do for a page past the last one.
+            raise ValueError(f"Invalid page {page}. The maximum page value therefore is {total_pages}.")
+        items = self.stacks[(page - 1) * size:page * size]
+        return SimpleNamespace(items=items, index=page, max_size=size, total_pages=total_pages,
+                               total=len(self.stacks))
+
+    def get_stack(self, name_id_or_prefix):
+        return self._find(name_id_or_prefix)
+
+    def update_stack(self, name_id_or_prefix, name):
+        stack = self._find(name_id_or_prefix)
+        stack.name = name
+        stack.updated = datetime.utcnow()
+        return stack
+
+    def activate_stack(self, stack_name_id_or_prefix):
+        self.active_stack_model = self._find(stack_name_id_or_prefix)
+
+    def create_stack(self, name, components):
+        stack = SimpleNamespace(id=uuid.uuid4(), name=name, updated=datetime.utcnow(), components={})
+        self.stacks.append(stack)
+        return stack
+
+    def _find(self, name_or_id):
+        for stack in self.stacks:
+            if name_or_id in (stack.name, str(stack.id)):
+                return stack
+        raise KeyError(f"No stack with name or id `{name_or_id}`")
+
+
+@pytest.fixture
+def app():
+    from app import create_app
+
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_zenml(monkeypatch):
+    """
+    Serves the stack and component routes from a `FakeClient` on a store of its own.
+
+    Every test gets a new store URL, so nothing the service caches per store leaks between tests.
+    """
+    from app.models.user import UserModel
+    from app.routers import components, stacks
+    from app.utils import global_config
+
+    fake = FakeClient([make_stack("default", orchestrator="local", artifact_store="local")])
+    store_info = {"store_type": "rest", "store_url": f"http://zenml-{uuid.uuid4().hex[:8]}.test"}
+    user = UserModel(id=uuid.uuid4(), name="default")
+    monkeypatch.setattr(stacks, "get_client", lambda: fake)
+    monkeypatch.setattr(stacks, "fetch_store_info", lambda: store_info)
+    monkeypatch.setattr(stacks, "fetch_active_user", lambda: user)
+    monkeypatch.setattr(components, "fetch_store_info", lambda: store_info)
+    monkeypatch.setattr(components, "fetch_active_user", lambda: user)
+    monkeypatch.setattr(global_config, "fetch_store_info", lambda: store_info)
+    # The fake client keeps its active stack itself, there is no global configuration to reload it from.
+    monkeypatch.setattr(stacks, "refresh_active_stack", lambda: None)
+    return fake
@@ -0,0 +1,106 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+import time
+
+import pytest
+
+from app.utils.batch import BatchOperation, run_batch
+
+
+def _record(log: list, name: str, delay: float = 0, fail: bool = False):
+    def fn():
+        time.sleep(delay)
+        log.append(name)
+        if fail:
+            raise RuntimeError(name)
+        return name
+
+    return fn
+
+
+def test_operation_waits_for_earlier_operations_on_the_same_key():
+    log = []
+    results = run_batch(
+        [
+            BatchOperation(frozenset({"stack-a"}), _record(log, "rename", delay=0.05)),
+            BatchOperation(frozenset({"stack-a"}), _record(log, "update")),
+        ],
+        max_workers=4,
+    )
+
+    assert log == ["rename", "update"]
+    assert results == [("succeeded", "rename"), ("succeeded", "update")]
+
+
+def test_independent_operations_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    results = run_batch(
+        [BatchOperation(frozenset({key}), barrier.wait) for key in ("stack-a", "stack-b")],
+        max_workers=2,
+    )
+
+    assert [status for status, _ in results] == ["succeeded", "succeeded"]
+
+
+def test_dependents_of_a_failed_operation_are_skipped():
+    log = []
+    results = run_batch(
+        [
+            BatchOperation(frozenset({"stack-a"}), _record(log, "first", fail=True)),
+            BatchOperation(frozenset({"stack-a", "stack-b"}), _record(log, "second")),
+            # Depends on `second` through stack-b, which was skipped.
+            BatchOperation(frozenset({"stack-b"}), _record(log, "third")),
+            BatchOperation(frozenset({"stack-c"}), _record(log, "unrelated")),
+        ],
+        max_workers=4,
+    )
+
+    assert [status for status, _ in results] == ["failed", "skipped", "skipped", "succeeded"]
+    assert isinstance(results[0][1], RuntimeError)
+    assert sorted(log) == ["first", "unrelated"]
+
+
+def test_order_keys_order_operations_without_skipping():
+    log = []
+    results = run_batch(
+        [
+            BatchOperation(frozenset({"stack-a"}), _record(log, "first", delay=0.05, fail=True), frozenset({"active"})),
+            BatchOperation(frozenset({"stack-b"}), _record(log, "second"), frozenset({"active"})),
+        ],
+        max_workers=2,
+    )
+
+    assert log == ["first", "second"]
+    assert [status for status, _ in results] == ["failed", "succeeded"]
+
+
+@pytest.mark.parametrize("body", [[], ["rename"], "operations", 3, {}, {"operations": {"op": "rename"}},
+                                  {"operations": []}, {"operations": ["rename"]}])
+def test_malformed_batch_is_rejected(client, fake_zenml, body):
+    response = client.post("/stacks/batch", json=body)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_batch_route_runs_every_operation(client, fake_zenml):
+    response = client.post("/stacks/batch", json={"operations": [
+        {"op": "copy", "source_stack_name_or_id": "default", "target_stack": "copy"},
+        {"op": "rename", "stack_name_or_id": "copy", "new_stack_name": "renamed"},
+        {"op": "activate", "stack_name_or_id": "missing"},
+    ]})
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.get_json()["results"]] == ["succeeded", "succeeded", "failed"]
+    assert [stack.name for stack in fake_zenml.stacks] == ["default", "renamed"]
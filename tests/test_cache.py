@@ -0,0 +1,75 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import time
+
+from app.utils.cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl=0.05, maxsize=10)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    time.sleep(0.1)
+    assert cache.get("key", "default") == "default"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_peek_stale_returns_expired_entries():
+    cache = TTLCache(ttl=0.05, maxsize=10)
+    cache.set("key", "value")
+    time.sleep(0.1)
+
+    # Expired entries are still available to serve while the source is unavailable.
+    assert cache.peek_stale("key") == "value"
+    assert cache.peek_stale("missing", "default") == "default"
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Reading `a` makes `b` the least recently used entry.
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_setting_an_existing_key_refreshes_its_recency():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 10)
+    cache.set("c", 3)
+
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_invalidate_by_predicate():
+    cache = TTLCache(ttl=60, maxsize=10)
+    cache.set(("store-a", 1), "a1")
+    cache.set(("store-a", 2), "a2")
+    cache.set(("store-b", 1), "b1")
+
+    assert cache.invalidate(lambda key: key[0] == "store-a") == 2
+    assert cache.get(("store-a", 1)) is None
+    assert cache.get(("store-b", 1)) == "b1"
+    assert cache.invalidate() == 1
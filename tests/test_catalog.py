@@ -0,0 +1,113 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import uuid
+
+import pytest
+
+from app.routers import components as components_router
+from app.utils.catalog import ComponentCatalog
+from tests.conftest import make_stack
+
+
+def _component(component_type: str, flavor: str, name: str) -> dict:
+    return {"id": str(uuid.uuid4()), "name": name, "flavor": flavor, "type": component_type}
+
+
+def _stack(name: str, *components: dict) -> dict:
+    by_type = {}
+    for component in components:
+        by_type.setdefault(component["type"], []).append(component)
+    return {"id": str(uuid.uuid4()), "name": name, "components": by_type}
+
+
+@pytest.fixture
+def components():
+    return {
+        "local": _component("orchestrator", "local", "local"),
+        "kubeflow": _component("orchestrator", "kubeflow", "kubeflow"),
+        "s3": _component("artifact_store", "s3", "s3"),
+    }
+
+
+@pytest.fixture
+def catalog(components):
+    catalog = ComponentCatalog()
+    catalog.replace_stacks([
+        _stack("dev", components["local"], components["s3"]),
+        _stack("prod", components["kubeflow"], components["s3"]),
+    ])
+    return catalog
+
+
+def _names(results) -> list:
+    return [(component["name"], [stack["name"] for stack in component["stacks"]]) for component in results]
+
+
+def test_query_matches_every_filter(catalog, components):
+    assert _names(catalog.query()) == [("s3", ["dev", "prod"]), ("kubeflow", ["prod"]), ("local", ["dev"])]
+    assert _names(catalog.query(component_type="orchestrator", flavor="kubeflow")) == [("kubeflow", ["prod"])]
+    assert _names(catalog.query(component_id=components["s3"]["id"])) == [("s3", ["dev", "prod"])]
+    assert _names(catalog.query(component_type="orchestrator", name="s3")) == []
+    assert catalog.query(flavor="missing") == []
+    assert catalog.stats() == {"stacks": 2, "components": 3}
+
+
+def test_updated_stack_replaces_its_previous_version(catalog, components):
+    prod = next(stack for stack in catalog._stacks.values() if stack["name"] == "prod")
+    catalog.update_stack({**prod, "name": "production", "components": {"artifact_store": [components["s3"]]}})
+
+    # Kubeflow was only used by prod, so it leaves the catalog along with its flavor.
+    assert _names(catalog.query()) == [("s3", ["dev", "production"]), ("local", ["dev"])]
+    assert catalog.query(flavor="kubeflow") == []
+
+
+def test_only_known_ignores_stacks_outside_the_listing(catalog, components):
+    catalog.update_stack(_stack("other-user", components["local"]), only_known=True)
+    assert _names(catalog.query(component_type="orchestrator", flavor="local")) == [("local", ["dev"])]
+
+
+def test_changes_add_update_and_remove_stacks(catalog, components):
+    dev, prod = sorted(catalog._stacks.values(), key=lambda stack: stack["name"])
+    staging = _stack("staging", components["kubeflow"])
+    catalog.apply_changes([staging, {**dev, "name": "development"}], removed_ids=[prod["id"]])
+
+    assert _names(catalog.query()) == [
+        ("s3", ["development"]), ("kubeflow", ["staging"]), ("local", ["development"]),
+    ]
+
+
+def test_components_route_lists_the_components_of_the_users_stacks(client, fake_zenml):
+    fake_zenml.stacks.append(make_stack("gpu", orchestrator="kubernetes"))
+
+    response = client.get("/components?type=orchestrator")
+    assert response.status_code == 200
+    assert [(c["flavor"], [s["name"] for s in c["stacks"]]) for c in response.get_json()] == [
+        ("local", ["default"]), ("kubernetes", ["gpu"]),
+    ]
+    assert client.get("/components?flavor=kubernetes&name=missing").get_json() == []
+
+
+def test_renamed_stack_is_seen_by_the_catalog(client, fake_zenml):
+    client.get("/components")
+
+    response = client.post("/stacks/rename", json={"stack_name_or_id": "default", "new_stack_name": "renamed"})
+    assert response.status_code == 200
+    assert {s["name"] for c in client.get("/components").get_json() for s in c["stacks"]} == {"renamed"}
+
+
+def test_catalog_stats_count_the_indexed_stacks_and_components(client, fake_zenml):
+    client.get("/components")
+
+    store_url = components_router.fetch_store_info()["store_url"]
+    stats = [entry for entry in client.get("/components/catalog_stats").get_json() if entry["store_url"] == store_url]
+    assert [(entry["stacks"], entry["components"]) for entry in stats] == [(1, 2)]
@@ -0,0 +1,89 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+from types import SimpleNamespace
+
+import pytest
+import requests
+from requests.adapters import Retry
+
+from app.utils.client_pool import ClientPool, mount_connection_pool
+
+
+class _FakeZenMLClient:
+    """Stands in for ZenML's singleton `Client`, with a REST store whose session can be replaced."""
+
+    instances = 0
+    resets = 0
+
+    def __init__(self):
+        type(self).instances += 1
+        self.zen_store = SimpleNamespace(_session=requests.Session())
+
+    @classmethod
+    def _reset_instance(cls):
+        cls.resets += 1
+
+
+@pytest.fixture
+def zenml_client(monkeypatch):
+    import zenml.client
+
+    monkeypatch.setattr(zenml.client, "Client", _FakeZenMLClient)
+    _FakeZenMLClient.instances = _FakeZenMLClient.resets = 0
+    return _FakeZenMLClient
+
+
+def test_mount_connection_pool_keeps_retries():
+    session = requests.Session()
+    retries = Retry(total=3)
+    session.mount("https://", requests.adapters.HTTPAdapter(max_retries=retries))
+
+    mount_connection_pool(session, 7)
+
+    for prefix in ("https://", "http://"):
+        adapter = session.get_adapter(prefix)
+        assert adapter._pool_maxsize == 7
+    assert session.get_adapter("https://").max_retries is retries
+
+
+def test_client_and_session_are_reused(zenml_client):
+    pool = ClientPool(size=5)
+
+    client = pool.get()
+    session = client.zen_store._session
+
+    assert pool.get() is client
+    assert zenml_client.instances == 1
+    assert session.get_adapter("https://")._pool_maxsize == 5
+
+
+def test_replaced_store_session_is_tuned_again(zenml_client):
+    pool = ClientPool(size=5)
+    client = pool.get()
+
+    # ZenML opens a new session, e.g. after re-authenticating.
+    client.zen_store._session = requests.Session()
+
+    assert pool.get() is client
+    assert client.zen_store._session.get_adapter("http://")._pool_maxsize == 5
+
+
+def test_reset_builds_a_new_client(zenml_client):
+    pool = ClientPool(size=5)
+    client = pool.get()
+
+    pool.reset()
+
+    assert zenml_client.resets == 1
+    assert pool.get() is not client
+    assert zenml_client.instances == 2
@@ -0,0 +1,108 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import time
+
+import pytest
+import requests
+
+from app.utils import device_login
+from app.utils.device_login import web_login
+from app.utils.jobs import Job, JobCancelledError
+
+
+class _Response:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self._body = body
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+
+def _authorization(interval: int = 1, expires_in: int = 600) -> _Response:
+    return _Response(200, {
+        "device_code": "device-code",
+        "user_code": "user-code",
+        "verification_uri": "/devices/verify",
+        "verification_uri_complete": None,
+        "expires_in": expires_in,
+        "interval": interval,
+    })
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Answers the device login requests with the queued responses, recording each request's timeout."""
+    responses, timeouts = [], []
+
+    def post(url, verify, timeout, **kwargs):
+        timeouts.append(timeout)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(device_login.requests, "post", post)
+    monkeypatch.setattr(device_login.webbrowser, "open", lambda url: None)
+    return responses, timeouts
+
+
+def _started_job(timeout: float) -> Job:
+    job = Job(timeout=timeout)
+    job._start()
+    return job
+
+
+def test_returns_access_token_once_authorized(server):
+    responses, _ = server
+    responses += [
+        _authorization(interval=0),
+        _Response(400, {"error": "authorization_pending"}),
+        _Response(200, {"access_token": "token", "token_type": "bearer"}),
+    ]
+
+    assert web_login(_started_job(timeout=10), "http://zenml.test/", verify_ssl=True) == "token"
+
+
+def test_gives_up_before_job_deadline(server):
+    responses, timeouts = server
+    responses += [_authorization(interval=5), _Response(400, {"error": "authorization_pending"})]
+
+    started = time.monotonic()
+    with pytest.raises(JobCancelledError):
+        web_login(_started_job(timeout=2), "http://zenml.test", verify_ssl=True)
+
+    # Waiting another interval would overrun the deadline, so it stops right away.
+    assert time.monotonic() - started < 1
+    assert all(timeout <= 2 for timeout in timeouts)
+
+
+def test_rejected_login_raises_authorization_exception(server):
+    from zenml.exceptions import AuthorizationException
+
+    responses, _ = server
+    responses += [_authorization(interval=0), _Response(400, {"error": "access_denied"})]
+
+    with pytest.raises(AuthorizationException):
+        web_login(_started_job(timeout=10), "http://zenml.test", verify_ssl=True)
+
+
+def test_unreachable_server_raises_authorization_exception(server):
+    from zenml.exceptions import AuthorizationException
+
+    responses, _ = server
+    responses.append(requests.exceptions.ConnectionError("refused"))
+
+    with pytest.raises(AuthorizationException):
+        web_login(_started_job(timeout=10), "http://zenml.test", verify_ssl=True)
@@ -0,0 +1,107 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh process, as ZenML reads its configuration once per process.
+FRESH_PROCESS_REQUESTS = """
+import json
+import app.utils.global_config as global_config
+
+resets = []
+reset_clients = global_config.reset_clients
+global_config.reset_clients = lambda: (resets.append(1), reset_clients())
+
+from main import app
+
+client = app.test_client()
+paths = ["/server_deployer/status", "/zen_store/api_token", "/stacks", "/stacks/active_stack", "/stacks"]
+print(json.dumps({"statuses": [client.get(path).status_code for path in paths], "resets": len(resets)}))
+"""
+
+
+# Changes the active stack the way another worker process does, then reads it through this one.
+ACTIVE_STACK_CHANGED_BY_ANOTHER_WORKER = """
+import json
+from zenml.client import Client
+from zenml.config.global_config import GlobalConfiguration
+from zenml.models import StackUpdate
+from zenml.utils import yaml_utils
+from app.utils.global_config import invalidate_active_stack
+from main import app
+
+client = app.test_client()
+names = [client.get("/stacks/active_stack").get_json()["name"]]
+
+default = Client().get_stack("default")
+components = {component_type: components[0].id for component_type, components in default.components.items()}
+other = Client().create_stack(name="other", components=components)
+path = GlobalConfiguration()._config_file()
+config = yaml_utils.read_yaml(path)
+config["active_stack_id"] = str(other.id)
+yaml_utils.write_yaml(path, config)
+invalidate_active_stack(activated=True)
+names.append(client.get("/stacks/active_stack").get_json()["name"])
+
+Client().zen_store.update_stack(other.id, StackUpdate(name="renamed"))
+invalidate_active_stack()
+names.append(client.get("/stacks/active_stack").get_json()["name"])
+unchanged = yaml_utils.read_yaml(path)["active_stack_id"] == str(other.id)
+print(json.dumps({"names": names, "config_unchanged": unchanged}))
+"""
+
+
+def _run_fresh_process(tmp_path, script: str) -> dict:
+    """Runs `script` in a new process whose ZenML store is only configured through ZENML_STORE_*."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("ZENML_")}
+    env.update(
+        ZENML_CONFIG_PATH=str(tmp_path / "config"),
+        ZENML_ANALYTICS_OPT_IN="false",
+        ZENML_STORE_URL=f"sqlite:///{tmp_path / 'zenml.db'}",
+        SHARED_STATE_DIR=str(tmp_path / "shared"),
+        PYTHONPATH=ROOT,
+    )
+    # Run from a file, as ZenML locates the source root through the main module when validating stacks.
+    script_path = tmp_path / "script.py"
+    script_path.write_text(script)
+    result = subprocess.run(
+        [sys.executable, str(script_path)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_env_configured_store_is_set_up_before_first_snapshot(tmp_path):
+    """Every route answers in a fresh process whose store is only configured through ZENML_STORE_*."""
+    outcome = _run_fresh_process(tmp_path, FRESH_PROCESS_REQUESTS)
+    # A SQL store has no API token, which the route reports as missing rather than failing.
+    assert outcome["statuses"] == [200, 404, 200, 200, 200]
+    # Setting up the store writes it to the configuration file, which must not count as a change of store.
+    assert outcome["resets"] == 0
+
+
+def test_active_stack_changed_by_another_worker_is_seen(tmp_path):
+    """A stack activated or renamed by another worker replaces the active stack ZenML holds in memory."""
+    outcome = _run_fresh_process(tmp_path, ACTIVE_STACK_CHANGED_BY_ANOTHER_WORKER)
+    assert outcome["names"] == ["default", "other", "renamed"]
+    # Reloading the active stack never writes the configuration file.
+    assert outcome["config_unchanged"]
@@ -0,0 +1,142 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+import time
+
+import pytest
+
+from app.utils.jobs import JobCancelledError, JobManager, JobQueueFullError
+from app.utils.shared_state import SharedState
+
+
+def _wait_until_finished(manager: JobManager, job_id: str, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.is_finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def _manager(**kwargs) -> JobManager:
+    settings = {"max_workers": 2, "max_pending": 4, "timeout": 5, "retention": 60}
+    settings.update(kwargs)
+    return JobManager(**settings)
+
+
+def test_job_result_and_failure():
+    manager = _manager()
+
+    succeeded = _wait_until_finished(manager, manager.submit(lambda job, x: x * 2, 21).id)
+    failed = _wait_until_finished(manager, manager.submit(lambda job: 1 / 0).id)
+
+    assert (succeeded.status, succeeded.result) == ("succeeded", 42)
+    assert failed.status == "failed"
+    assert "division by zero" in failed.error
+    assert manager.pending == 0
+
+
+def test_submissions_beyond_max_pending_are_rejected():
+    manager = _manager(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    manager.submit(lambda job: release.wait())
+    manager.submit(lambda job: release.wait())
+    with pytest.raises(JobQueueFullError):
+        manager.submit(lambda job: None)
+    release.set()
+
+
+def test_job_past_its_deadline_cannot_commit():
+    manager = _manager(timeout=0.05)
+    side_effects = []
+
+    def slow_login(job):
+        time.sleep(0.1)
+        job.commit()
+        side_effects.append("switched server")
+
+    job = _wait_until_finished(manager, manager.submit(slow_login).id)
+
+    assert job.status == "timed_out"
+    assert side_effects == []
+    # The slot is freed as soon as the function stops.
+    deadline = time.monotonic() + 1
+    while manager.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert manager.pending == 0
+
+
+def test_committed_job_no_longer_times_out():
+    manager = _manager(timeout=0.05)
+
+    def login(job):
+        job.commit()
+        time.sleep(0.1)
+        return "connected"
+
+    job = _wait_until_finished(manager, manager.submit(login).id)
+
+    assert (job.status, job.result) == ("succeeded", "connected")
+
+
+def test_running_job_is_reported_timed_out_at_its_deadline():
+    manager = _manager(timeout=0.05)
+    release = threading.Event()
+
+    def hangs(job):
+        release.wait()
+        job.commit()
+
+    job = manager.submit(hangs)
+    time.sleep(0.1)
+    assert manager.get(job.id).status == "timed_out"
+    release.set()
+
+
+def test_job_can_be_polled_through_another_process(tmp_path):
+    owner = _manager(shared=SharedState(str(tmp_path)), table="jobs")
+    other = _manager(shared=SharedState(str(tmp_path)), table="jobs")
+
+    job = owner.submit(lambda job: {"message": "Connected successfully."})
+    _wait_until_finished(owner, job.id)
+
+    polled = other.get(job.id)
+    assert polled.to_dict() == owner.get(job.id).to_dict()
+    assert other.get("unknown") is None
+
+
+def test_job_of_an_exited_process_is_reported_failed(tmp_path, monkeypatch):
+    import app.utils.jobs
+
+    owner = _manager(shared=SharedState(str(tmp_path)), table="jobs")
+    other = _manager(shared=SharedState(str(tmp_path)), table="jobs")
+    release = threading.Event()
+    job = owner.submit(lambda job: release.wait())
+
+    monkeypatch.setattr(app.utils.jobs, "process_alive", lambda pid: False)
+    polled = other.get(job.id)
+    release.set()
+
+    assert polled.status == "failed"
+    assert polled.error == "The worker running the job exited."
+
+
+def test_cancelled_error_marks_job_timed_out():
+    manager = _manager()
+
+    def gives_up(job):
+        raise JobCancelledError("Web login did not finish in time.")
+
+    assert _wait_until_finished(manager, manager.submit(gives_up).id).status == "timed_out"
@@ -0,0 +1,109 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.utils import metrics
+from app.utils.metrics import EXITED_SNAPSHOT, MultiprocessExporter, family, merge_families
+from app.utils.upstream import CircuitBreaker, tenant_breakers
+
+
+@pytest.fixture(scope="module")
+def dead_pid() -> int:
+    """The pid of a process that has exited and been reaped."""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _snapshot(pid: int, started_at: float, requests: int, in_flight: int) -> dict:
+    return {
+        "pid": pid,
+        "started_at": started_at,
+        "families": [
+            family("requests_total", "counter", "Requests.", ("route",), [(("/stacks",), requests)]),
+            family("in_flight", "gauge", "In flight.", (), [((), in_flight)]),
+            {**family("latency", "histogram", "Latency.", (), [((), [1, 0, 0.5])]), "buckets": [0.1]},
+        ],
+    }
+
+
+def _values(families) -> dict:
+    return {metric_family["name"]: metric_family["samples"] for metric_family in families}
+
+
+def test_merge_sums_counters_of_every_process_and_gauges_of_running_ones():
+    merged = _values(merge_families([(_snapshot(1, 0, 3, 2), True), (_snapshot(2, 0, 4, 5), False)]))
+    assert merged["requests_total"] == [[["/stacks"], 7]]
+    assert merged["in_flight"] == [[[], 2]]
+    assert merged["latency"] == [[[], [2, 0, 1.0]]]
+
+
+def test_merge_takes_the_maximum_of_live_max_gauges():
+    snapshots = [
+        ({"families": [family("import", "gauge", "Import.", (), [((), seconds)], aggregate=metrics.LIVE_MAX)]}, True)
+        for seconds in (1.5, 0.5)
+    ]
+    assert _values(merge_families(snapshots))["import"] == [[[], 1.5]]
+
+
+def _write(directory, name: str, snapshot: dict):
+    with open(os.path.join(directory, name), "w") as f:
+        json.dump(snapshot, f)
+
+
+def _requests_total(families) -> float:
+    return sum(value for _, value in _values(families).get("requests_total", []))
+
+
+def test_snapshots_of_exited_processes_are_folded_into_one_file(tmp_path, dead_pid):
+    exporter = MultiprocessExporter(str(tmp_path), flush_interval=3600)
+    _write(tmp_path, f"{dead_pid}-a.json", _snapshot(dead_pid, 1, 3, 1))
+    _write(tmp_path, f"{dead_pid}-b.json", _snapshot(dead_pid, 2, 4, 1))
+    # A pid reused by this process: its older snapshot belongs to a process that exited.
+    _write(tmp_path, f"{os.getpid()}-old.json", _snapshot(os.getpid(), 0, 5, 1))
+
+    assert _requests_total(exporter.collect()) == 12
+    names = sorted(name for name in os.listdir(tmp_path) if name.endswith(".json"))
+    assert names == sorted([EXITED_SNAPSHOT, os.path.basename(exporter._path)])
+    with open(tmp_path / EXITED_SNAPSHOT) as f:
+        exited = _values(json.load(f)["families"])
+    assert "in_flight" not in exited
+
+    # Folding again neither loses nor double counts anything.
+    _write(tmp_path, f"{dead_pid}-c.json", _snapshot(dead_pid, 3, 1, 1))
+    assert _requests_total(exporter.collect()) == 13
+    assert _requests_total(exporter.collect()) == 13
+
+
+def test_prune_folds_without_writing_a_snapshot_of_its_own(tmp_path, dead_pid):
+    exporter = MultiprocessExporter(str(tmp_path), flush_interval=3600)
+    _write(tmp_path, f"{dead_pid}-a.json", _snapshot(dead_pid, 1, 3, 1))
+    exporter.prune()
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".json")) == [EXITED_SNAPSHOT]
+
+
+def test_metrics_route_exports_the_breaker_of_every_tenant(client, monkeypatch):
+    tenant_breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60, half_open_max_calls=1)
+    tenant_breaker.before_call()
+    tenant_breaker.record_failure()
+    monkeypatch.setitem(tenant_breakers, "team-a", tenant_breaker)
+
+    lines = client.get("/metrics").get_data(as_text=True).splitlines()
+    assert 'circuit_breaker_state{tenant="",state="closed"} 1' in lines
+    assert 'circuit_breaker_state{tenant="team-a",state="open"} 1' in lines
+    assert 'circuit_breaker_opened_total{tenant="team-a"} 1' in lines
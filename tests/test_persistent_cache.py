@@ -0,0 +1,120 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import contextvars
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.routers import stacks
+from app.utils.persistent_cache import PersistentCache
+
+tenant = contextvars.ContextVar("tenant", default=None)
+
+
+@pytest.fixture
+def cache(tmp_path) -> PersistentCache:
+    return PersistentCache(str(tmp_path / "cache.sqlite3"), fresh_for=30, max_staleness=3600)
+
+
+def _age(cache: PersistentCache, seconds: float):
+    """Makes every entry `seconds` old, as if it was stored before a restart."""
+    with sqlite3.connect(cache.path) as connection:
+        connection.execute("UPDATE entries SET stored_at = ?", (time.time() - seconds,))
+
+
+def test_disabled_cache_always_misses():
+    cache = PersistentCache("", fresh_for=30, max_staleness=3600)
+    cache.set("store", "key", [1])
+    assert not cache.enabled
+    assert cache.get("store", "key") is None
+
+
+def test_entries_are_fresh_then_stale_then_gone(cache):
+    cache.set("store", "key", {"name": "default"})
+    assert cache.get("store", "key") == ({"name": "default"}, False)
+    _age(cache, 60)
+    assert cache.get("store", "key") == ({"name": "default"}, True)
+    _age(cache, 7200)
+    assert cache.get("store", "key") is None
+    assert {stat: cache.stats()[stat] for stat in ("hits", "stale_hits", "misses")} == {
+        "hits": 1, "stale_hits": 1, "misses": 1,
+    }
+
+
+def test_entries_are_shared_through_the_file(cache):
+    cache.set("store", "key", [1, 2])
+    assert PersistentCache(cache.path, fresh_for=30, max_staleness=3600).get("store", "key") == ([1, 2], False)
+
+
+def test_invalidate_drops_the_prefix_of_one_store(cache):
+    for store in ("store", "other"):
+        for key in ("stacks:a", "stacks:b", "active_stack"):
+            cache.set(store, key, key)
+
+    cache.invalidate("store", "stacks:")
+    assert [cache.get("store", key) for key in ("stacks:a", "stacks:b")] == [None, None]
+    assert cache.get("store", "active_stack") is not None
+    assert cache.get("other", "stacks:a") is not None
+
+
+def test_one_revalidation_per_entry_runs_in_the_requests_context(cache):
+    release = threading.Event()
+    seen = []
+
+    def refresh():
+        release.wait(5)
+        seen.append(tenant.get())
+
+    tenant.set("team-a")
+    cache.revalidate("store", "key", refresh)
+    cache.revalidate("store", "key", refresh)
+    assert cache.stats()["revalidating"] == 1
+    release.set()
+    while cache.stats()["revalidating"]:
+        time.sleep(0.01)
+    assert seen == ["team-a"]
+
+
+@pytest.fixture
+def warm_cache(cache, monkeypatch):
+    monkeypatch.setattr(stacks, "warm_cache", cache)
+    return cache
+
+
+def _restart():
+    """Drops what a new process would not have in memory."""
+    stacks.stacks_cache.invalidate()
+
+
+def test_listing_persisted_before_a_restart_is_served_without_the_server(client, fake_zenml, warm_cache):
+    listing = client.get("/stacks").get_json()
+    calls = len(fake_zenml.list_stacks_calls)
+    _restart()
+
+    assert client.get("/stacks").get_json() == listing
+    assert len(fake_zenml.list_stacks_calls) == calls
+
+
+def test_stale_listing_is_served_while_it_is_refreshed(client, fake_zenml, warm_cache):
+    listing = client.get("/stacks").get_json()
+    calls = len(fake_zenml.list_stacks_calls)
+    _age(warm_cache, 60)
+    _restart()
+
+    assert client.get("/stacks").get_json() == listing
+    deadline = time.monotonic() + 5
+    while len(fake_zenml.list_stacks_calls) == calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(fake_zenml.list_stacks_calls) > calls
@@ -0,0 +1,84 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import pstats
+import time
+
+import pytest
+
+from app.utils.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, RequestProfile
+from config import Config
+
+
+class _IncompleteProfile(RequestProfile):
+    """Leaves out `write`."""
+
+
+def test_profiles_must_implement_write():
+    with pytest.raises(TypeError):
+        _IncompleteProfile()
+
+
+@pytest.fixture
+def profiled_client(monkeypatch, tmp_path, fake_zenml):
+    """A client of an app profiling requests into a temporary directory, against a slow ZenML server."""
+    from app import create_app
+
+    monkeypatch.setattr(Config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(Config, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "PROFILING_MAX_PROFILES", 2)
+    monkeypatch.setattr(Config, "PROFILING_SAMPLE_INTERVAL", 0.001)
+    list_stacks = fake_zenml.list_stacks
+
+    def slow_list_stacks(*args, **kwargs):
+        time.sleep(0.05)
+        return list_stacks(*args, **kwargs)
+
+    monkeypatch.setattr(fake_zenml, "list_stacks", slow_list_stacks)
+    return create_app().test_client()
+
+
+def test_cprofile_profile_includes_the_upstream_threads(profiled_client, tmp_path):
+    response = profiled_client.get("/stacks", headers={PROFILE_HEADER: "cprofile"})
+    profile_id = response.headers[PROFILE_ID_HEADER]
+
+    profiles = profiled_client.get("/profiles").get_json()
+    assert [(p["id"], p["mode"], p["endpoint"], p["status_code"]) for p in profiles] == [
+        (profile_id, "cprofile", "stacks.fetch_stacks", 200),
+    ]
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / profiles[0]["file"])).stats}
+    assert {"fetch_stacks", "slow_list_stacks"} <= functions
+    assert profiled_client.get(f"/profiles/{profile_id}").data == (tmp_path / profiles[0]["file"]).read_bytes()
+
+
+def test_sampling_profile_is_a_collapsed_stack_file(profiled_client):
+    response = profiled_client.get("/stacks", headers={PROFILE_HEADER: "sampling"})
+
+    lines = profiled_client.get(f"/profiles/{response.headers[PROFILE_ID_HEADER]}").get_data(as_text=True).splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack.split(";")[0] in ("request", "upstream")
+        assert int(count) > 0
+    assert any("slow_list_stacks" in line for line in lines)
+
+
+def test_only_requested_profiles_are_kept_up_to_the_limit(profiled_client):
+    assert PROFILE_ID_HEADER not in profiled_client.get("/stacks").headers
+    ids = [profiled_client.get("/stacks", headers={PROFILE_HEADER: "1"}).headers[PROFILE_ID_HEADER] for _ in range(3)]
+
+    assert [profile["id"] for profile in profiled_client.get("/profiles").get_json()] == ids[:0:-1]
+    assert profiled_client.get(f"/profiles/{ids[0]}").status_code == 404
+
+
+def test_profiles_are_unavailable_when_profiling_is_disabled(client):
+    assert client.get("/profiles").status_code == 404
@@ -0,0 +1,82 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.routers.stacks import stacks_cache
+from app.utils import responses
+from app.utils.responses import json_response
+from config import Config
+from tests.conftest import make_stack
+
+
+@pytest.fixture
+def many_stacks(fake_zenml):
+    # Large enough to be compressed.
+    fake_zenml.stacks += [make_stack(f"stack-{i}", orchestrator="local") for i in range(1, 50)]
+    return fake_zenml
+
+
+def test_listing_is_revalidated_with_its_etag(client, many_stacks):
+    response = client.get("/stacks")
+    etag = response.headers["ETag"]
+    assert response.cache_control.private and response.cache_control.no_cache
+
+    revalidated = client.get("/stacks", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_changed_listing_gets_a_new_etag(client, many_stacks):
+    etag = client.get("/stacks").headers["ETag"]
+    many_stacks.stacks.append(make_stack("added", orchestrator="local"))
+    # A stack created through another client is only listed once the cached listing is dropped.
+    stacks_cache.invalidate()
+    response = client.get("/stacks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_large_listing_is_gzip_compressed(client, many_stacks):
+    plain = client.get("/stacks")
+    compressed = client.get("/stacks", headers={"Accept-Encoding": "gzip"})
+
+    assert plain.content_encoding is None
+    assert compressed.content_encoding == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    # Each coding is its own representation, but either revalidates the other.
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    revalidated = client.get("/stacks", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_small_body_is_not_compressed(app):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = json_response({"name": "default"})
+    assert response.content_encoding is None
+    assert json.loads(response.data) == {"name": "default"}
+
+
+def test_brotli_is_preferred_when_installed(app, monkeypatch):
+    monkeypatch.setattr(responses, "brotli", SimpleNamespace(compress=lambda body, quality: b"br:" + body))
+    data = ["x" * Config.COMPRESSION_MIN_SIZE]
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        response = json_response(data)
+    assert response.content_encoding == "br"
+    assert response.data.startswith(b"br:")
+    assert response.headers["ETag"].endswith('-br"')
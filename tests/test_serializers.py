@@ -0,0 +1,94 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from zenml.enums import StackComponentType
+
+from app.utils.serializers import parse_fields, select_fields, serialize_stack, stack_to_dict
+
+
+def _stack_data() -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "name": "default",
+        "components": {
+            "artifact_store": [{"id": uuid.uuid4(), "name": "artifacts", "flavor": "local", "type": "artifact_store"}],
+            "orchestrator": [{"id": uuid.uuid4(), "name": "local", "flavor": "local", "type": "orchestrator"}],
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "fields, expected",
+    [
+        (None, None),
+        ("", None),
+        (" , ", None),
+        ("id,name", {"id": None, "name": None}),
+        ("components.name, components.flavor", {"components": {"name", "flavor"}}),
+        # Selecting the whole field wins over selecting some of its subfields.
+        ("components.name,components", {"components": None}),
+        ("components,components.name", {"components": None}),
+    ],
+)
+def test_parse_fields(fields, expected):
+    assert parse_fields(fields) == expected
+
+
+@pytest.mark.parametrize("fields", ["owner", "name.first", "components.owner"])
+def test_parse_fields_rejects_unknown_fields(fields):
+    with pytest.raises(ValueError):
+        parse_fields(fields)
+
+
+def test_select_fields():
+    stack_data = _stack_data()
+
+    assert select_fields(stack_data, None) is stack_data
+    assert select_fields(stack_data, parse_fields("id,name")) == {"id": stack_data["id"], "name": "default"}
+    selected = select_fields(stack_data, parse_fields("components.name"))
+    assert selected == {
+        "components": {
+            "artifact_store": [{"name": "artifacts"}],
+            "orchestrator": [{"name": "local"}],
+        }
+    }
+
+
+def _component(component_type: StackComponentType, name: str):
+    return SimpleNamespace(id=uuid.uuid4(), name=name, flavor="local", type=component_type)
+
+
+def _stack():
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        name="default",
+        components={
+            StackComponentType.ARTIFACT_STORE: [_component(StackComponentType.ARTIFACT_STORE, "artifacts")],
+            StackComponentType.ORCHESTRATOR: [_component(StackComponentType.ORCHESTRATOR, "local")],
+        },
+    )
+
+
+def test_stack_to_dict_matches_pydantic_serialization():
+    stack = _stack()
+
+    assert stack_to_dict(stack) == serialize_stack(stack).dict()
+
+
+def test_stack_to_dict_without_components():
+    stack = SimpleNamespace(id=uuid.uuid4(), name="empty", components={})
+
+    assert stack_to_dict(stack) == serialize_stack(stack).dict()
@@ -0,0 +1,136 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.models.server_status import ServerStatusModel
+from app.models.user import UserModel
+from app.routers import server_deployer
+from app.utils.status_prober import StatusProber
+from config import Config
+
+
+@pytest.fixture
+def login(monkeypatch):
+    """Replaces the web login and the store switch of connection jobs, recording the servers switched to."""
+    switched = []
+    behaviour = {"delay": 0, "token": "token"}
+
+    def web_login(job, url, verify_ssl):
+        time.sleep(behaviour["delay"])
+        return behaviour["token"]
+
+    monkeypatch.setattr(server_deployer, "web_login", web_login)
+    monkeypatch.setattr(server_deployer, "set_store_configuration",
+                        lambda remote_url, access_token: switched.append((remote_url, access_token)))
+    monkeypatch.setattr(server_deployer, "fetch_active_user", lambda: UserModel(id=uuid.uuid4(), name="default"))
+    monkeypatch.setattr(server_deployer.status_prober, "refresh", lambda: None)
+    return behaviour, switched
+
+
+def _poll(client, status_url: str, timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(status_url).get_json()
+        if job["status"] in ("succeeded", "failed", "timed_out"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("Connection job did not finish")
+
+
+def test_connect_runs_as_a_job(client, login):
+    _, switched = login
+
+    response = client.post("/server_deployer/connect", json={"url": "http://zenml.test"})
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert response.headers["Location"] == body["status_url"]
+    job = _poll(client, body["status_url"])
+    assert job["status"] == "succeeded"
+    assert job["result"]["message"] == "Connected successfully."
+    assert switched == [("http://zenml.test", "token")]
+
+
+def test_timed_out_login_does_not_switch_servers(client, login, monkeypatch):
+    behaviour, switched = login
+    behaviour["delay"] = 0.2
+    monkeypatch.setattr(server_deployer.connect_jobs, "timeout", 0.05)
+
+    response = client.post("/server_deployer/connect", json={"url": "http://zenml.test"})
+    job = _poll(client, response.get_json()["status_url"])
+    # Give the login time to complete late.
+    time.sleep(0.3)
+
+    assert job["status"] == "timed_out"
+    assert switched == []
+
+
+def test_connect_requires_url(client):
+    assert client.post("/server_deployer/connect", json={}).status_code == 400
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/server_deployer/connect/unknown").status_code == 404
+
+
+@pytest.fixture
+def status_prober(monkeypatch):
+    """Serves the status routes from a prober that only probes when asked to, with a single stream slot."""
+    statuses = [ServerStatusModel(is_connected=True, host="zenml.test", port=443)]
+    prober = StatusProber(probe=lambda: statuses[0], interval=3600, jitter=0)
+    monkeypatch.setattr(server_deployer, "status_prober", prober)
+    monkeypatch.setattr(server_deployer, "status_stream_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(Config, "STATUS_STREAM_KEEPALIVE", 0.01)
+    monkeypatch.setattr(Config, "STATUS_STREAM_MAX_LIFETIME", 0.05)
+    return statuses
+
+
+def test_status_is_served_from_the_snapshot(client, status_prober):
+    response = client.get("/server_deployer/status")
+
+    assert response.status_code == 200
+    assert response.get_json()["host"] == "zenml.test"
+    assert "snapshotAge" in response.get_json()
+
+
+def test_status_stream_ends_after_its_lifetime(client, status_prober):
+    response = client.get("/server_deployer/status/stream")
+
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    # As the WSGI server does once the stream has been sent.
+    response.close()
+    assert body.startswith("retry: 1000\n\n")
+    assert body.count("data: ") == 1
+    assert '"host": "zenml.test"' in body
+    # The stream released its slot, so another one can be opened.
+    response = client.get("/server_deployer/status/stream")
+    assert response.status_code == 200
+    response.close()
+
+
+def test_status_streams_beyond_the_limit_are_rejected(client, status_prober):
+    response = client.get("/server_deployer/status/stream", buffered=False)
+    try:
+        rejected = client.get("/server_deployer/status/stream")
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == "1"
+    finally:
+        response.close()
+    response = client.get("/server_deployer/status/stream")
+    assert response.status_code == 200
+    response.close()
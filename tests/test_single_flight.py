@@ -0,0 +1,81 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+def _start_concurrent_calls(executor: ThreadPoolExecutor, single_flight: SingleFlight, fn, callers: int):
+    """Calls `fn` through `single_flight` from `callers` threads that all arrive while the first call runs."""
+    futures = [executor.submit(single_flight.do, "key", fn)]
+    while single_flight.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    futures += [executor.submit(single_flight.do, "key", fn) for _ in range(callers - 1)]
+    while single_flight.stats()["coalesced"] < callers - 1:
+        time.sleep(0.001)
+    return futures
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = _start_concurrent_calls(executor, single_flight, fn, callers=5)
+        release.set()
+
+    assert [future.result() for future in futures] == ["result"] * 5
+    assert len(calls) == 1
+    assert single_flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_error_is_raised_to_every_waiter():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    error = RuntimeError("upstream failed")
+
+    def fn():
+        release.wait()
+        raise error
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = _start_concurrent_calls(executor, single_flight, fn, callers=4)
+        release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError) as exc_info:
+            future.result()
+        assert exc_info.value is error
+    assert single_flight.stats()["in_flight"] == 0
+
+
+def test_failed_call_is_not_reused():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise ValueError("first")
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", fail)
+    assert single_flight.do("key", lambda: "second") == "second"
+    assert single_flight.stats()["executed"] == 2
@@ -0,0 +1,125 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import pytest
+
+from app.utils.shared_state import SharedState
+from app.utils.stack_mirror import InvalidCursorError, StackMirror
+
+
+def _stack(stack_id: str, name: str) -> dict:
+    return {"id": stack_id, "name": name, "components": {}}
+
+
+@pytest.fixture
+def shared(tmp_path) -> SharedState:
+    return SharedState(str(tmp_path))
+
+
+def test_first_call_resets_with_every_stack(shared):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=10)
+    mirror.apply([_stack("a", "A"), _stack("b", "B")], present_ids={"a", "b"})
+
+    changes = mirror.changes(None)
+
+    assert changes["reset"] is True
+    assert [stack["id"] for stack in changes["added"]] == ["a", "b"]
+
+
+def test_changes_since_cursor(shared):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=10)
+    mirror.apply([_stack("a", "A"), _stack("b", "B"), _stack("c", "C")], present_ids={"a", "b", "c"})
+    cursor = mirror.changes(None)["cursor"]
+
+    mirror.apply([_stack("a", "A renamed"), _stack("d", "D")], present_ids={"a", "c", "d"})
+    changes = mirror.changes(cursor)
+
+    assert changes["reset"] is False
+    assert [stack["id"] for stack in changes["added"]] == ["d"]
+    assert [stack["name"] for stack in changes["updated"]] == ["A renamed"]
+    assert changes["removed"] == ["b"]
+    assert mirror.changes(changes["cursor"]) == {
+        "cursor": changes["cursor"],
+        "reset": False,
+        "added": [],
+        "updated": [],
+        "removed": [],
+    }
+
+
+def test_unchanged_stacks_are_not_reported(shared):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=10)
+    mirror.apply([_stack("a", "A")])
+    cursor = mirror.changes(None)["cursor"]
+
+    changed, removed = mirror.apply([_stack("a", "A")], present_ids={"a"})
+
+    assert (changed, removed) == ([], [])
+    assert mirror.changes(cursor)["cursor"] == cursor
+
+
+def test_stack_added_and_removed_after_cursor_is_not_reported(shared):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=10)
+    cursor = mirror.changes(None)["cursor"]
+
+    mirror.apply([_stack("a", "A")])
+    mirror.apply([], present_ids=set())
+    changes = mirror.changes(cursor)
+
+    assert (changes["reset"], changes["added"], changes["removed"]) == (False, [], [])
+
+
+def test_cursor_before_tombstone_horizon_resets(shared):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=1)
+    mirror.apply([_stack("a", "A"), _stack("b", "B"), _stack("c", "C")])
+    before_removals = mirror.changes(None)["cursor"]
+    mirror.apply([], present_ids={"b", "c"})
+    after_first_removal = mirror.changes(before_removals)["cursor"]
+
+    # Removing a second stack forgets the tombstone of the first.
+    mirror.apply([], present_ids={"c"})
+
+    changes = mirror.changes(before_removals)
+    assert changes["reset"] is True
+    assert [stack["id"] for stack in changes["added"]] == ["c"]
+    changes = mirror.changes(after_first_removal)
+    assert changes["reset"] is False
+    assert changes["removed"] == ["b"]
+
+
+def test_cursor_works_in_every_process_sharing_the_state(tmp_path):
+    writer = StackMirror(SharedState(str(tmp_path)), "http://store", "user", max_tombstones=10)
+    writer.apply([_stack("a", "A")])
+    cursor = writer.changes(None)["cursor"]
+    writer.apply([_stack("b", "B")])
+
+    reader = StackMirror(SharedState(str(tmp_path)), "http://store", "user", max_tombstones=10)
+    changes = reader.changes(cursor)
+
+    assert changes["reset"] is False
+    assert [stack["id"] for stack in changes["added"]] == ["b"]
+
+
+def test_cursor_of_another_mirror_resets(shared):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=10)
+    other = StackMirror(shared, "http://store", "other-user", max_tombstones=10)
+    other.apply([_stack("x", "X")])
+
+    assert mirror.changes(other.changes(None)["cursor"])["reset"] is True
+
+
+@pytest.mark.parametrize("cursor", ["abc", "-1", "epoch-x"])
+def test_malformed_cursor_is_rejected(shared, cursor):
+    mirror = StackMirror(shared, "http://store", "user", max_tombstones=10)
+
+    with pytest.raises(InvalidCursorError):
+        mirror.changes(cursor)
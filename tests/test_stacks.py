@@ -0,0 +1,62 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import json
+
+import pytest
+
+from tests.conftest import make_stack
+
+
+@pytest.fixture
+def five_stacks(fake_zenml):
+    fake_zenml.stacks += [make_stack(f"stack-{i}", orchestrator="local") for i in range(1, 5)]
+    return fake_zenml
+
+
+def test_listing_walks_every_page(client, five_stacks):
+    response = client.get("/stacks?page_size=2")
+
+    assert response.status_code == 200
+    assert [stack["name"] for stack in response.get_json()] == [stack.name for stack in five_stacks.stacks]
+    assert five_stacks.list_stacks_calls == [1, 2, 3]
+
+
+def test_cursor_starts_at_a_later_page(client, five_stacks):
+    response = client.get("/stacks?page_size=2&cursor=2")
+
+    assert response.status_code == 200
+    assert [stack["name"] for stack in response.get_json()] == ["stack-2", "stack-3", "stack-4"]
+
+
+@pytest.mark.parametrize("stream", ["", "&stream=json", "&stream=ndjson"])
+def test_cursor_past_the_last_page_is_rejected(client, five_stacks, stream):
+    response = client.get(f"/stacks?page_size=2&cursor=4{stream}")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "cursor 4 is past the last page"}
+
+
+@pytest.mark.parametrize("query", ["cursor=0", "cursor=x", "page_size=0", "stream=xml"])
+def test_invalid_paging_parameters_are_rejected(client, fake_zenml, query):
+    assert client.get(f"/stacks?{query}").status_code == 400
+
+
+def test_streamed_listing(client, five_stacks):
+    response = client.get("/stacks?page_size=2&stream=ndjson")
+
+    assert response.mimetype == "application/x-ndjson"
+    names = [json.loads(line)["name"] for line in response.get_data(as_text=True).splitlines()]
+    assert names == [stack.name for stack in five_stacks.stacks]
+    assert json.loads(client.get("/stacks?page_size=2&stream=json").get_data()) == json.loads(
+        client.get("/stacks").get_data()
+    )
@@ -0,0 +1,96 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import threading
+
+from app.models.server_status import ServerStatusModel
+from app.utils.status_prober import StatusProber
+
+
+def _status(host: str) -> ServerStatusModel:
+    return ServerStatusModel(is_connected=True, host=host, port=443)
+
+
+def _prober(statuses: list, **kwargs) -> StatusProber:
+    """A prober whose probes return `statuses[0]`, and which never probes on its own."""
+    return StatusProber(probe=lambda: statuses[0], interval=3600, jitter=0, **kwargs)
+
+
+def test_snapshot_is_taken_on_start():
+    prober = _prober([_status("a")])
+
+    prober.ensure_started()
+
+    snapshot, age = prober.snapshot()
+    assert snapshot == _status("a")
+    assert age < 1
+
+
+def test_only_changes_bump_the_version():
+    statuses = [_status("a")]
+    prober = _prober(statuses)
+    prober.ensure_started()
+    _, version = prober.wait_for_change(None, timeout=0)
+
+    prober.refresh()
+    assert prober.wait_for_change(version, timeout=0) == (_status("a"), version)
+
+    statuses[0] = _status("b")
+    prober.refresh()
+    assert prober.wait_for_change(version, timeout=0) == (_status("b"), version + 1)
+
+
+def test_waiters_are_woken_by_a_change():
+    statuses = [_status("a")]
+    prober = _prober(statuses)
+    prober.ensure_started()
+    _, version = prober.wait_for_change(None, timeout=0)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(prober.wait_for_change(version, timeout=5)))
+    waiter.start()
+
+    statuses[0] = _status("b")
+    prober.refresh()
+    waiter.join(timeout=5)
+
+    assert result == [(_status("b"), version + 1)]
+
+
+def test_persisted_snapshot_is_served_before_the_first_probe():
+    saved = []
+    probed = threading.Event()
+
+    def probe():
+        probed.wait()
+        return _status("probed")
+
+    prober = StatusProber(probe=probe, interval=3600, jitter=0, load=lambda: (_status("persisted"), 42.0),
+                          save=saved.append)
+    prober.ensure_started()
+
+    snapshot, age = prober.snapshot()
+    assert snapshot == _status("persisted")
+    assert age >= 42
+    probed.set()
+    assert prober.wait_for_change(1, timeout=5)[0] == _status("probed")
+    assert saved == [_status("probed")]
+
+
+def test_failed_probe_keeps_the_snapshot():
+    def probe():
+        raise RuntimeError("unreachable")
+
+    prober = StatusProber(probe=probe, interval=3600, jitter=0, load=lambda: (_status("persisted"), 0.0))
+    prober.ensure_started()
+    prober.refresh()
+
+    assert prober.snapshot()[0] == _status("persisted")
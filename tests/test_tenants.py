@@ -0,0 +1,182 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import global_config
+from app.utils import tenants as tenants_module
+from app.utils.shared_state import SharedState, shared_state
+from app.utils.tenants import TENANT_HEADER, TenantConfiguration, TenantRegistry, UnknownTenantError, tenants
+
+
+@pytest.fixture
+def shared(tmp_path) -> SharedState:
+    return SharedState(str(tmp_path))
+
+
+def test_registration_reaches_other_workers_on_refresh(shared):
+    worker, other_worker = TenantRegistry(shared, {}), TenantRegistry(shared, {})
+    worker.register("team-a", "https://zenml.team-a.test/", "token-a")
+
+    assert "team-a" not in other_worker
+    other_worker.refresh()
+    tenant = other_worker.get("team-a")
+    assert (tenant.url, tenant.api_token, tenant.verify_ssl) == ("https://zenml.team-a.test", "token-a", True)
+    assert other_worker.names() == ["team-a"]
+
+
+def test_lookups_between_registrations_never_read_the_shared_state(shared, monkeypatch):
+    registry = TenantRegistry(shared, {})
+    registry.register("team-a", "https://zenml.team-a.test", "token-a")
+    registry.refresh()
+
+    def fail():
+        raise AssertionError("The shared state was read")
+
+    monkeypatch.setattr(shared, "connection", fail)
+    monkeypatch.setattr(shared, "generation", lambda name: registry._generation)
+    registry.refresh()
+    assert registry.get("team-a").api_token == "token-a"
+    assert "team-b" not in registry
+
+
+def test_unchanged_tenants_keep_their_objects_across_reloads(shared):
+    worker, other_worker = TenantRegistry(shared, {}), TenantRegistry(shared, {})
+    worker.register("team-a", "https://zenml.team-a.test", "token-a")
+    other_worker.refresh()
+    tenant = other_worker.get("team-a")
+
+    worker.register("team-b", "https://zenml.team-b.test", "token-b")
+    other_worker.refresh()
+    assert other_worker.get("team-a") is tenant
+
+    worker.register("team-a", "https://zenml.team-a.test", "token-a2")
+    other_worker.refresh()
+    assert other_worker.get("team-a") is not tenant
+    assert other_worker.get("team-a").api_token == "token-a2"
+
+
+def test_removal_and_static_tenants(shared):
+    static = {"team-s": {"url": "https://zenml.team-s.test", "api_token": "token-s"}}
+    worker, other_worker = TenantRegistry(shared, static), TenantRegistry(shared, static)
+    assert other_worker.get("team-s").api_token == "token-s"
+
+    worker.register("team-s", "https://zenml.team-s.test", "replaced")
+    other_worker.refresh()
+    assert other_worker.get("team-s").api_token == "replaced"
+
+    worker.remove("team-s")
+    other_worker.refresh()
+    with pytest.raises(UnknownTenantError):
+        other_worker.get("team-s")
+
+
+def test_tokens_are_not_stored_in_plain_text(shared):
+    TenantRegistry(shared, {}).register("team-a", "https://zenml.team-a.test", "secret-token-a")
+
+    stored = shared.connection().execute("SELECT api_token FROM tenants").fetchone()[0]
+    assert b"secret-token-a" not in stored
+    with open(shared.path, "rb") as f:
+        assert b"secret-token-a" not in f.read()
+
+
+def test_tokens_sealed_by_an_unrelated_process_are_ignored(shared, monkeypatch):
+    TenantRegistry(shared, {}).register("team-a", "https://zenml.team-a.test", "token-a")
+    # A process that was not forked from the same parent holds other keys.
+    monkeypatch.setattr(tenants_module, "_MAC_KEY", b"other")
+
+    other_process = TenantRegistry(shared, {})
+    other_process.refresh()
+    assert "team-a" not in other_process
+
+
+@pytest.fixture
+def team_a():
+    tenant = tenants.register("team-a", "https://zenml.team-a.test", "token-a")
+    yield tenant
+    tenants.remove("team-a")
+
+
+@pytest.mark.parametrize("prefix, headers", [("/t/team-a", {}), ("", {TENANT_HEADER: "team-a"})])
+def test_requests_are_routed_to_the_selected_tenant(client, team_a, prefix, headers):
+    response = client.get(f"{prefix}/zen_store/api_token", headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"api_token": "token-a"}
+
+
+def test_tenant_registered_by_another_worker_is_routed(client):
+    TenantRegistry(shared_state, {}).register("team-b", "https://zenml.team-b.test", "token-b")
+    try:
+        assert client.get("/t/team-b/zen_store/api_token").get_json() == {"api_token": "token-b"}
+    finally:
+        tenants.remove("team-b")
+    assert client.get("/t/team-b/zen_store/api_token").status_code == 404
+
+
+@pytest.mark.parametrize("path, headers, status", [
+    ("/t/unknown/stacks", {}, 404),
+    ("/stacks", {TENANT_HEADER: "unknown"}, 404),
+    ("/t/bad name!/stacks", {}, 400),
+    ("/t/team-a/stacks", {TENANT_HEADER: "team-b"}, 400),
+])
+def test_unknown_invalid_or_conflicting_tenants_are_rejected(client, team_a, path, headers, status):
+    response = client.get(path, headers=headers)
+
+    assert response.status_code == status
+    assert "error" in response.get_json()
+
+
+def _worker_tenant(registry: TenantRegistry, stack):
+    """The tenant as one worker process holds it, with a client that only has its in-memory configuration."""
+    registry.refresh()
+    tenant = registry.get("team-a")
+    tenant._client = SimpleNamespace(_config=TenantConfiguration(SimpleNamespace(id=uuid.uuid4()), stack))
+    return tenant
+
+
+def _as_worker(monkeypatch, tenant):
+    monkeypatch.setattr(global_config, "current_tenant", lambda: tenant)
+
+
+def test_tenant_active_stack_is_shared_between_workers(team_a, monkeypatch):
+    default, other = SimpleNamespace(id=uuid.uuid4(), name="default"), SimpleNamespace(id=uuid.uuid4(), name="other")
+    worker = _worker_tenant(TenantRegistry(shared_state, {}), default)
+    other_worker = _worker_tenant(TenantRegistry(shared_state, {}), default)
+    token = tenants_module._current_tenant_name.set("team-a")
+    try:
+        _as_worker(monkeypatch, worker)
+        worker.configuration.set_active_stack(other)
+        global_config.invalidate_active_stack(activated=True)
+
+        _as_worker(monkeypatch, other_worker)
+        global_config.refresh_active_stack()
+        assert other_worker.configuration.active_stack_id == other.id
+        assert other_worker.configuration._active_stack is None
+
+        # A rename through a worker keeps the shared active stack, but makes every worker fetch it again.
+        other_worker.configuration._active_stack = other
+        global_config.invalidate_active_stack()
+        global_config.refresh_active_stack()
+        assert other_worker.configuration.active_stack_id == other.id
+        assert other_worker.configuration._active_stack is None
+    finally:
+        tenants_module._current_tenant_name.reset(token)
+
+
+def test_new_registration_starts_from_the_servers_active_stack(team_a):
+    tenants.share_active_stack("team-a", uuid.uuid4())
+    tenants.register("team-a", "https://zenml.team-a.test", "token-a")
+    assert tenants.shared_active_stack("team-a") is None
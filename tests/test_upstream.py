@@ -0,0 +1,81 @@
+#  Copyright (c) ZenML GmbH 2024. All Rights Reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at:
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+#  or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+import time
+
+import pytest
+
+from app.utils.upstream import CircuitBreaker, UpstreamUnavailableError
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    settings = {"failure_threshold": 2, "recovery_timeout": 0.05, "half_open_max_calls": 1}
+    settings.update(kwargs)
+    return CircuitBreaker(**settings)
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_only():
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened_count"] == 1
+
+
+def test_open_circuit_rejects_calls_until_recovery_timeout():
+    breaker = _breaker(recovery_timeout=60)
+    _open(breaker)
+
+    with pytest.raises(UpstreamUnavailableError) as exc_info:
+        breaker.before_call()
+    assert 0 < exc_info.value.retry_after <= 60
+    assert breaker.stats()["rejected_count"] == 1
+
+
+def test_half_open_success_closes_circuit():
+    breaker = _breaker()
+    _open(breaker)
+    time.sleep(0.1)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # The only trial slot is taken.
+    with pytest.raises(UpstreamUnavailableError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+    breaker.before_call()
+
+
+def test_half_open_failure_reopens_circuit():
+    breaker = _breaker()
+    _open(breaker)
+    time.sleep(0.1)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened_count"] == 2
+    with pytest.raises(UpstreamUnavailableError):
+        breaker.before_call()